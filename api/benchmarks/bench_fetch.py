@@ -0,0 +1,93 @@
+"""Compares fetching the sheets one after another with fetching them in parallel, against a
+local stand-in for the Google Sheets CSV export that adds a fixed latency to every request.
+
+Run from the api directory:
+
+    python benchmarks/bench_fetch.py --latency 0.4 --rows 50000 5000 50000
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils
+
+
+def make_csv(rows: int) -> bytes:
+    """Builds a Transaction_Log-shaped CSV export with the given number of rows."""
+    lines = ['Date,Merchant,Amount,Group,Category,Subcategory,Account']
+    for index in range(rows):
+        lines.append(
+            f'{index % 12 + 1}/{index % 28 + 1}/2024,Merchant {index % 500},"${index % 9000 + 0.99:,.2f}",'
+            f'Expenses,Category {index % 20},Subcategory {index % 60},Account {index % 8}'
+        )
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def start_sheet_server(sheets: dict[str, bytes], latency: float) -> ThreadingHTTPServer:
+    """Serves each sheet's CSV at the gviz export path after waiting for the given latency."""
+    class SheetHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            time.sleep(latency)
+            body = sheets[parse_qs(urlparse(self.path).query)['sheet'][0]]
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/csv')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SheetHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def time_runs(fetch, runs: int) -> float:
+    """Returns the median wall-clock time of the given number of fetches, after one warm-up."""
+    fetch()
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fetch()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.4, help='Seconds added to every request')
+    parser.add_argument('--rows', type=int, nargs='+', default=[50000, 5000, 50000], help='Rows in each sheet')
+    parser.add_argument('--runs', type=int, default=5, help='Timed runs of each fetch')
+    args = parser.parse_args()
+
+    sheets = {f'Sheet_{index}': make_csv(rows) for index, rows in enumerate(args.rows)}
+    server = start_sheet_server(sheets=sheets, latency=args.latency)
+    utils.SHEETS_BASE_URL = f'http://127.0.0.1:{server.server_port}/d'
+    sheet_names = list(sheets)
+
+    sequential = time_runs(
+        lambda: [utils.get_sheets_data(sheet_id='bench', sheet_name=sheet) for sheet in sheet_names],
+        runs=args.runs
+    )
+    parallel = time_runs(
+        lambda: utils.get_all_sheets_data(sheet_id='bench', sheet_names=sheet_names),
+        runs=args.runs
+    )
+    print(f'{len(sheet_names)} sheets ({", ".join(map(str, args.rows))} rows), {args.latency:.3f} s latency')
+    print(f'  sequential: {sequential:.2f} s')
+    print(f'  parallel:   {parallel:.2f} s')
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Compares convert_usd_columns with the per-cell parser it replaced, on a synthetic sheet with
+dollar columns holding mixed signs, parenthesized negatives, blanks and N/A.
+
+Run from the api directory:
+
+    python benchmarks/bench_parse.py --rows 1000000
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import statistics
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import convert_usd_columns
+
+
+def convert_usd_columns_per_cell(df: pd.DataFrame) -> pd.DataFrame:
+    """The previous parser, which stringified whole columns to find dollar columns and then
+        parsed them one cell at a time with a regex."""
+    def parse_usd(value):
+        if pd.isna(value):
+            return None
+        try:
+            return float(re.sub(r'[\$,]', '', str(value)))
+        except ValueError:
+            return None
+
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object and df[col].astype(str).str.contains(r'\$', na=False).any():
+            df[col] = df[col].apply(parse_usd)
+    return df
+
+
+def make_sheet(rows: int) -> pd.DataFrame:
+    """Builds a 7-column sheet with two dollar columns, as pd.read_csv returns it."""
+    rng = np.random.default_rng(0)
+
+    def dollar_column() -> np.ndarray:
+        amounts = rng.uniform(-5000, 5000, rows).round(2)
+        formatted = '$' + pd.Series(np.abs(amounts)).map('{:,.2f}'.format)
+        values = np.where(
+            amounts < 0,
+            np.where(rng.random(rows) < 0.5, '-' + formatted, '(' + formatted + ')'),
+            formatted
+        ).astype(object)
+        values[rng.random(rows) < 0.01] = None
+        values[rng.random(rows) < 0.01] = 'N/A'
+        return values
+
+    return pd.DataFrame({
+        'Date': pd.date_range('2000-01-01', periods=rows, freq='min').strftime('%m/%d/%Y'),
+        'Merchant': rng.choice(['Kroger', 'Shell', 'Netflix', 'Target', 'Starbucks'], rows).astype(object),
+        'Amount': dollar_column(),
+        'Group': rng.choice(['Income', 'Expenses', 'Savings'], rows).astype(object),
+        'Category': rng.choice(['Groceries', 'Gas', 'Streaming', 'Shopping'], rows).astype(object),
+        'Account': rng.choice(['Checking', 'Visa', 'Amex'], rows).astype(object),
+        'Balance': dollar_column()
+    })
+
+
+def time_runs(convert, df: pd.DataFrame, runs: int) -> float:
+    """Returns the median wall-clock time of converting a fresh copy of the sheet."""
+    times = []
+    for _ in range(runs):
+        sheet = df.copy()
+        start = time.perf_counter()
+        convert(sheet)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Rows in the sheet')
+    parser.add_argument('--runs', type=int, default=3, help='Timed runs of each parser')
+    args = parser.parse_args()
+
+    df = make_sheet(args.rows)
+    per_cell = time_runs(convert_usd_columns_per_cell, df=df, runs=args.runs)
+    vectorized = time_runs(convert_usd_columns, df=df, runs=args.runs)
+    print(f'{args.rows} rows, median of {args.runs} runs')
+    print(f'  per-cell apply + re.sub: {per_cell:.2f} s')
+    print(f'  vectorized:              {vectorized:.2f} s')
+
+    # The per-cell parser could not read parenthesized negatives, so they are left out
+    expected = convert_usd_columns_per_cell(df.copy())
+    actual = convert_usd_columns(df.copy())
+    for column in ('Amount', 'Balance'):
+        comparable = ~df[column].astype(str).str.startswith('(')
+        matches = np.allclose(expected[column][comparable], actual[column][comparable], equal_nan=True)
+        print(f'  {column} matches the per-cell parser outside parentheses: {matches}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Compares serializing GET /transactions through the Transaction model, the way FastAPI would,
+with the JSON objects SQLite builds itself, on synthetic Transaction_Log tables.
+
+Run from the api directory:
+
+    python benchmarks/bench_serialize.py --rows 10000 100000 1000000
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+import pandas as pd
+from pydantic import TypeAdapter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main as api
+from database import create_database_engine, sync_table
+from models import Transaction
+
+
+def make_sheet(rows: int) -> pd.DataFrame:
+    """Builds Transaction_Log sheet data as it looks after parsing, with negative amounts,
+        quotes and non-ASCII merchants."""
+    return pd.DataFrame({
+        'Date': [f'{index % 12 + 1}/{index % 28 + 1}/2024' for index in range(rows)],
+        'Merchant': [f'Café "{index % 500}"' for index in range(rows)],
+        'Amount': [(index % 9000 - 1000) + 0.99 for index in range(rows)],
+        'Group': ['Expenses' if index % 10 else 'Income' for index in range(rows)],
+        'Category': [f'Category {index % 20}' for index in range(rows)],
+        'Subcategory': [f'Subcategory {index % 60}' for index in range(rows)],
+        'Account': [f'Account {index % 8}' for index in range(rows)]
+    })
+
+
+def serialize_with_model(query: api.ReadQuery) -> bytes:
+    """Reads the rows and serializes them through the Transaction model."""
+    with api.engine.connect() as conn:
+        rows, _ = api.run_read_query(connection=conn, query=query, arrow=True)
+    adapter = TypeAdapter(list[Transaction])
+    records = adapter.validate_python([dict(zip(query.schema.names, row)) for row in rows])
+    return adapter.dump_json(records, exclude_unset=True)
+
+
+def serialize_with_sqlite(query: api.ReadQuery) -> bytes:
+    """Reads the rows as JSON objects built by SQLite and joins them into the response body."""
+    return api.read_query_response(query=query, arrow=False).body
+
+
+def time_runs(serialize, runs: int) -> tuple[float, bytes]:
+    """Returns the median wall-clock time of the given number of runs after one warm-up, and
+        the body of the last run."""
+    body = serialize()
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        body = serialize()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000], help='Rows in each table')
+    parser.add_argument('--runs', type=int, default=3, help='Timed runs of each serializer')
+    args = parser.parse_args()
+
+    query = api.transactions_query()
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.rows:
+            api.engine = create_database_engine(f'sqlite:///{os.path.join(directory, f"{rows}.db")}')
+            with api.engine.begin() as conn:
+                sync_table(conn=conn, table='Transaction_Log', df=make_sheet(rows), mode='full')
+            model, model_body = time_runs(lambda: serialize_with_model(query), runs=args.runs)
+            sqlite, sqlite_body = time_runs(lambda: serialize_with_sqlite(query), runs=args.runs)
+            api.engine.dispose()
+            print(f'{rows} rows, {len(sqlite_body) / 2 ** 20:.1f} MiB')
+            print(f'  model:  {model:.2f} s')
+            print(f'  sqlite: {sqlite:.2f} s ({model / sqlite:.1f}x)')
+            print(f'  identical: {model_body == sqlite_body}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from urllib.parse import urlencode
+
+
+@dataclass
+class CachedResponse:
+    """A response body as it was sent, along with its headers."""
+    body: bytes
+    headers: dict[str, str]
+
+
+def make_etag(key: tuple) -> str:
+    """Derives the ETag of a response from its cache key. The key includes the data version,
+        so the ETag changes whenever a refresh changes the data.
+
+    Args:
+        - key (tuple): Key from ResponseCache.make_key
+
+    Returns:
+        - str: The quoted ETag
+    """
+    return f'"{hashlib.sha256(repr(key).encode()).hexdigest()[:32]}"'
+
+
+def etag_matches(etag: str, if_none_match: str | None) -> bool:
+    """Checks an If-None-Match header against an ETag, using the weak comparison that the
+        header calls for.
+
+    Args:
+        - etag (str): The quoted ETag of the current response
+        - if_none_match (str | None): The If-None-Match header, if any
+
+    Returns:
+        - bool: Whether the client already has the current response
+    """
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+    return '*' in tags or etag in tags
+
+
+class ResponseCache:
+    """Keeps recently served responses in memory, evicting the least recently used ones once
+        their bodies add up to more than the size limit. Keys include the data version, so
+        responses cached before a refresh are never served after it.
+
+    Args:
+        - max_bytes (int): Total size of the cached bodies to keep
+        - max_entry_bytes (int): Size of the largest body to cache, so one large response
+            can't be buffered in full or push every other entry out
+    """
+    def __init__(self, max_bytes: int, max_entry_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, CachedResponse] = OrderedDict()
+        self._size = 0
+
+    def make_key(self, path: str, query: list[tuple[str, str]], accept: str | None) -> tuple:
+        """Builds the key of a request for the current data version. Query parameters are
+            sorted by name and blank ones dropped, so the same request spelled differently
+            shares an entry; repeated parameters keep their order, since it can matter.
+
+        Args:
+            - path (str): The request path
+            - query (list[tuple[str, str]]): The query parameters, in request order
+            - accept (str | None): The Accept header, which selects the response format
+
+        Returns:
+            - tuple: The cache key
+        """
+        params = sorted(((name, value) for name, value in query if value != ''), key=lambda item: item[0])
+        return (self.version, path, urlencode(params), accept or '')
+
+    def get(self, key: tuple) -> CachedResponse | None:
+        """Looks up a response and counts the lookup as a hit or a miss.
+
+        Args:
+            - key (tuple): Key from make_key
+
+        Returns:
+            - CachedResponse | None: The cached response, or None if it isn't cached
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: tuple, entry: CachedResponse):
+        """Caches a response, unless it is larger than the entry size limit or the data has
+            been refreshed since its key was made.
+
+        Args:
+            - key (tuple): Key from make_key
+            - entry (CachedResponse): The response to cache
+        """
+        with self._lock:
+            if key[0] != self.version or len(entry.body) > self.max_entry_bytes:
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous.body)
+            self._entries[key] = entry
+            self._size += len(entry.body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.body)
+
+    def set_version(self, version: int):
+        """Moves the cache to a new data version, dropping every response cached for an
+            earlier one.
+
+        Args:
+            - version (int): The data version now in the database
+        """
+        with self._lock:
+            self.version = version
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        """Returns the hit and miss counters and how much of the size limit is in use."""
+        with self._lock:
+            return {
+                'version': self.version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'max_entry_bytes': self.max_entry_bytes
+            }
@@ -0,0 +1,673 @@
+import json
+import uuid
+import logging
+import datetime
+import pandas as pd
+from sqlalchemy import Connection, Engine, create_engine, event, inspect, text
+
+logger = logging.getLogger()
+
+# Explicit schemas for the known sheets. Money is stored in integer cents so it sums exactly.
+# Key columns identify a row: a row whose key columns are unchanged but whose other columns
+# differ (e.g. a re-categorized transaction) is treated as an update. Indexes are built on each
+# load before the table is swapped in. A rollup is a summary table of monthly totals for each
+# combination of its dimensions, kept up to date as the table is synced.
+TABLE_SCHEMAS = {
+    'Transaction_Log': {
+        'columns': {
+            'Date': 'TEXT NOT NULL CHECK ("Date" IS date("Date"))',
+            'Merchant': 'TEXT',
+            'Amount': 'INTEGER',
+            'Group': 'TEXT',
+            'Category': 'TEXT',
+            'Subcategory': 'TEXT',
+            'Account': 'TEXT'
+        },
+        'cents_columns': ['Amount'],
+        'key_columns': ['Date', 'Merchant', 'Amount', 'Account'],
+        'indexes': [
+            ['Date'],
+            ['Group', 'Category', 'Subcategory'],
+            ['Category', 'Subcategory'],
+            ['Merchant'],
+            ['Account']
+        ],
+        'rollup': {
+            'table': 'Transaction_Log_Monthly',
+            'dimensions': ['Group', 'Category', 'Subcategory', 'Account'],
+            'sum_columns': ['Amount']
+        },
+        'search': {
+            'table': 'Merchant_Search',
+            'column': 'Merchant'
+        }
+    },
+    'Net_Worth_Log': {
+        'columns': {
+            'Date': 'TEXT NOT NULL CHECK ("Date" IS date("Date"))',
+            'Account': 'TEXT NOT NULL',
+            'Category': 'TEXT',
+            'Subcategory': 'TEXT',
+            'Balance': 'INTEGER'
+        },
+        'cents_columns': ['Balance'],
+        'key_columns': ['Date', 'Account'],
+        'indexes': [['Date'], ['Account', 'Date']]
+    }
+}
+
+# Remembers what each sheet looked like when it was last synced, so unchanged sheets can be
+# skipped on the next refresh
+SYNC_STATE_TABLE = 'Sync_State'
+
+# Counts the refreshes that changed the data, so anything derived from it can tell when it is
+# out of date. Stored in the database so the count survives restarts.
+DATA_VERSION_TABLE = 'Data_Version'
+
+
+def create_database_engine(url: str) -> Engine:
+    """Creates a SQLite engine that runs in WAL mode, so readers keep seeing the last committed
+        snapshot while a refresh is writing, and that wraps every transaction (including DDL)
+        in an explicit BEGIN.
+
+    Args:
+        - url (str): The SQLAlchemy database URL
+
+    Returns:
+        - Engine: The configured engine
+    """
+    engine = create_engine(url, connect_args={'check_same_thread': False})
+
+    @event.listens_for(engine, 'connect')
+    def configure_connection(dbapi_connection, _connection_record):
+        # Stop the sqlite3 driver from managing transactions itself, since it leaves DDL such
+        # as DROP TABLE and ALTER TABLE outside of the transaction
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute('PRAGMA busy_timeout=5000')
+        cursor.close()
+
+    @event.listens_for(engine, 'begin')
+    def begin_transaction(conn):
+        conn.exec_driver_sql('BEGIN')
+
+    return engine
+
+
+def get_table_schema(table: str, df: pd.DataFrame) -> dict:
+    """Returns the schema for a table, inferring one from the sheet data for sheets that do not
+        have an explicit schema.
+
+    Args:
+        - table (str): Name of the table
+        - df (pd.DataFrame): The sheet data
+
+    Returns:
+        - dict: The table's column types, key columns and indexes
+    """
+    if table in TABLE_SCHEMAS:
+        return TABLE_SCHEMAS[table]
+    columns = {}
+    for column, dtype in df.dtypes.items():
+        if pd.api.types.is_integer_dtype(dtype):
+            columns[column] = 'INTEGER'
+        elif pd.api.types.is_float_dtype(dtype):
+            columns[column] = 'REAL'
+        else:
+            columns[column] = 'TEXT'
+    return {'columns': columns, 'cents_columns': [], 'key_columns': list(columns), 'indexes': []}
+
+
+def create_table_sql(table: str, schema: dict) -> str:
+    """Builds the CREATE TABLE statement for a table. Row_Id is the primary key and follows the
+        order rows were written in. A full sync writes the sheet in order, but an incremental
+        sync gives the rows it inserts or updates new, higher Row_Ids, so Row_Id only keeps
+        sheet order until then. It stays unique and stable between syncs, which is all the
+        (Date, Row_Id) order of paginated reads relies on.
+
+    Args:
+        - table (str): Name of the table
+        - schema (dict): The table's schema
+
+    Returns:
+        - str: The CREATE TABLE statement
+    """
+    column_definitions = [
+        '"Row_Id" INTEGER PRIMARY KEY',
+        '"Row_Key" INTEGER NOT NULL UNIQUE',
+        '"Row_Hash" INTEGER NOT NULL'
+    ]
+    column_definitions += [f'"{column}" {column_type}' for column, column_type in schema['columns'].items()]
+    return f'CREATE TABLE "{table}" ({", ".join(column_definitions)})'
+
+
+def get_table_sql(conn: Connection, table: str) -> str | None:
+    """Reads the CREATE TABLE statement a table was created with.
+
+    Args:
+        - conn (Connection): An open database connection
+        - table (str): Name of the table
+
+    Returns:
+        - str | None: The CREATE TABLE statement, or None if the table doesn't exist
+    """
+    return conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :table"),
+        {'table': table}
+    ).scalar_one_or_none()
+
+
+def table_matches_schema(conn: Connection, table: str) -> bool:
+    """Checks whether a table exists and was created the way this version of the API creates
+        it. A table with an explicit schema has to match it exactly. An inferred schema
+        depends on the sheet data, so other tables only need the fingerprint columns.
+
+    Args:
+        - conn (Connection): An open database connection
+        - table (str): Name of the table
+
+    Returns:
+        - bool: Whether the table is up to date with its schema
+    """
+    existing_sql = get_table_sql(conn, table)
+    if existing_sql is None:
+        return False
+    if table in TABLE_SCHEMAS:
+        return existing_sql == create_table_sql(table, TABLE_SCHEMAS[table])
+    fingerprint_sql = create_table_sql(table, {'columns': {}})
+    return existing_sql.startswith(f'{fingerprint_sql[:-1]}, ')
+
+
+def apply_table_schema(df: pd.DataFrame, schema: dict) -> pd.DataFrame:
+    """Selects the schema's columns from the sheet data and coerces them to the schema's types.
+        Dates are stored as ISO-8601 (YYYY-MM-DD) text so they sort and compare correctly, and
+        dollar amounts are stored as integer cents. Rows missing a value that the schema
+        requires, such as a blank or unreadable date, are skipped and logged rather than
+        failing the whole refresh.
+
+    Args:
+        - df (pd.DataFrame): The sheet data
+        - schema (dict): The table's schema
+
+    Returns:
+        - pd.DataFrame: The typed sheet data
+
+    Raises:
+        - ValueError: If the sheet is missing a column from the schema.
+    """
+    missing_columns = [column for column in schema['columns'] if column not in df.columns]
+    if missing_columns:
+        raise ValueError(f'Sheet is missing columns: {", ".join(missing_columns)}')
+    df = df.dropna(how='all')[list(schema['columns'])].copy()
+    for column, column_type in schema['columns'].items():
+        if column == 'Date':
+            df[column] = pd.to_datetime(df[column], errors='coerce').dt.strftime('%Y-%m-%d')
+        elif column in schema['cents_columns']:
+            dollars = pd.to_numeric(df[column], errors='coerce')
+            df[column] = (dollars * 100).round().astype('Int64')
+        elif column_type.startswith('REAL'):
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype(float)
+        elif column_type.startswith('TEXT'):
+            df[column] = df[column].astype(object).where(df[column].notna(), None)
+
+    required_columns = [column for column, column_type in schema['columns'].items() if 'NOT NULL' in column_type]
+    is_incomplete = df[required_columns].isna().any(axis=1)
+    if is_incomplete.any():
+        # The export's first line is the header, so row labels are off by two from sheet rows
+        logger.warning(
+            'Skipping %d rows missing a value for %s, at sheet rows %s',
+            is_incomplete.sum(),
+            ', '.join(required_columns),
+            (df.index[is_incomplete][:10] + 2).tolist()
+        )
+        df = df[~is_incomplete]
+    return df
+
+
+def cents_to_text_sql(column: str) -> str:
+    """Builds a SQL expression that formats an integer cents column the same way as
+        utils.format_cents (e.g. -1234 -> "-12.34"), so rows can be serialized inside SQLite.
+
+    Args:
+        - column (str): Name of the cents column
+
+    Returns:
+        - str: The SQL expression
+    """
+    return (
+        f'CASE WHEN "{column}" IS NULL THEN NULL ELSE printf(\'%s%d.%02d\', '
+        f'CASE WHEN "{column}" < 0 THEN \'-\' ELSE \'\' END, abs("{column}") / 100, abs("{column}") % 100) END'
+    )
+
+
+def date_bucket_sql(column: str, bucket: str) -> str:
+    """Builds a SQL expression that truncates an ISO date column to the first day of its day,
+        week (starting on Monday), month, quarter or year, so rows can be grouped into time
+        buckets.
+
+    Args:
+        - column (str): Name of the date column
+        - bucket (str): The time bucket ("day", "week", "month", "quarter" or "year")
+
+    Returns:
+        - str: The SQL expression
+    """
+    if bucket == 'day':
+        return f'"{column}"'
+    if bucket == 'week':
+        return f'date("{column}", \'weekday 0\', \'-6 days\')'
+    if bucket == 'month':
+        return f'strftime(\'%Y-%m-01\', "{column}")'
+    if bucket == 'quarter':
+        return (
+            f'printf(\'%s-%02d-01\', strftime(\'%Y\', "{column}"), '
+            f'(CAST(strftime(\'%m\', "{column}") AS INTEGER) - 1) / 3 * 3 + 1)'
+        )
+    if bucket == 'year':
+        return f'strftime(\'%Y-01-01\', "{column}")'
+    raise ValueError(f'Unknown time bucket: {bucket}')
+
+
+def json_object_sql(fields: dict[str, str]) -> str:
+    """Builds a SQL json_object() expression that serializes a row to a JSON object.
+
+    Args:
+        - fields (dict[str, str]): SQL expression for each JSON key, in output order
+
+    Returns:
+        - str: The SQL expression
+    """
+    pairs = ', '.join(f"'{key}', {expression}" for key, expression in fields.items())
+    return f'json_object({pairs})'
+
+
+def add_row_fingerprints(df: pd.DataFrame, key_columns: list[str]) -> pd.DataFrame:
+    """Adds a Row_Key column identifying each row and a Row_Hash column fingerprinting its
+        contents. Both are stable across refreshes as long as the row itself is unchanged.
+
+    Args:
+        - df (pd.DataFrame): The sheet data
+        - key_columns (list[str]): Columns that identify a row
+
+    Returns:
+        - pd.DataFrame: The sheet data with Row_Key and Row_Hash columns added
+    """
+    df = df.reset_index(drop=True)
+    key_hash = pd.util.hash_pandas_object(df[key_columns], index=False)
+
+    # Identical rows are legitimate (e.g. two coffees on the same day), so number repeated keys
+    # in sheet order to give each one its own Row_Key
+    occurrence = key_hash.groupby(key_hash).cumcount()
+    row_key = pd.util.hash_pandas_object(
+        pd.DataFrame({'key': key_hash, 'occurrence': occurrence}),
+        index=False
+    )
+    row_hash = pd.util.hash_pandas_object(df, index=False)
+
+    # SQLite integers are signed 64-bit, so reinterpret the unsigned hashes
+    df['Row_Key'] = row_key.to_numpy().view('int64')
+    df['Row_Hash'] = row_hash.to_numpy().view('int64')
+    return df
+
+
+def replace_table(conn: Connection, table: str, df: pd.DataFrame, schema: dict) -> dict:
+    """Loads the given DataFrame into a staging table, builds its indexes, and then renames it
+        over the live table. Run inside a transaction so readers see either the old table or the
+        new one, never a partially written table.
+
+    Args:
+        - conn (Connection): An open database connection inside a transaction
+        - table (str): Name of the table to replace
+        - df (pd.DataFrame): The data to write, including fingerprint columns
+        - schema (dict): The table's schema
+
+    Returns:
+        - dict: Row counts for each kind of change
+    """
+    staging_table = f'{table}_Staging'
+    conn.execute(text(f'DROP TABLE IF EXISTS "{staging_table}"'))
+    conn.execute(text(create_table_sql(staging_table, schema)))
+    insert_rows(conn, staging_table, df)
+
+    # Index names must be unique across the database and keep their name when the table is
+    # renamed, so give each load's indexes their own suffix
+    suffix = uuid.uuid4().hex[:8]
+    for columns in schema['indexes']:
+        index_name = f'ix_{table}_{"_".join(columns)}_{suffix}'
+        column_list = ', '.join(f'"{column}"' for column in columns)
+        conn.execute(text(f'CREATE INDEX "{index_name}" ON "{staging_table}" ({column_list})'))
+
+    previous_rows = 0
+    if inspect(conn).has_table(table):
+        previous_rows = conn.execute(text(f'SELECT COUNT(*) FROM "{table}"')).scalar_one()
+        conn.execute(text(f'DROP TABLE "{table}"'))
+    conn.execute(text(f'ALTER TABLE "{staging_table}" RENAME TO "{table}"'))
+    return {'inserted': len(df), 'updated': 0, 'deleted': previous_rows, 'unchanged': 0}
+
+
+def insert_rows(conn: Connection, table: str, df: pd.DataFrame):
+    """Inserts every row of a DataFrame into a table whose columns match the DataFrame's.
+
+    Args:
+        - conn (Connection): An open database connection inside a transaction
+        - table (str): Name of the table
+        - df (pd.DataFrame): The rows to insert
+    """
+    column_list = ', '.join(f'"{column}"' for column in df.columns)
+    placeholders = ', '.join('?' for _ in df.columns)
+    rows = df.astype(object).where(df.notna(), None)
+    conn.exec_driver_sql(
+        f'INSERT INTO "{table}" ({column_list}) VALUES ({placeholders})',
+        list(rows.itertuples(index=False, name=None))
+    )
+
+
+def sync_table(conn: Connection, table: str, df: pd.DataFrame, mode: str = 'incremental') -> dict:
+    """Brings a table in line with the latest sheet data. In incremental mode only rows that
+        were inserted, deleted or changed since the last refresh are written. Falls back to a
+        full replace when the table is missing or was created with a different schema.
+
+    Args:
+        - conn (Connection): An open database connection inside a transaction
+        - table (str): Name of the table to sync
+        - df (pd.DataFrame): The latest sheet data
+        - mode (str): Either "incremental" or "full"
+
+    Returns:
+        - dict: The sync mode used and row counts for each kind of change
+    """
+    schema = get_table_schema(table, df)
+    df = apply_table_schema(df, schema)
+    df = add_row_fingerprints(df, schema['key_columns'])
+
+    rollup = schema.get('rollup')
+    search = schema.get('search')
+    if mode == 'incremental':
+        if get_table_sql(conn, table) == create_table_sql(table, schema):
+            rollup_exists = rollup is not None and inspect(conn).has_table(rollup['table'])
+            counts = apply_row_delta(conn, table, df, rollup=rollup if rollup_exists else None)
+            if rollup and not rollup_exists:
+                build_rollup(conn, table, rollup)
+            if search:
+                build_search_index(conn, table, search)
+            return {'mode': 'incremental', **counts}
+    counts = replace_table(conn, table, df, schema)
+    if rollup:
+        build_rollup(conn, table, rollup)
+    if search:
+        build_search_index(conn, table, search)
+    return {'mode': 'full', **counts}
+
+
+def apply_row_delta(conn: Connection, table: str, df: pd.DataFrame, rollup: dict | None = None) -> dict:
+    """Compares fingerprinted sheet data against a table and writes only the difference. When
+        the table has a rollup, only the months with a changed row are recomputed in it.
+
+    Args:
+        - conn (Connection): An open database connection inside a transaction
+        - table (str): Name of the table to update
+        - df (pd.DataFrame): The latest sheet data, including fingerprint columns
+        - rollup (dict): The table's rollup, if it has one
+
+    Returns:
+        - dict: Row counts for each kind of change
+    """
+    existing = pd.read_sql(text(f'SELECT Row_Key, Row_Hash FROM "{table}"'), conn)
+    previous_hashes = existing.set_index('Row_Key')['Row_Hash']
+    is_known = df['Row_Key'].isin(existing['Row_Key'])
+    inserted = df[~is_known]
+    unchanged_or_updated = df[is_known]
+    updated = unchanged_or_updated[
+        unchanged_or_updated['Row_Hash'].to_numpy()
+        != previous_hashes.loc[unchanged_or_updated['Row_Key']].to_numpy()
+    ]
+    deleted = existing[~existing['Row_Key'].isin(df['Row_Key'])]
+
+    # Updated rows are rewritten in full, so they are removed along with the deleted rows
+    removed_keys = pd.concat([deleted['Row_Key'], updated['Row_Key']])
+    added_rows = pd.concat([inserted, updated])
+    changed_months = set()
+    if rollup and not removed_keys.empty:
+        # The months of removed rows have to be read before the rows are gone
+        changed_months.update(conn.execute(
+            text(f"""
+                SELECT DISTINCT strftime('%Y-%m-01', "Date") FROM "{table}"
+                WHERE Row_Key IN (SELECT value FROM json_each(:keys))
+            """),
+            {'keys': json.dumps([int(key) for key in removed_keys])}
+        ).scalars())
+    if rollup:
+        changed_months.update(added_rows['Date'].str[:7] + '-01')
+    if not removed_keys.empty:
+        conn.execute(
+            text(f'DELETE FROM "{table}" WHERE Row_Key = :key'),
+            [{'key': int(key)} for key in removed_keys]
+        )
+    if not added_rows.empty:
+        insert_rows(conn, table, added_rows)
+    if changed_months:
+        update_rollup(conn, table, rollup, sorted(changed_months))
+
+    return {
+        'inserted': len(inserted),
+        'updated': len(updated),
+        'deleted': len(deleted),
+        'unchanged': len(unchanged_or_updated) - len(updated)
+    }
+
+
+def rollup_insert_sql(table: str, rollup: dict) -> str:
+    """Builds the statement that adds a table's monthly totals to its rollup. A WHERE clause
+        can be appended before the GROUP BY to limit which rows are summed.
+
+    Args:
+        - table (str): Name of the table being summarized
+        - rollup (dict): The table's rollup
+
+    Returns:
+        - str: The INSERT statement, with a "{where}" placeholder for the WHERE clause
+    """
+    dimensions = ', '.join(f'"{column}"' for column in rollup['dimensions'])
+    sum_columns = ', '.join(f'"{column}"' for column in rollup['sum_columns'])
+    sums = ', '.join(f'SUM("{column}")' for column in rollup['sum_columns'])
+    return (
+        f'INSERT INTO "{rollup["table"]}" ("Month", {dimensions}, {sum_columns}, "Count") '
+        f'SELECT strftime(\'%Y-%m-01\', "Date"), {dimensions}, {sums}, COUNT(*) FROM "{table}" '
+        f'{{where}} GROUP BY 1, {dimensions}'
+    )
+
+
+def build_rollup(conn: Connection, table: str, rollup: dict):
+    """Rebuilds a table's rollup of monthly totals from scratch.
+
+    Args:
+        - conn (Connection): An open database connection inside a transaction
+        - table (str): Name of the table being summarized
+        - rollup (dict): The table's rollup
+    """
+    column_definitions = ['"Month" TEXT NOT NULL']
+    column_definitions += [f'"{column}" TEXT' for column in rollup['dimensions']]
+    column_definitions += [f'"{column}" INTEGER' for column in rollup['sum_columns']]
+    column_definitions.append('"Count" INTEGER NOT NULL')
+    conn.execute(text(f'DROP TABLE IF EXISTS "{rollup["table"]}"'))
+    conn.execute(text(f'CREATE TABLE "{rollup["table"]}" ({", ".join(column_definitions)})'))
+    conn.execute(text(rollup_insert_sql(table, rollup).format(where='')))
+    conn.execute(text(f'CREATE INDEX "ix_{rollup["table"]}_Month" ON "{rollup["table"]}" ("Month")'))
+
+
+def update_rollup(conn: Connection, table: str, rollup: dict, months: list[str]):
+    """Recomputes the given months of a table's rollup, reading only those months' rows.
+
+    Args:
+        - conn (Connection): An open database connection inside a transaction
+        - table (str): Name of the table being summarized
+        - rollup (dict): The table's rollup
+        - months (list[str]): First day of each month to recompute (YYYY-MM-01)
+    """
+    params = [{'month': month} for month in months]
+    conn.execute(text(f'DELETE FROM "{rollup["table"]}" WHERE "Month" = :month'), params)
+    where = 'WHERE "Date" >= :month AND "Date" < date(:month, \'+1 month\')'
+    conn.execute(text(rollup_insert_sql(table, rollup).format(where=where)), params)
+
+
+def build_missing_rollups(conn: Connection):
+    """Builds the rollups of synced tables that don't have one yet, such as tables synced before
+        their rollup was added, since an unchanged sheet is never synced again. Tables created
+        from an older schema are left until their sheet is synced again, which migrates them
+        and rebuilds their rollup.
+
+    Args:
+        - conn (Connection): An open database connection inside a transaction
+    """
+    inspector = inspect(conn)
+    for table, schema in TABLE_SCHEMAS.items():
+        rollup = schema.get('rollup')
+        if rollup and table_matches_schema(conn, table) and not inspector.has_table(rollup['table']):
+            build_rollup(conn, table, rollup)
+
+
+def build_search_index(conn: Connection, table: str, search: dict):
+    """Rebuilds the full-text index of a column's distinct values, along with how many rows
+        have each value. Values are split into trigrams, so the index can find them by any
+        part of three or more characters, not just by whole words.
+
+    Args:
+        - conn (Connection): An open database connection inside a transaction
+        - table (str): Name of the table being indexed
+        - search (dict): The table's search index
+    """
+    column = search['column']
+    conn.execute(text(f'DROP TABLE IF EXISTS "{search["table"]}"'))
+    conn.execute(text(
+        f'CREATE VIRTUAL TABLE "{search["table"]}" USING fts5("{column}", "Count" UNINDEXED, tokenize=\'trigram\')'
+    ))
+    conn.execute(text(
+        f'INSERT INTO "{search["table"]}" ("{column}", "Count") '
+        f'SELECT "{column}", COUNT(*) FROM "{table}" WHERE "{column}" IS NOT NULL GROUP BY "{column}"'
+    ))
+
+
+def build_missing_search_indexes(conn: Connection):
+    """Builds the search indexes of synced tables that don't have one yet, such as tables synced
+        before their search index was added. Tables created from an older schema are left until
+        their sheet is synced again.
+
+    Args:
+        - conn (Connection): An open database connection inside a transaction
+    """
+    inspector = inspect(conn)
+    for table, schema in TABLE_SCHEMAS.items():
+        search = schema.get('search')
+        if search and table_matches_schema(conn, table) and not inspector.has_table(search['table']):
+            build_search_index(conn, table, search)
+
+
+def load_sync_state(conn: Connection) -> dict[str, dict]:
+    """Reads the validators recorded for each sheet when it was last synced. Sheets whose table
+        is missing or was created from an older schema are left out, so the next refresh syncs
+        them again, migrating the table, even if their export is unchanged.
+
+    Args:
+        - conn (Connection): An open database connection
+
+    Returns:
+        - dict[str, dict]: The content hash, ETag and Last-Modified header, keyed by sheet name
+    """
+    if not inspect(conn).has_table(SYNC_STATE_TABLE):
+        return {}
+    rows = conn.execute(text(f'SELECT Sheet, Content_Hash, ETag, Last_Modified FROM {SYNC_STATE_TABLE}')).all()
+    return {
+        row.Sheet: {
+            'content_hash': row.Content_Hash,
+            'etag': row.ETag,
+            'last_modified': row.Last_Modified
+        }
+        for row in rows
+        if table_matches_schema(conn, row.Sheet)
+    }
+
+
+def save_sync_state(
+    conn: Connection,
+    sheet: str,
+    content_hash: str,
+    etag: str | None,
+    last_modified: str | None
+):
+    """Records the validators of a sheet that was just synced, or that was unchanged but sent
+        new validators. Run in the same transaction as the sync so the recorded state always
+        matches the table contents.
+
+    Args:
+        - conn (Connection): An open database connection inside a transaction
+        - sheet (str): Name of the sheet
+        - content_hash (str): Hash of the exported CSV
+        - etag (str | None): ETag header sent with the export, if any
+        - last_modified (str | None): Last-Modified header sent with the export, if any
+    """
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {SYNC_STATE_TABLE} (
+            Sheet TEXT PRIMARY KEY,
+            Content_Hash TEXT NOT NULL,
+            ETag TEXT,
+            Last_Modified TEXT,
+            Synced_At TEXT NOT NULL
+        )
+    """))
+    conn.execute(
+        text(f"""
+            INSERT INTO {SYNC_STATE_TABLE} (Sheet, Content_Hash, ETag, Last_Modified, Synced_At)
+            VALUES (:sheet, :content_hash, :etag, :last_modified, :synced_at)
+            ON CONFLICT (Sheet) DO UPDATE SET
+                Content_Hash = excluded.Content_Hash,
+                ETag = excluded.ETag,
+                Last_Modified = excluded.Last_Modified,
+                Synced_At = excluded.Synced_At
+        """),
+        {
+            'sheet': sheet,
+            'content_hash': content_hash,
+            'etag': etag,
+            'last_modified': last_modified,
+            'synced_at': datetime.datetime.now(datetime.timezone.utc).isoformat()
+        }
+    )
+
+
+def load_data_version(conn: Connection) -> int:
+    """Reads the current data version.
+
+    Args:
+        - conn (Connection): An open database connection
+
+    Returns:
+        - int: The data version, or 0 if the data has never been synced
+    """
+    if not inspect(conn).has_table(DATA_VERSION_TABLE):
+        return 0
+    return conn.execute(text(f'SELECT Version FROM {DATA_VERSION_TABLE}')).scalar_one_or_none() or 0
+
+
+def increment_data_version(conn: Connection) -> int:
+    """Moves the data version forward. Run in the same transaction as the sync that changed
+        the data, so the version always matches the table contents.
+
+    Args:
+        - conn (Connection): An open database connection inside a transaction
+
+    Returns:
+        - int: The new data version
+    """
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {DATA_VERSION_TABLE} (
+            Id INTEGER PRIMARY KEY CHECK (Id = 1),
+            Version INTEGER NOT NULL
+        )
+    """))
+    conn.execute(text(f"""
+        INSERT INTO {DATA_VERSION_TABLE} (Id, Version) VALUES (1, 1)
+        ON CONFLICT (Id) DO UPDATE SET Version = Version + 1
+    """))
+    return load_data_version(conn)
@@ -0,0 +1,130 @@
+import uuid
+import time
+import logging
+import datetime
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+from utils import RefreshMode, RefreshPhase
+from models import RefreshJob, SheetSyncResult
+
+logger = logging.getLogger()
+
+
+class RefreshJobManager:
+    """Runs refreshes on a background thread and keeps track of their progress. Only one
+        refresh runs at a time; a refresh requested while another is running joins the running
+        job instead of starting a second download, unless it is a full refresh and the running
+        one is not. Then it is queued to run once the running job finishes.
+
+    Args:
+        - refresh (Callable): Function that performs a refresh. Called with the refresh mode and
+            a callback that it should call with each RefreshPhase it enters.
+        - max_jobs (int): Number of finished jobs to remember for status lookups
+    """
+    def __init__(self, refresh: Callable[..., list[dict]], max_jobs: int = 20):
+        self._refresh = refresh
+        self._max_jobs = max_jobs
+        self._lock = threading.Lock()
+        self._jobs: OrderedDict[str, RefreshJob] = OrderedDict()
+        self._active_job_id: str | None = None
+        self._queued_job_id: str | None = None
+        self._phase_started = 0.0
+        self._queued_at = 0.0
+        self.last_succeeded_at: datetime.datetime | None = None
+
+    def submit(self, mode: RefreshMode = RefreshMode.incremental) -> RefreshJob:
+        """Starts a refresh in the background, or returns the refresh that is already running.
+            A full refresh requested while an incremental one is running is queued behind it
+            instead, so it isn't dropped; further requests for a full refresh join that job.
+
+        Args:
+            - mode (RefreshMode): Sync mode for the refresh
+
+        Returns:
+            - RefreshJob: A snapshot of the new, queued or running job
+        """
+        with self._lock:
+            if self._active_job_id is not None:
+                active = self._jobs[self._active_job_id]
+                if mode != RefreshMode.full or active.mode == RefreshMode.full.value:
+                    return active.model_copy(deep=True)
+                if self._queued_job_id is None:
+                    self._queued_job_id = self._add_job(mode).id
+                    self._queued_at = time.perf_counter()
+                return self._jobs[self._queued_job_id].model_copy(deep=True)
+            job = self._add_job(mode)
+            self._active_job_id = job.id
+            self._phase_started = time.perf_counter()
+            snapshot = job.model_copy(deep=True)
+        threading.Thread(target=self._run, args=(job, mode), daemon=True).start()
+        return snapshot
+
+    def _add_job(self, mode: RefreshMode) -> RefreshJob:
+        """Records a new job in the queued phase, forgetting the oldest jobs past the limit.
+            Called with the lock held."""
+        job = RefreshJob(
+            id=uuid.uuid4().hex,
+            mode=mode.value,
+            phase=RefreshPhase.queued.value,
+            created_at=datetime.datetime.now(datetime.timezone.utc)
+        )
+        self._jobs[job.id] = job
+        while len(self._jobs) > self._max_jobs:
+            self._jobs.popitem(last=False)
+        return job
+
+    def get(self, job_id: str) -> RefreshJob | None:
+        """Looks up a job by its id.
+
+        Args:
+            - job_id (str): The job id returned when the refresh was submitted
+
+        Returns:
+            - RefreshJob | None: A snapshot of the job, or None if it is unknown
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.model_copy(deep=True) if job else None
+
+    def get_active(self) -> RefreshJob | None:
+        """Returns a snapshot of the running job, or None if no refresh is running."""
+        with self._lock:
+            if self._active_job_id is None:
+                return None
+            return self._jobs[self._active_job_id].model_copy(deep=True)
+
+    def _set_phase(self, job: RefreshJob, phase: RefreshPhase):
+        """Records how long the job spent in its current phase and moves it to the next one."""
+        with self._lock:
+            now = time.perf_counter()
+            job.timings[job.phase] = round(now - self._phase_started, 3)
+            job.phase = phase.value
+            self._phase_started = now
+
+    def _run(self, job: RefreshJob, mode: RefreshMode):
+        """Runs the refresh for a job and records its outcome."""
+        try:
+            results = self._refresh(mode=mode, on_phase=lambda phase: self._set_phase(job, phase))
+            with self._lock:
+                job.results = [SheetSyncResult(**result) for result in results]
+                self.last_succeeded_at = datetime.datetime.now(datetime.timezone.utc)
+            self._set_phase(job, RefreshPhase.succeeded)
+        except Exception as e:
+            logger.exception('Refresh job %s failed', job.id)
+            with self._lock:
+                job.error = str(e)
+            self._set_phase(job, RefreshPhase.failed)
+        finally:
+            with self._lock:
+                job.finished_at = datetime.datetime.now(datetime.timezone.utc)
+                self._active_job_id = None
+                next_job = self._jobs.get(self._queued_job_id) if self._queued_job_id else None
+                self._queued_job_id = None
+                if next_job is not None:
+                    # The queued job's time in the queue counts toward its queued phase
+                    self._active_job_id = next_job.id
+                    self._phase_started = self._queued_at
+            if next_job is not None:
+                threading.Thread(target=self._run, args=(next_job, RefreshMode(next_job.mode)), daemon=True).start()
@@ -1,13 +1,72 @@
 import os
 import sys
+import json
+import difflib
+import datetime
 import logging
+import functools
+import pyarrow as pa
+from typing import Annotated, Callable, Iterator
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+from pydantic import Field, ValidationError, validate_call
+from sqlalchemy import Connection, inspect, text
 
-from utils import get_sheets_data, Operator
-from models import Transaction, NetWorthDetail, NetWorthAggregate
+from utils import (
+    get_all_sheets_data,
+    covers_whole_months,
+    decode_cursor,
+    downsample_rows,
+    encode_cursor,
+    to_arrow_ipc,
+    Aggregate,
+    NetWorthAggregation,
+    NetWorthDimension,
+    OneOrMany,
+    Operator,
+    RefreshMode,
+    ReadQuery,
+    RefreshPhase,
+    SheetData,
+    SortOrder,
+    TextMatch,
+    TimeBucket,
+    TransactionDimension
+)
+from models import (
+    Transaction,
+    TransactionAggregate,
+    TransactionFacets,
+    MerchantSuggestion,
+    NetWorthDetail,
+    NetWorthAggregate,
+    NetWorthSnapshot,
+    NetWorthPoint,
+    RefreshJob,
+    BatchRequest,
+    BATCH_ARROW_SCHEMA,
+    TRANSACTION_ARROW_SCHEMA,
+    NET_WORTH_DETAIL_ARROW_SCHEMA,
+    NET_WORTH_AGGREGATE_ARROW_SCHEMA
+)
+from database import (
+    create_database_engine,
+    cents_to_text_sql,
+    date_bucket_sql,
+    json_object_sql,
+    build_missing_rollups,
+    build_missing_search_indexes,
+    increment_data_version,
+    load_data_version,
+    load_sync_state,
+    TABLE_SCHEMAS,
+    save_sync_state,
+    sync_table
+)
+from jobs import RefreshJobManager
+from cache import CachedResponse, ResponseCache, etag_matches, make_etag
 
 # Load environment variables from .env file
 load_dotenv()
@@ -20,131 +79,1264 @@ formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(messag
 handler.setFormatter(formatter)
 logger.addHandler(handler)
 
-engine = create_engine('sqlite:///./database.db', connect_args={'check_same_thread': False})
+# The Docker image keeps the database on a volume, so it outlives the container
+DATABASE_PATH = os.environ.get('DATABASE_PATH', './database.db')
+engine = create_database_engine(f'sqlite:///{DATABASE_PATH}')
 
+# Serialized responses of the read endpoints, reused until the next refresh changes the data
+response_cache = ResponseCache(
+    max_bytes=int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+    max_entry_bytes=int(os.environ.get('RESPONSE_CACHE_MAX_ENTRY_BYTES', 4 * 1024 * 1024))
+)
+CACHED_PATHS = {
+    '/transactions',
+    '/transactions/aggregate',
+    '/transactions/facets',
+    '/transactions/merchants',
+    '/networth-detailed',
+    '/networth-aggregated',
+    '/networth/latest',
+    '/networth/as-of',
+    '/networth/timeseries'
+}
 
-def refresh_data():
-    """Reusable function to refresh Google Sheets data."""
-    sheets_to_read = ['Transaction_Log', 'Net_Worth_Log']
-    for sheet in sheets_to_read:
-        data = get_sheets_data(
-            sheet_id=os.environ['SHEET_ID'],
-            sheet_name=sheet
+# SQL expressions that serialize a Transaction_Log row exactly like the Transaction model does
+TRANSACTION_JSON_FIELDS = {
+    'Date': '"Date"',
+    'Merchant': 'Merchant',
+    'Amount': cents_to_text_sql('Amount'),
+    'Group': '"Group"',
+    'Category': 'Category',
+    'Subcategory': 'Subcategory',
+    'Account': 'Account'
+}
+
+# SQL expressions that serialize a Net_Worth_Log row exactly like the NetWorthDetail model does
+NET_WORTH_DETAIL_JSON_FIELDS = {
+    'Date': '"Date"',
+    'Account': 'Account',
+    'Category': 'Category',
+    'Subcategory': 'Subcategory',
+    'Balance': cents_to_text_sql('Balance')
+}
+
+# Output column, SQL expression and Arrow type of each aggregate over a group of transactions.
+# The cumulative sum is a running total of the group's sums over time, computed by a window.
+# The count is filled in by the caller, since summing the rollup's counts replaces COUNT(*).
+AGGREGATE_COLUMNS = {
+    Aggregate.sum: ('Amount', 'SUM(Amount)', pa.decimal128(18, 2)),
+    Aggregate.count: ('Count', '{count}', pa.int64()),
+    Aggregate.cumsum: ('Cumulative', 'SUM(SUM(Amount)) OVER ({partition}ORDER BY {period})', pa.decimal128(18, 2))
+}
+
+# Summary table of monthly transaction totals, which aggregates read when they can
+TRANSACTION_ROLLUP_TABLE = TABLE_SCHEMAS['Transaction_Log']['rollup']['table']
+
+# SQL expression combining the balances recorded within a period into one
+NET_WORTH_AGGREGATIONS = {
+    NetWorthAggregation.last: 'Balance',
+    NetWorthAggregation.mean: 'CAST(ROUND(AVG(Balance)) AS INTEGER)',
+    NetWorthAggregation.max: 'MAX(Balance)'
+}
+
+# Selects the most recent Net_Worth_Log row of each account, up to an optional date condition.
+# Each account is found by seeking past the previous one on the (Account, Date) index, and its
+# latest row by seeking to the end of its dates, so neither reads the rest of the history.
+NET_WORTH_AS_OF_SQL = '''
+    WITH RECURSIVE accounts(Account) AS (
+        SELECT MIN(Account) FROM Net_Worth_Log
+        UNION ALL
+        SELECT (SELECT MIN(Account) FROM Net_Worth_Log WHERE Account > accounts.Account)
+        FROM accounts WHERE accounts.Account IS NOT NULL
+    )
+    SELECT {columns}
+    FROM Net_Worth_Log
+    WHERE Row_Id IN (
+        SELECT (
+            SELECT Row_Id FROM Net_Worth_Log
+            WHERE Account = accounts.Account{date_condition}
+            ORDER BY "Date" DESC LIMIT 1
         )
+        FROM accounts WHERE accounts.Account IS NOT NULL
+    )
+    ORDER BY Category, Subcategory, Account
+'''
+
+# Full-text index of the distinct merchants, which merchant searches read instead of the log
+MERCHANT_SEARCH_TABLE = TABLE_SCHEMAS['Transaction_Log']['search']['table']
+
+# Most merchants the search index is asked for before they are ranked for a suggestion list
+MAX_MERCHANT_CANDIDATES = 100
+
+# Media type of an Arrow IPC stream, which clients can ask for instead of JSON
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+
+# Sheets to copy into the database, as a comma-separated list of sheet names
+SHEET_NAMES = [
+    sheet.strip()
+    for sheet in os.environ.get('SHEET_NAMES', 'Transaction_Log,Net_Worth_Log').split(',')
+    if sheet.strip()
+]
+
+
+def refresh_data(
+    mode: RefreshMode = RefreshMode.incremental,
+    on_phase: Callable[[RefreshPhase], None] | None = None
+) -> list[dict]:
+    """Reusable function to refresh Google Sheets data.
+
+    Args:
+        - mode (RefreshMode): Whether to write only the rows that changed since the last
+            refresh (incremental) or rewrite each table (full)
+        - on_phase (Callable): Optional callback notified as the refresh moves between phases
+
+    Returns:
+        - list[dict]: The sync mode used and row counts for each kind of change, per sheet.
+            Sheets whose export has not changed since the last refresh are reported as
+            unchanged without being parsed or written. If any sheet was synced, the data
+            version moves forward and cached responses are dropped.
+    """
+    on_phase = on_phase or (lambda phase: None)
+
+    # A full refresh rewrites every table, so only an incremental one may skip unchanged sheets
+    previous = {}
+    if mode == RefreshMode.incremental:
         with engine.connect() as conn:
-            data.to_sql(
-                name=sheet,
-                con=conn,
-                if_exists='replace',
-                index=False
+            previous = {
+                sheet: SheetData(data=None, **state)
+                for sheet, state in load_sync_state(conn).items()
+            }
+
+    on_phase(RefreshPhase.fetching)
+    sheets_data = get_all_sheets_data(
+        sheet_id=os.environ['SHEET_ID'],
+        sheet_names=SHEET_NAMES,
+        previous=previous
+    )
+    results = {}
+    for sheet, sheet_data in sheets_data.items():
+        if sheet_data.data is None:
+            results[sheet] = {
+                'sheet': sheet,
+                'mode': mode.value,
+                'status': 'unchanged',
+                'inserted': 0,
+                'updated': 0,
+                'deleted': 0,
+                'unchanged': None
+            }
+    changed_sheets = [sheet for sheet in sheets_data if sheet not in results]
+    if not changed_sheets:
+        logger.info('No sheets changed since the last refresh')
+
+    # An unchanged sheet can still come with new validators, which have to be recorded for the
+    # next conditional request to be answered with a 304
+    revalidated_sheets = [
+        sheet
+        for sheet in results
+        if (sheets_data[sheet].etag, sheets_data[sheet].last_modified)
+        != (previous[sheet].etag, previous[sheet].last_modified)
+    ]
+
+    # Apply every sheet in one transaction so readers move from the old snapshot to the new one
+    # all at once
+    on_phase(RefreshPhase.syncing)
+    with engine.begin() as conn:
+        for sheet in changed_sheets:
+            sheet_data = sheets_data[sheet]
+            counts = sync_table(conn=conn, table=sheet, df=sheet_data.data, mode=mode)
+            save_sync_state(
+                conn=conn,
+                sheet=sheet,
+                content_hash=sheet_data.content_hash,
+                etag=sheet_data.etag,
+                last_modified=sheet_data.last_modified
+            )
+            logger.info('Synced %s: %s', sheet, counts)
+            results[sheet] = {'sheet': sheet, 'status': 'synced', **counts}
+        for sheet in revalidated_sheets:
+            sheet_data = sheets_data[sheet]
+            save_sync_state(
+                conn=conn,
+                sheet=sheet,
+                content_hash=sheet_data.content_hash,
+                etag=sheet_data.etag,
+                last_modified=sheet_data.last_modified
             )
+        build_missing_rollups(conn)
+        build_missing_search_indexes(conn)
+        if changed_sheets:
+            data_version = increment_data_version(conn)
+    # Only move the cache to the new version once it is committed, so a response cached under
+    # the new version can't have been read from the old data
+    if changed_sheets:
+        response_cache.set_version(data_version)
+    return [results[sheet] for sheet in sheets_data]
+
+
+def stream_json_rows(query: str, params: dict, ndjson: bool, chunk_size: int = 1000) -> Iterator[bytes]:
+    """Streams the JSON rows selected by a query from the database cursor in chunks, so memory
+        use does not grow with the size of the result.
+
+    Args:
+        - query (str): Query selecting one JSON object per row
+        - params (dict): Query parameters
+        - ndjson (bool): Write newline-delimited JSON instead of a JSON array
+        - chunk_size (int): Number of rows fetched from the cursor and written at a time
+
+    Returns:
+        - Iterator[bytes]: Chunks of the response body
+    """
+    with engine.connect() as connection:
+        result = connection.execution_options(yield_per=chunk_size).execute(text(query), params)
+        if not ndjson:
+            yield b'['
+        separator = ''
+        for rows in result.scalars().partitions(chunk_size):
+            if ndjson:
+                yield ('\n'.join(rows) + '\n').encode()
+            else:
+                yield (separator + ','.join(rows)).encode()
+                separator = ','
+        if not ndjson:
+            yield b']'
+
+
+def run_read_query(connection: Connection, query: ReadQuery, arrow: bool) -> tuple[list, str | None]:
+    """Runs a read query on an open connection, selecting either one JSON object per row or
+        the columns of its Arrow schema.
+
+    Args:
+        - connection (Connection): An open database connection
+        - query (ReadQuery): The query to run
+        - arrow (bool): Select the Arrow columns instead of JSON objects
+
+    Returns:
+        - tuple[list, str | None]: The rows, and the cursor to the next page if the query is
+            paginated and there is one
+    """
+    sql = query.arrow_sql if arrow else query.json_sql
+    logger.info('Executing query: %s', sql)
+    logger.info('With params: %s', query.params)
+    rows = connection.execute(text(sql), query.params).all()
+    next_cursor = None
+    if query.limit and len(rows) > query.limit:
+        rows = rows[:query.limit]
+        next_cursor = encode_cursor(date=rows[-1][-2], row_id=rows[-1][-1])
+    if query.points:
+        rows = downsample_rows(rows=rows, points=query.points)
+    logger.info('Fetched %d rows', len(rows))
+    return rows, next_cursor
+
+
+def read_query_response(query: ReadQuery, arrow: bool, ndjson: bool = False) -> Response:
+    """Runs a read query and returns its rows as an Arrow IPC stream, with dates and amounts
+        in their native Arrow types, or as JSON.
+
+    Args:
+        - query (ReadQuery): The query to run
+        - arrow (bool): Return an Arrow IPC stream
+        - ndjson (bool): Return newline-delimited JSON instead of a JSON array
+
+    Returns:
+        - Response: The response, with the cursor to the next page in X-Next-Cursor
+    """
+    with engine.connect() as connection:
+        rows, next_cursor = run_read_query(connection=connection, query=query, arrow=arrow)
+    headers = {'X-Next-Cursor': next_cursor} if next_cursor else {}
+    if arrow:
+        return Response(content=to_arrow_ipc(rows=rows, schema=query.schema), media_type=ARROW_MEDIA_TYPE, headers=headers)
+    if ndjson:
+        return Response(content=''.join(f'{row[0]}\n' for row in rows), media_type='application/x-ndjson', headers=headers)
+    return Response(content=f'[{",".join(row[0] for row in rows)}]', media_type='application/json', headers=headers)
+
+
+def build_facets(counted_values: list[tuple[tuple, int]], counts: bool) -> list[dict]:
+    """Folds counted combinations of column values into the distinct values of the first
+        column, each holding the distinct values of the next column found with it, and so on.
+
+    Args:
+        - counted_values (list[tuple[tuple, int]]): Combinations of column values and how
+            many transactions have each one
+        - counts (bool): Include the number of transactions that have each value
+
+    Returns:
+        - list[dict]: The distinct values of the first column in sorted order, each with its
+            count and the values nested under it
+    """
+    totals, nested = {}, {}
+    for values, count in counted_values:
+        value = values[0]
+        if value is None:
+            continue
+        totals[value] = totals.get(value, 0) + count
+        if len(values) > 1:
+            nested.setdefault(value, []).append((values[1:], count))
+    return [
+        {
+            'value': value,
+            'count': totals[value] if counts else None,
+            'children': build_facets(nested[value], counts) if value in nested else None
+        }
+        for value in sorted(totals)
+    ]
+
+
+@functools.lru_cache(maxsize=256)
+def transaction_filter_sql(
+    date_column: str,
+    start_date: bool,
+    end_date: bool,
+    filters: tuple[tuple[str, bool, bool], ...],
+    comparisons: tuple[Operator, ...],
+    merchant_search: str | None = None
+) -> str:
+    """Compiles the WHERE clause for one shape of transaction filters. The clause depends only
+        on which filters are used, not on their values: a list of values is bound as one JSON
+        array parameter. Requests with the same shape therefore share a statement, which is
+        compiled once here and then reused from SQLAlchemy's and SQLite's statement caches.
+
+    Args:
+        - date_column (str): Column the date filters apply to
+        - start_date (bool): Whether there is a start date
+        - end_date (bool): Whether there is an end date
+        - filters (tuple[tuple[str, bool, bool], ...]): The column, whether it has more than one
+            value, and whether the filter is inverted, for each filtered column
+        - comparisons (tuple[Operator, ...]): The operator of each amount comparison
+        - merchant_search (str): How merchants are searched for instead of matched exactly:
+            through the merchant search index ("match"), or with LIKE patterns ("like")
+
+    Returns:
+        - str: The WHERE clause
+    """
+    operator_map = {
+        'lt': '<',
+        'lte': '<=',
+        'eq': '=',
+        'gte': '>=',
+        'gt': '>'
+    }
+    where_clause = 'WHERE 1=1'
+    if start_date:
+        where_clause += f' AND "{date_column}" >= :start_date'
+    if end_date:
+        where_clause += f' AND "{date_column}" <= :end_date'
+    for column, many, exclude in filters:
+        parameter = column.lower()
+        if column == 'Merchant' and merchant_search == 'match':
+            condition = f'"{column}" IN (SELECT Merchant FROM {MERCHANT_SEARCH_TABLE} WHERE {MERCHANT_SEARCH_TABLE} MATCH :{parameter})'
+        elif column == 'Merchant' and merchant_search == 'like':
+            condition = f'EXISTS (SELECT 1 FROM json_each(:{parameter}) WHERE "{column}" LIKE value ESCAPE \'\\\')'
+        elif many:
+            condition = f'"{column}" IN (SELECT value FROM json_each(:{parameter}))'
+        else:
+            # A single value is compared directly, so SQLite can estimate how selective it is
+            condition = f'"{column}" = :{parameter}'
+        if exclude:
+            where_clause += f' AND ("{column}" IS NULL OR NOT {condition})'
+        else:
+            where_clause += f' AND {condition}'
+    for index, amount_op in enumerate(comparisons):
+        where_clause += f' AND Amount {operator_map[amount_op]} :amount_{index}'
+    return where_clause
+
+
+def transaction_filters(
+    start_date: str | None = None,
+    end_date: str | None = None,
+    merchant: list[str] = [],
+    merchant_match: TextMatch = TextMatch.exact,
+    amount_op: list[Operator] = [],
+    amount: list[float] = [],
+    group: list[str] = [],
+    category: list[str] = [],
+    subcategory: list[str] = [],
+    account: list[str] = [],
+    exclude: list[TransactionDimension] = [],
+    date_column: str = 'Date'
+) -> tuple[str, dict]:
+    """Builds the WHERE clause shared by the transaction endpoints from their filters. Each
+        column filter matches any of its values, or none of them if it is inverted.
+
+    Args:
+        - start_date (str): Start date, inclusive (YYYY-MM-DD)
+        - end_date (str): End date, inclusive (YYYY-MM-DD)
+        - merchant (list[str]): Merchant names
+        - merchant_match (TextMatch): Whether merchant names must match exactly, or only begin
+            with (prefix) or contain (contains) one of the names given, ignoring case
+        - amount_op (list[Operator]): Operators for filtering transaction amounts (lt, lte, eq,
+            gt, gte), one for each amount
+        - amount (list[float]): Transaction amounts to compare against, one for each operator
+        - group (list[str]): Transaction group names
+        - category (list[str]): Category names
+        - subcategory (list[str]): Subcategory names
+        - account (list[str]): Names of accounts that made the transaction
+        - exclude (list[TransactionDimension]): Columns whose filters are inverted
+        - date_column (str): Column the date filters apply to
+
+    Returns:
+        - tuple[str, dict]: The WHERE clause and its query parameters
+
+    Raises:
+        - HTTPException: If amount and amount_op are not given the same number of times.
+    """
+    if len(amount_op) != len(amount):
+        raise HTTPException(
+            status_code=400,
+            detail='Both amount and amount_op must be provided together, once for each comparison.'
+        )
+    column_values = {
+        TransactionDimension.Merchant: merchant,
+        TransactionDimension.Group: group,
+        TransactionDimension.Category: category,
+        TransactionDimension.Subcategory: subcategory,
+        TransactionDimension.Account: account
+    }
+    filters, params, merchant_search = [], {}, None
+    if start_date:
+        params['start_date'] = start_date
+    if end_date:
+        params['end_date'] = end_date
+    for dimension, values in column_values.items():
+        values = list(dict.fromkeys(value for value in values if value))
+        if not values:
+            continue
+        filters.append((dimension.value, len(values) > 1, dimension in exclude))
+        params[dimension.value.lower()] = json.dumps(values) if len(values) > 1 else values[0]
+    if merchant_match != TextMatch.exact and params.get('merchant'):
+        merchants = [value for value in dict.fromkeys(merchant) if value]
+        with engine.connect() as connection:
+            has_search_index = inspect(connection).has_table(MERCHANT_SEARCH_TABLE)
+        # The index splits merchants into trigrams, so it can't find anything shorter than three
+        # characters; those are matched against every transaction's merchant instead
+        if has_search_index and all(len(value) >= 3 for value in merchants):
+            merchant_search = 'match'
+            phrases = ['"' + value.replace('"', '""') + '"' for value in merchants]
+            if merchant_match == TextMatch.prefix:
+                phrases = ['^' + phrase for phrase in phrases]
+            params['merchant'] = ' OR '.join(phrases)
+        else:
+            merchant_search = 'like'
+            patterns = [value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%' for value in merchants]
+            if merchant_match == TextMatch.contains:
+                patterns = ['%' + pattern for pattern in patterns]
+            params['merchant'] = json.dumps(patterns)
+    for index, value in enumerate(amount):
+        params[f'amount_{index}'] = round(value * 100)
+    where_clause = transaction_filter_sql(
+        date_column=date_column,
+        start_date=bool(start_date),
+        end_date=bool(end_date),
+        filters=tuple(filters),
+        comparisons=tuple(Operator(amount_op) for amount_op in amount_op),
+        merchant_search=merchant_search
+    )
+    return where_clause, params
+
+
+def transactions_query(
+    start_date: str | None = None,
+    end_date: str | None = None,
+    merchant: OneOrMany[str] = [],
+    merchant_match: TextMatch = TextMatch.exact,
+    amount_op: OneOrMany[Operator] = [],
+    amount: OneOrMany[float] = [],
+    group: OneOrMany[str] = [],
+    category: OneOrMany[str] = [],
+    subcategory: OneOrMany[str] = [],
+    account: OneOrMany[str] = [],
+    exclude: OneOrMany[TransactionDimension] = [],
+    fields: str | None = None,
+    order: SortOrder = SortOrder.asc,
+    limit: Annotated[int, Field(ge=1)] | None = None,
+    cursor: str | None = None
+) -> ReadQuery:
+    """Builds the query behind /transactions. See that endpoint for the parameters.
+
+    Returns:
+        - ReadQuery: The query
+
+    Raises:
+        - HTTPException: If amount and amount_op are not given the same number of times, a
+            field is unknown, or the cursor is invalid.
+    """
+    selected_fields = list(TRANSACTION_JSON_FIELDS)
+    if fields:
+        selected_fields = list(dict.fromkeys(field.strip() for field in fields.split(',') if field.strip()))
+        unknown_fields = [field for field in selected_fields if field not in TRANSACTION_JSON_FIELDS]
+        if unknown_fields or not selected_fields:
+            raise HTTPException(
+                status_code=400,
+                detail=f'fields must be a comma-separated list of: {", ".join(TRANSACTION_JSON_FIELDS)}.'
+            )
+    where_clause, params = transaction_filters(
+        start_date=start_date,
+        end_date=end_date,
+        merchant=merchant,
+        merchant_match=merchant_match,
+        amount_op=amount_op,
+        amount=amount,
+        group=group,
+        category=category,
+        subcategory=subcategory,
+        account=account,
+        exclude=exclude
+    )
+    base_query = f'FROM Transaction_Log {where_clause}'
+    if cursor:
+        try:
+            params['cursor_date'], params['cursor_row_id'] = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # Seek past the previous page on the Date index instead of skipping over its rows
+        comparison = '<' if order == SortOrder.desc else '>'
+        base_query += f' AND ("Date", Row_Id) {comparison} (:cursor_date, :cursor_row_id)'
+    direction = 'DESC' if order == SortOrder.desc else 'ASC'
+    base_query += f' ORDER BY "Date" {direction}, Row_Id {direction}'
+    if limit:
+        # Fetch one row past the page to tell whether there is another page after it
+        base_query += ' LIMIT :limit'
+        params['limit'] = limit + 1
+
+    # A page also selects the sort key of its rows, so the cursor to the next page can be built
+    key_columns = ', "Date", Row_Id' if limit else ''
+    json_columns = json_object_sql({field: TRANSACTION_JSON_FIELDS[field] for field in selected_fields})
+    arrow_columns = ', '.join(f'"{field}"' for field in selected_fields)
+    return ReadQuery(
+        json_sql=f'SELECT {json_columns}{key_columns} {base_query}',
+        arrow_sql=f'SELECT {arrow_columns}{key_columns} {base_query}',
+        params=params,
+        schema=pa.schema([TRANSACTION_ARROW_SCHEMA.field(field) for field in selected_fields]),
+        limit=limit
+    )
+
+
+def transaction_aggregates_query(
+    start_date: str | None = None,
+    end_date: str | None = None,
+    merchant: OneOrMany[str] = [],
+    merchant_match: TextMatch = TextMatch.exact,
+    amount_op: OneOrMany[Operator] = [],
+    amount: OneOrMany[float] = [],
+    group: OneOrMany[str] = [],
+    category: OneOrMany[str] = [],
+    subcategory: OneOrMany[str] = [],
+    account: OneOrMany[str] = [],
+    exclude: OneOrMany[TransactionDimension] = [],
+    by: OneOrMany[TransactionDimension] = [],
+    bucket: TimeBucket | None = None,
+    aggregates: OneOrMany[Aggregate] = [Aggregate.sum]
+) -> ReadQuery:
+    """Builds the query behind /transactions/aggregate. See that endpoint for the parameters.
+
+    Returns:
+        - ReadQuery: The query
+
+    Raises:
+        - HTTPException: If a cumulative sum is asked for without a bucket, or amount and
+            amount_op are not given the same number of times.
+    """
+    if Aggregate.cumsum in aggregates and not bucket:
+        raise HTTPException(
+            status_code=400,
+            detail='A bucket must be provided to compute a cumulative sum.'
+        )
+    use_rollup = (
+        bucket not in (TimeBucket.day, TimeBucket.week)
+        and TransactionDimension.Merchant not in by
+        and not any(merchant)
+        and not amount_op
+        and covers_whole_months(start_date=start_date, end_date=end_date)
+    )
+    if use_rollup:
+        with engine.connect() as connection:
+            use_rollup = inspect(connection).has_table(TRANSACTION_ROLLUP_TABLE)
+    source_table = TRANSACTION_ROLLUP_TABLE if use_rollup else 'Transaction_Log'
+    date_column = 'Month' if use_rollup else 'Date'
+    count = 'SUM("Count")' if use_rollup else 'COUNT(*)'
+    where_clause, params = transaction_filters(
+        start_date=start_date,
+        end_date=end_date,
+        merchant=merchant,
+        merchant_match=merchant_match,
+        amount_op=amount_op,
+        amount=amount,
+        group=group,
+        category=category,
+        subcategory=subcategory,
+        account=account,
+        exclude=exclude,
+        date_column=date_column
+    )
+    dimensions = [f'"{dimension.value}"' for dimension in dict.fromkeys(by)]
+    group_by = list(dimensions)
+    select_columns = list(dimensions)
+    json_fields = {dimension.value: f'"{dimension.value}"' for dimension in dict.fromkeys(by)}
+    arrow_fields = [(dimension.value, pa.string()) for dimension in dict.fromkeys(by)]
+    period = date_bucket_sql(column=date_column, bucket=bucket.value) if bucket else None
+    if bucket:
+        group_by.append('Period')
+        select_columns.append(f'{period} AS Period')
+        json_fields['Period'] = 'Period'
+        arrow_fields.append(('Period', pa.date32()))
+    partition = f'PARTITION BY {", ".join(dimensions)} ' if dimensions else ''
+    for aggregate in dict.fromkeys(aggregates):
+        name, expression, arrow_type = AGGREGATE_COLUMNS[aggregate]
+        select_columns.append(f'{expression.format(partition=partition, period=period, count=count)} AS {name}')
+        json_fields[name] = cents_to_text_sql(name) if pa.types.is_decimal(arrow_type) else name
+        arrow_fields.append((name, arrow_type))
+
+    base_query = f'SELECT {", ".join(select_columns)} FROM {source_table} {where_clause}'
+    if group_by:
+        base_query += f' GROUP BY {", ".join(group_by)}'
+    order_by = (['Period'] if bucket else []) + dimensions
+    order_clause = f' ORDER BY {", ".join(order_by)}' if order_by else ''
+    arrow_columns = ', '.join(f'"{name}"' for name, _ in arrow_fields)
+    return ReadQuery(
+        json_sql=f'SELECT {json_object_sql(json_fields)} FROM ({base_query}){order_clause}',
+        arrow_sql=f'SELECT {arrow_columns} FROM ({base_query}){order_clause}',
+        params=params,
+        schema=pa.schema(arrow_fields)
+    )
+
+
+def networth_detail_query(
+    start_date: str | None = None,
+    end_date: str | None = None,
+    account: str | None = None,
+    category: str | None = None
+) -> ReadQuery:
+    """Builds the query behind /networth-detailed. See that endpoint for the parameters.
+
+    Returns:
+        - ReadQuery: The query
+    """
+    base_query = 'FROM Net_Worth_Log WHERE 1=1'
+    params = {}
+    if start_date:
+        base_query += ' AND "Date" >= :start_date'
+        params['start_date'] = start_date
+    if end_date:
+        base_query += ' AND "Date" <= :end_date'
+        params['end_date'] = end_date
+    if account:
+        base_query += ' AND Account = :account'
+        params['account'] = account
+    if category:
+        base_query += ' AND Category = :category'
+        params['category'] = category
+    base_query += ' ORDER BY "Date", Row_Id'
+    arrow_columns = ', '.join(f'"{name}"' for name in NET_WORTH_DETAIL_ARROW_SCHEMA.names)
+    return ReadQuery(
+        json_sql=f'SELECT {json_object_sql(NET_WORTH_DETAIL_JSON_FIELDS)} {base_query}',
+        arrow_sql=f'SELECT {arrow_columns} {base_query}',
+        params=params,
+        schema=NET_WORTH_DETAIL_ARROW_SCHEMA
+    )
+
+
+def networth_aggregate_query(start_date: str | None = None, end_date: str | None = None) -> ReadQuery:
+    """Builds the query behind /networth-aggregated. See that endpoint for the parameters.
+
+    Returns:
+        - ReadQuery: The query
+    """
+    base_query = 'SELECT "Date", Category, SUM(Balance) AS Balance FROM Net_Worth_Log WHERE 1=1'
+    params = {}
+    if start_date:
+        base_query += ' AND "Date" >= :start_date'
+        params['start_date'] = start_date
+    if end_date:
+        base_query += ' AND "Date" <= :end_date'
+        params['end_date'] = end_date
+    base_query += ' GROUP BY "Date", Category'
+    arrow_columns = ', '.join(f'"{name}"' for name in NET_WORTH_AGGREGATE_ARROW_SCHEMA.names)
+    json_columns = json_object_sql({
+        'Date': '"Date"',
+        'Category': 'Category',
+        'Balance': cents_to_text_sql('Balance')
+    })
+    return ReadQuery(
+        json_sql=f'SELECT {json_columns} FROM ({base_query}) ORDER BY "Date", Category',
+        arrow_sql=f'SELECT {arrow_columns} FROM ({base_query}) ORDER BY "Date", Category',
+        params=params,
+        schema=NET_WORTH_AGGREGATE_ARROW_SCHEMA
+    )
+
+
+def networth_balances_query(date: str | None = None) -> ReadQuery:
+    """Builds the query for the most recent balance of each account, in the columns of
+        /networth-detailed.
+
+    Args:
+        - date (str): Only read balances recorded on or before this date (YYYY-MM-DD); by
+            default the latest balances are read
+
+    Returns:
+        - ReadQuery: The query
+    """
+    date_condition = ' AND "Date" <= :date' if date else ''
+    arrow_columns = ', '.join(f'"{name}"' for name in NET_WORTH_DETAIL_ARROW_SCHEMA.names)
+    return ReadQuery(
+        json_sql=NET_WORTH_AS_OF_SQL.format(
+            columns=json_object_sql(NET_WORTH_DETAIL_JSON_FIELDS),
+            date_condition=date_condition
+        ),
+        arrow_sql=NET_WORTH_AS_OF_SQL.format(columns=arrow_columns, date_condition=date_condition),
+        params={'date': date} if date else {},
+        schema=NET_WORTH_DETAIL_ARROW_SCHEMA
+    )
+
+
+def networth_latest_query() -> ReadQuery:
+    """Builds the query behind the balances of /networth/latest.
+
+    Returns:
+        - ReadQuery: The query
+    """
+    return networth_balances_query()
+
+
+def networth_as_of_query(date: datetime.date) -> ReadQuery:
+    """Builds the query behind the balances of /networth/as-of. See that endpoint for the
+        parameters.
+
+    Returns:
+        - ReadQuery: The query
+    """
+    return networth_balances_query(date=date.isoformat())
+
+
+def load_networth_snapshot(query: ReadQuery) -> dict:
+    """Reads the balance of each account, and totals the assets and liabilities.
+
+    Args:
+        - query (ReadQuery): Query from networth_latest_query or networth_as_of_query
+
+    Returns:
+        - dict: The date of the most recent balance, the total assets, liabilities and net
+            worth, and the balance of each account
+    """
+    logger.info('Executing query: %s', query.arrow_sql)
+    logger.info('With params: %s', query.params)
+    with engine.connect() as connection:
+        rows = connection.execute(text(query.arrow_sql), query.params).all()
+    logger.info('Fetched %d rows', len(rows))
+    assets = sum(row.Balance or 0 for row in rows if row.Category == 'Asset')
+    liabilities = sum(row.Balance or 0 for row in rows if row.Category == 'Liability')
+    return {
+        'date': max((row.Date for row in rows), default=None),
+        'assets': assets,
+        'liabilities': liabilities,
+        'net_worth': assets - liabilities,
+        'accounts': [row._asdict() for row in rows]
+    }
+
+
+def networth_timeseries_query(
+    start_date: str | None = None,
+    end_date: str | None = None,
+    account: str | None = None,
+    category: str | None = None,
+    by: OneOrMany[NetWorthDimension] = [],
+    bucket: TimeBucket = TimeBucket.month,
+    agg: NetWorthAggregation = NetWorthAggregation.last,
+    points: Annotated[int, Field(ge=3)] | None = None
+) -> ReadQuery:
+    """Builds the query behind /networth/timeseries. See that endpoint for the parameters.
+
+    Returns:
+        - ReadQuery: The query
+    """
+    where_clause = 'WHERE 1=1'
+    params = {}
+    if start_date:
+        where_clause += ' AND "Date" >= :start_date'
+        params['start_date'] = start_date
+    if end_date:
+        where_clause += ' AND "Date" <= :end_date'
+        params['end_date'] = end_date
+    if account:
+        where_clause += ' AND Account = :account'
+        params['account'] = account
+    if category:
+        where_clause += ' AND Category = :category'
+        params['category'] = category
+    dimensions = [f'"{dimension.value}"' for dimension in dict.fromkeys(by)]
+    dimension_columns = ''.join(f', {dimension}' for dimension in dimensions)
+    account_columns = ''.join(f', {dimension}' for dimension in dict.fromkeys(['"Account"', *dimensions]))
+
+    # Combine each account's balances within each period first, and then add up the accounts
+    # of each group, so accounts recorded on different dates of a period all count. The last
+    # balance is picked with MAX("Date"), which SQLite reads the other columns alongside.
+    signed_balances = (
+        f'SELECT "Date"{account_columns}, '
+        'CASE WHEN Category = \'Liability\' THEN -Balance ELSE Balance END AS Balance '
+        f'FROM Net_Worth_Log {where_clause}'
+    )
+    period = date_bucket_sql(column='Date', bucket=bucket.value)
+    last_date = ', MAX("Date")' if agg == NetWorthAggregation.last else ''
+    account_balances = (
+        f'SELECT {period} AS Period{account_columns}, {NET_WORTH_AGGREGATIONS[agg]} AS Balance{last_date} '
+        f'FROM ({signed_balances}) GROUP BY Period{account_columns}'
+    )
+    base_query = (
+        f'SELECT Period{dimension_columns}, SUM(Balance) AS Balance '
+        f'FROM ({account_balances}) GROUP BY Period{dimension_columns}'
+    )
+    order_clause = f' ORDER BY Period{dimension_columns}'
+
+    # A downsampled series also selects the period and value of each row to pick points by
+    key_columns = ', Period, Balance' if points else ''
+    json_fields = {'Period': 'Period'}
+    json_fields.update({dimension.value: f'"{dimension.value}"' for dimension in dict.fromkeys(by)})
+    json_fields['Balance'] = cents_to_text_sql('Balance')
+    arrow_fields = [('Period', pa.date32())]
+    arrow_fields += [(dimension.value, pa.string()) for dimension in dict.fromkeys(by)]
+    arrow_fields.append(('Balance', pa.decimal128(18, 2)))
+    arrow_columns = ', '.join(f'"{name}"' for name, _ in arrow_fields)
+    return ReadQuery(
+        json_sql=f'SELECT {json_object_sql(json_fields)}{key_columns} FROM ({base_query}){order_clause}',
+        arrow_sql=f'SELECT {arrow_columns}{key_columns} FROM ({base_query}){order_clause}',
+        params=params,
+        schema=pa.schema(arrow_fields),
+        points=points
+    )
+
+
+# Query builder of each read endpoint that /batch can run
+BATCH_QUERY_BUILDERS = {
+    '/transactions': transactions_query,
+    '/transactions/aggregate': transaction_aggregates_query,
+    '/networth-detailed': networth_detail_query,
+    '/networth-aggregated': networth_aggregate_query,
+    '/networth/timeseries': networth_timeseries_query,
+    '/networth/latest': networth_latest_query,
+    '/networth/as-of': networth_as_of_query
+}
+
+
+refresh_jobs = RefreshJobManager(refresh=refresh_data)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Define code to run on API startup (before the yield statement) and optionally
-        shutdown (after the yield statement).
+        shutdown (after the yield statement). The initial sync runs in the background so
+        requests are served from the existing database snapshot while it downloads, or
+        answered with a 503 if nothing has been synced yet.
     
     Args:
         - app (FastAPI): The FastAPI application instance.
     """
-    refresh_data()
+    with engine.connect() as conn:
+        response_cache.set_version(load_data_version(conn))
+    refresh_jobs.submit()
     yield
 
 app = FastAPI(lifespan=lifespan)
 
+@app.middleware('http')
+async def cache_responses(request: Request, call_next):
+    """Serve repeated reads from the response cache. A response that isn't cached yet is
+        passed through to the client as it is produced, streamed ones included, and cached
+        once it is complete if it is small enough. The X-Cache header tells whether it was a hit or a miss.
+        Responses carry an ETag that changes with the data version, and a client sending it
+        back in If-None-Match gets a 304 without the query being run or the body being sent.
+
+    Args:
+        - request (Request): The incoming request
+        - call_next (Callable): Runs the endpoint for the request
+    """
+    if request.method != 'GET' or request.url.path not in CACHED_PATHS:
+        return await call_next(request)
+    key = response_cache.make_key(
+        path=request.url.path,
+        query=request.query_params.multi_items(),
+        accept=request.headers.get('accept')
+    )
+    # Clients are asked to revalidate every time, since a refresh can change the data at any
+    # moment, but revalidating costs them only a round trip
+    etag = make_etag(key)
+    validators = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if etag_matches(etag=etag, if_none_match=request.headers.get('if-none-match')):
+        return Response(status_code=304, headers=validators)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return Response(content=cached.body, headers={**cached.headers, 'X-Cache': 'HIT'})
+
+    response = await call_next(request)
+    if response.status_code != 200:
+        return response
+    response.headers.update(validators)
+    response.headers['X-Cache'] = 'MISS'
+    headers = {
+        name: value
+        for name, value in response.headers.items()
+        if name not in ('content-length', 'x-cache')
+    }
+    body_iterator = response.body_iterator
+
+    async def cache_body():
+        chunks, size = [], 0
+        async for chunk in body_iterator:
+            yield chunk
+            if chunks is not None:
+                size += len(chunk)
+                chunks.append(chunk)
+                # Stop collecting, and let go of, a body too large to cache, so a large
+                # streamed response is never held in memory in full
+                if size > response_cache.max_entry_bytes:
+                    chunks = None
+        if chunks is not None:
+            response_cache.put(key, CachedResponse(body=b''.join(chunks), headers=headers))
+
+    response.body_iterator = cache_body()
+    return response
+
+
+@app.middleware('http')
+async def require_synced_data(request: Request, call_next):
+    """Answer reads with a 503 until the sheets have been synced for the first time, since the
+        tables they read don't exist before then. The data version only moves past 0 once a
+        sync has been committed.
+
+    Args:
+        - request (Request): The incoming request
+        - call_next (Callable): Runs the endpoint for the request
+    """
+    is_read = request.url.path in CACHED_PATHS or request.url.path == '/batch'
+    if is_read and response_cache.version == 0:
+        return JSONResponse(
+            status_code=503,
+            content={'detail': 'The data has not been synced yet. Try again once the first refresh finishes.'},
+            headers={'Retry-After': '5'}
+        )
+    return await call_next(request)
+
 @app.get('/')
 def health_check():
-    """Simple health check endpoint to verify if the API is running."""
-    return {'status': 'running'}
+    """Simple health check endpoint to verify if the API is running. Also reports whether the
+        data has been synced since startup ("warm"), is being synced ("syncing"), is the
+        snapshot left by a previous run because no sync has succeeded yet ("stale"), or has
+        never been synced at all ("empty"), along with the response cache's hit and miss
+        counters.
+    """
+    active_job = refresh_jobs.get_active()
+    if active_job:
+        data_status = 'syncing'
+    elif refresh_jobs.last_succeeded_at:
+        data_status = 'warm'
+    elif response_cache.version == 0:
+        data_status = 'empty'
+    else:
+        data_status = 'stale'
+    return {
+        'status': 'running',
+        'data': data_status,
+        'refresh_job_id': active_job.id if active_job else None,
+        'last_refreshed_at': refresh_jobs.last_succeeded_at,
+        'cache': response_cache.stats()
+    }
+
+
+@app.get('/data-version')
+def get_data_version():
+    """Fetch the version of the data, which changes whenever a refresh changes the data.
+        Clients can cache what they fetch under it and fetch again once it changes.
+    """
+    return {'version': response_cache.version}
 
 
 @app.get('/transactions', response_model=list[Transaction])
 def get_transactions(
     start_date: str | None = None,
     end_date: str | None = None,
-    merchant: str | None = None,
-    amount_op: Operator | None = None,
-    amount: float | None = None,
-    group: str | None = None,
-    category: str | None = None,
-    subcategory: str | None = None,
-    account: str | None = None
+    merchant: list[str] = Query(default=[]),
+    merchant_match: TextMatch = TextMatch.exact,
+    amount_op: list[Operator] = Query(default=[]),
+    amount: list[float] = Query(default=[]),
+    group: list[str] = Query(default=[]),
+    category: list[str] = Query(default=[]),
+    subcategory: list[str] = Query(default=[]),
+    account: list[str] = Query(default=[]),
+    exclude: list[TransactionDimension] = Query(default=[]),
+    fields: str | None = None,
+    order: SortOrder = SortOrder.asc,
+    limit: int | None = Query(default=None, ge=1),
+    cursor: str | None = None,
+    stream: bool = False,
+    accept: str | None = Header(default=None)
 ):
     """Fetch transactions with optional filters applied using query parameters
-        to get a subset of transactions.
+        to get a subset of transactions, ordered by date.
         
     Args:
         - start_date (str): Start date, inclusive (YYYY-MM-DD)
         - end_date (str): End date, inclusive (YYYY-MM-DD)
-        - merchant (str): Merchant name
-        - amount_op (Operator): Operator for filtering transaction amounts (lt, lte, eq, gt, gte)
-        - amount (float): Transaction amount to use in filter
-        - group (str): Transaction group name ("Income", "ExpenseS", "Savings")
-        - category (str): Category name (e.g, "Food & Drink", "Pets", "Utilities")
-        - subcategory (str): Subcategory name corresponding to a category (e.g, "Food & Drink" -> "Groceries")
-        - account (str): Account name that made the transaction
+        - merchant (list[str]): Merchant names (e.g. merchant=A&merchant=B matches either)
+        - merchant_match (TextMatch): Match merchants exactly, or by the start of their name
+            (prefix) or any part of it (contains), ignoring case, using the merchant search index
+        - amount_op (list[Operator]): Operators for filtering transaction amounts (lt, lte, eq,
+            gt, gte); repeat it with amount to give a range (e.g. amount_op=gte&amount=10&amount_op=lt&amount=50)
+        - amount (list[float]): Transaction amounts to compare against, one for each amount_op
+        - group (list[str]): Transaction group names ("Income", "ExpenseS", "Savings")
+        - category (list[str]): Category names (e.g, "Food & Drink", "Pets", "Utilities")
+        - subcategory (list[str]): Subcategory names corresponding to a category (e.g, "Food & Drink" -> "Groceries")
+        - account (list[str]): Names of accounts that made the transaction
+        - exclude (list[TransactionDimension]): Columns whose filters match transactions with
+            none of the values given instead (e.g. category=Pets&exclude=Category)
+        - fields (str): Comma-separated columns to return (e.g. "Date,Amount"), defaults to all
+        - order (SortOrder): Return the oldest (asc) or newest (desc) transactions first
+        - limit (int): Maximum number of transactions to return in a page; the cursor to the
+            next page is returned in the X-Next-Cursor header
+        - cursor (str): Cursor from the X-Next-Cursor header of the previous page
+        - stream (bool): Stream the result as a JSON array in chunks instead of building it in
+            memory
+        - accept (str): Accept header; "application/x-ndjson" streams newline-delimited JSON
+            and "application/vnd.apache.arrow.stream" returns an Arrow IPC stream
     
     Returns:
         - list[Transaction]: List of transactions matching the filters
 
     Raises:
-        - HTTPException: If either amount or amount_op are specified without the other.
+        - HTTPException: If amount and amount_op are not given the same number of times, a
+            field is unknown, or the cursor is invalid.
     """
     logger.info('Received request with params: %s', {
         'start_date': start_date,
         'end_date': end_date,
         'merchant': merchant,
+        'merchant_match': merchant_match,
         'amount_op': amount_op,
         'amount': amount,
         'group': group,
         'category': category,
         'subcategory': subcategory,
-        'account': account
+        'account': account,
+        'exclude': exclude,
+        'fields': fields,
+        'order': order,
+        'limit': limit,
+        'cursor': cursor
     })
-    if (amount_op and not amount) or (amount and not amount_op):
-        raise HTTPException(
-            status_code=400,
-            detail='Both amount and amount_op must be provided together.'
+    query = transactions_query(
+        start_date=start_date,
+        end_date=end_date,
+        merchant=merchant,
+        merchant_match=merchant_match,
+        amount_op=amount_op,
+        amount=amount,
+        group=group,
+        category=category,
+        subcategory=subcategory,
+        account=account,
+        exclude=exclude,
+        fields=fields,
+        order=order,
+        limit=limit,
+        cursor=cursor
+    )
+    arrow = ARROW_MEDIA_TYPE in (accept or '')
+    ndjson = 'application/x-ndjson' in (accept or '')
+    # Rows are serialized to JSON by SQLite and joined into the body as they are, rather than
+    # built into Transaction models one at a time
+    if (stream or ndjson) and not arrow and not limit:
+        logger.info('Executing query: %s', query.json_sql)
+        logger.info('With params: %s', query.params)
+        return StreamingResponse(
+            content=stream_json_rows(query=query.json_sql, params=query.params, ndjson=ndjson),
+            media_type='application/x-ndjson' if ndjson else 'application/json'
         )
-    base_query = 'SELECT * FROM Transaction_Log WHERE 1=1'
-    operator_map = {
-        'lt': '<',
-        'lte': '<=',
-        'eq': '=',
-        'gte': '>=',
-        'gt': '>'
+    return read_query_response(query=query, arrow=arrow, ndjson=ndjson)
+
+
+@app.get('/transactions/aggregate', response_model=list[TransactionAggregate])
+def get_transaction_aggregates(
+    start_date: str | None = None,
+    end_date: str | None = None,
+    merchant: list[str] = Query(default=[]),
+    merchant_match: TextMatch = TextMatch.exact,
+    amount_op: list[Operator] = Query(default=[]),
+    amount: list[float] = Query(default=[]),
+    group: list[str] = Query(default=[]),
+    category: list[str] = Query(default=[]),
+    subcategory: list[str] = Query(default=[]),
+    account: list[str] = Query(default=[]),
+    exclude: list[TransactionDimension] = Query(default=[]),
+    by: list[TransactionDimension] = Query(default=[]),
+    bucket: TimeBucket | None = None,
+    aggregates: list[Aggregate] = Query(default=[Aggregate.sum]),
+    accept: str | None = Header(default=None)
+):
+    """Summarize the transactions matching the same filters as /transactions, grouped by any
+        of their columns and optionally by a time period, in a single GROUP BY query. Only the
+        summary rows are returned, ordered by period and then by the grouping columns. Requests
+        that need no finer detail than a month are answered from the monthly rollup table.
+
+    Args:
+        - start_date (str): Start date, inclusive (YYYY-MM-DD)
+        - end_date (str): End date, inclusive (YYYY-MM-DD)
+        - merchant (list[str]): Merchant names
+        - merchant_match (TextMatch): Match merchants exactly, or by the start of their name
+            (prefix) or any part of it (contains), ignoring case
+        - amount_op (list[Operator]): Operators for filtering transaction amounts (lt, lte, eq,
+            gt, gte), one for each amount
+        - amount (list[float]): Transaction amounts to compare against, one for each amount_op
+        - group (list[str]): Transaction group names ("Income", "Expenses", "Savings")
+        - category (list[str]): Category names (e.g, "Food & Drink", "Pets", "Utilities")
+        - subcategory (list[str]): Subcategory names corresponding to a category
+        - account (list[str]): Names of accounts that made the transaction
+        - exclude (list[TransactionDimension]): Columns whose filters match transactions with
+            none of the values given instead
+        - by (list[TransactionDimension]): Columns to group by (e.g. by=Category&by=Subcategory)
+        - bucket (TimeBucket): Period to group by, returned as the first date of the period
+        - aggregates (list[Aggregate]): Summaries to compute for each group: the total amount
+            (sum), the number of transactions (count), and the running total over periods (cumsum)
+        - accept (str): Accept header; "application/vnd.apache.arrow.stream" returns an Arrow
+            IPC stream instead of JSON
+
+    Returns:
+        - list[TransactionAggregate]: One summary per group
+
+    Raises:
+        - HTTPException: If a cumulative sum is asked for without a bucket, or amount and
+            amount_op are not given the same number of times.
+    """
+    logger.info('Received request with params: %s', {
+        'start_date': start_date,
+        'end_date': end_date,
+        'merchant': merchant,
+        'merchant_match': merchant_match,
+        'amount_op': amount_op,
+        'amount': amount,
+        'group': group,
+        'category': category,
+        'subcategory': subcategory,
+        'account': account,
+        'exclude': exclude,
+        'by': by,
+        'bucket': bucket,
+        'aggregates': aggregates
+    })
+    query = transaction_aggregates_query(
+        start_date=start_date,
+        end_date=end_date,
+        merchant=merchant,
+        merchant_match=merchant_match,
+        amount_op=amount_op,
+        amount=amount,
+        group=group,
+        category=category,
+        subcategory=subcategory,
+        account=account,
+        exclude=exclude,
+        by=by,
+        bucket=bucket,
+        aggregates=aggregates
+    )
+    return read_query_response(query=query, arrow=ARROW_MEDIA_TYPE in (accept or ''))
+
+
+@app.get('/transactions/facets', response_model=TransactionFacets, response_model_exclude_none=True)
+def get_transaction_facets(counts: bool = False):
+    """Fetch the values the transactions can be filtered on, for building filter widgets
+        without downloading the transactions: the first and last dates, the years and months
+        with transactions, the distinct groups, categories, subcategories and accounts, and
+        the Group -> Category -> Subcategory hierarchy. Read from the monthly rollup table,
+        which holds one row per month and combination of these columns, and from the ends of
+        the Date index.
+
+    Args:
+        - counts (bool): Include the number of transactions that have each value
+
+    Returns:
+        - TransactionFacets: The values the transactions can be filtered on
+    """
+    logger.info('Received request with params: %s', {'counts': counts})
+    with engine.connect() as connection:
+        if inspect(connection).has_table(TRANSACTION_ROLLUP_TABLE):
+            source_table, month, count = TRANSACTION_ROLLUP_TABLE, 'Month', 'SUM("Count")'
+        else:
+            source_table, month, count = 'Transaction_Log', 'strftime(\'%Y-%m-01\', "Date")', 'COUNT(*)'
+        query = (
+            f'SELECT "Group", Category, Subcategory, Account, {count} AS Count '
+            f'FROM {source_table} GROUP BY 1, 2, 3, 4'
+        )
+        logger.info('Executing query: %s', query)
+        rows = connection.execute(text(query)).all()
+        months = connection.execute(text(f'SELECT DISTINCT {month} FROM {source_table} ORDER BY 1')).scalars().all()
+        # Separate subqueries, since SQLite reads MIN and MAX off the index only one at a time
+        min_date, max_date = connection.execute(text(
+            'SELECT (SELECT MIN("Date") FROM Transaction_Log), (SELECT MAX("Date") FROM Transaction_Log)'
+        )).one()
+    logger.info('Fetched %d rows', len(rows))
+    return {
+        'min_date': min_date,
+        'max_date': max_date,
+        'years': sorted({int(month[:4]) for month in months}),
+        'months': months,
+        'groups': build_facets([((row.Group,), row.Count) for row in rows], counts),
+        'categories': build_facets([((row.Category,), row.Count) for row in rows], counts),
+        'subcategories': build_facets([((row.Subcategory,), row.Count) for row in rows], counts),
+        'accounts': build_facets([((row.Account,), row.Count) for row in rows], counts),
+        'hierarchy': build_facets([((row.Group, row.Category, row.Subcategory), row.Count) for row in rows], counts)
     }
-    params = {}
-    if start_date:
-        base_query += ' AND "Date" >= :start_date'
-        params['start_date'] = start_date
-    if end_date:
-        base_query += ' AND "Date" <= :end_date'
-        params['end_date'] = end_date
-    if merchant:
-        base_query += ' AND Merchant = :merchant'
-        params['merchant'] = merchant
-    if amount_op and amount:
-        base_query += f' AND Amount {operator_map[amount_op]} :amount'
-        params['amount'] = amount
-    if group:
-        base_query += ' AND "Group" = :group'
-        params['group'] = group
-    if category:
-        base_query += ' AND Category = :category'
-        params['category'] = category
-    if subcategory:
-        base_query += ' AND Subcategory = :subcategory'
-        params['subcategory'] = subcategory
-    if account:
-        base_query += ' AND Account = :account'
-        params['account'] = account
-    logger.info('Executing query: %s', base_query)
-    logger.info('With params: %s', params)
+
+
+@app.get('/transactions/merchants', response_model=list[MerchantSuggestion])
+def get_merchant_suggestions(q: str = '', limit: int = Query(default=10, ge=1, le=100)):
+    """Suggest merchants for a search box as their name is typed. Candidates are found in the
+        merchant search index by the trigrams they share with the search, so a misspelled name
+        still finds the merchant, and then ranked: names that start with the search first, then
+        names that contain it, then by how similar they are to it, and then by how many
+        transactions they have. Without a search, the merchants with the most transactions are
+        suggested.
+
+    Args:
+        - q (str): The search, as typed so far
+        - limit (int): Maximum number of merchants to suggest
+
+    Returns:
+        - list[MerchantSuggestion]: The suggested merchants, best first
+    """
+    logger.info('Received request with params: %s', {'q': q, 'limit': limit})
+    search = q.strip().lower()
+    trigrams = list(dict.fromkeys(search[index:index + 3] for index in range(len(search) - 2)))
+    params = {'candidates': MAX_MERCHANT_CANDIDATES}
     with engine.connect() as connection:
-        result = connection.execute(text(base_query), params)
-        logger.info('Fetched %d rows', result.rowcount)
-        return [Transaction(**dict(row._mapping)) for row in result]
+        if not inspect(connection).has_table(MERCHANT_SEARCH_TABLE):
+            query = (
+                'SELECT Merchant, COUNT(*) AS Count FROM Transaction_Log '
+                'WHERE Merchant LIKE :pattern ESCAPE \'\\\' GROUP BY Merchant ORDER BY Count DESC LIMIT :candidates'
+            )
+        elif trigrams:
+            # Any shared trigram makes a merchant a candidate, and the index ranks the ones
+            # sharing the most of them first
+            query = (
+                f'SELECT Merchant, Count FROM {MERCHANT_SEARCH_TABLE} WHERE {MERCHANT_SEARCH_TABLE} MATCH :query '
+                'ORDER BY rank LIMIT :candidates'
+            )
+            params['query'] = ' OR '.join('"' + trigram.replace('"', '""') + '"' for trigram in trigrams)
+        else:
+            query = (
+                f'SELECT Merchant, Count FROM {MERCHANT_SEARCH_TABLE} '
+                'WHERE Merchant LIKE :pattern ESCAPE \'\\\' ORDER BY Count DESC LIMIT :candidates'
+            )
+        params['pattern'] = '%' + search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        logger.info('Executing query: %s', query)
+        rows = connection.execute(text(query), params).all()
+    logger.info('Fetched %d rows', len(rows))
+    ranked = sorted(
+        rows,
+        key=lambda row: (
+            row.Merchant.lower().startswith(search),
+            search in row.Merchant.lower(),
+            difflib.SequenceMatcher(a=search, b=row.Merchant.lower()).ratio(),
+            row.Count
+        ),
+        reverse=True
+    )
+    return [{'Merchant': row.Merchant, 'Count': row.Count} for row in ranked[:limit]]
 
 
 @app.get('/networth-detailed', response_model=list[NetWorthDetail])
@@ -152,7 +1344,8 @@ def get_networth(
     start_date: str | None = None,
     end_date: str | None = None,
     account: str | None = None,
-    category: str | None = None
+    category: str | None = None,
+    accept: str | None = Header(default=None)
 ):
     """Fetch detailed net worth entries for each account, with optional query
         parameters to filter the result set.
@@ -162,6 +1355,8 @@ def get_networth(
         - end_date (str): End date, inclusive (YYYY-MM-DD)
         - account (str): Account name
         - category (str): Category name ("Asset" or "Liability")
+        - accept (str): Accept header; "application/vnd.apache.arrow.stream" returns an Arrow
+            IPC stream instead of JSON
         
     Returns:
         - list[NetWorthDetail]: List of net worth entries matching the filters
@@ -172,32 +1367,20 @@ def get_networth(
         'account': account,
         'category': category
     })
-    base_query = 'SELECT * FROM Net_Worth_Log WHERE 1=1'
-    params = {}
-    if start_date:
-        base_query += ' AND "Date" >= :start_date'
-        params['start_date'] = start_date
-    if end_date:
-        base_query += ' AND "Date" <= :end_date'
-        params['end_date'] = end_date
-    if account:
-        base_query += ' AND Account = :account'
-        params['account'] = account
-    if category:
-        base_query += ' AND Category = :category'
-        params['category'] = category
-    logger.info('Executing query: %s', base_query)
-    logger.info('With params: %s', params)
-    with engine.connect() as connection:
-        result = connection.execute(text(base_query), params)
-        logger.info('Fetched %d rows', result.rowcount)
-        return [dict(row._mapping) for row in result]
+    query = networth_detail_query(
+        start_date=start_date,
+        end_date=end_date,
+        account=account,
+        category=category
+    )
+    return read_query_response(query=query, arrow=ARROW_MEDIA_TYPE in (accept or ''))
 
 
 @app.get('/networth-aggregated', response_model=list[NetWorthAggregate])
 def get_networth(
     start_date: str | None = None,
-    end_date: str | None = None
+    end_date: str | None = None,
+    accept: str | None = Header(default=None)
 ):
     """Fetch net worth aggregate entries with optional filters for start and end date.
         A sum of assets and liabilities is returned for each date with an entry.
@@ -205,6 +1388,8 @@ def get_networth(
     Args:
         - start_date (str): Start date, inclusive (YYYY-MM-DD)
         - end_date (str): End date, inclusive (YYYY-MM-DD)
+        - accept (str): Accept header; "application/vnd.apache.arrow.stream" returns an Arrow
+            IPC stream instead of JSON
     
     Returns:
         - list[NetWorthAggregate]: List of net worth aggregate entries matching the filters
@@ -213,24 +1398,206 @@ def get_networth(
         'start_date': start_date,
         'end_date': end_date
     })
-    base_query = 'SELECT "Date", Category, SUM(Balance) AS Balance FROM Net_Worth_Log WHERE 1=1'
-    params = {}
-    if start_date:
-        base_query += ' AND "Date" >= :start_date'
-        params['start_date'] = start_date
-    if end_date:
-        base_query += ' AND "Date" <= :end_date'
-        params['end_date'] = end_date
-    base_query += ' GROUP BY "Date", Category ORDER BY "Date", Category ASC'
-    logger.info('Executing query: %s', base_query)
-    logger.info('With params: %s', params)
+    query = networth_aggregate_query(start_date=start_date, end_date=end_date)
+    return read_query_response(query=query, arrow=ARROW_MEDIA_TYPE in (accept or ''))
+
+
+@app.get('/networth/timeseries', response_model=list[NetWorthPoint])
+def get_networth_timeseries(
+    start_date: str | None = None,
+    end_date: str | None = None,
+    account: str | None = None,
+    category: str | None = None,
+    by: list[NetWorthDimension] = Query(default=[]),
+    bucket: TimeBucket = TimeBucket.month,
+    agg: NetWorthAggregation = NetWorthAggregation.last,
+    points: int | None = Query(default=None, ge=3),
+    accept: str | None = Header(default=None)
+):
+    """Fetch net worth over time as one balance per period for each group of accounts, for
+        charting long histories. The balances each account recorded within a period are
+        combined into one, and then added up over each group's accounts, with liabilities
+        counted as negative balances so that adding up every account gives the net worth.
+        Series can also be downsampled to a number of points with Largest-Triangle-Three-
+        Buckets, which keeps the periods that best preserve the shape of the total, so a
+        chart's payload stays the same size however long the history grows.
+
+    Args:
+        - start_date (str): Start date, inclusive (YYYY-MM-DD)
+        - end_date (str): End date, inclusive (YYYY-MM-DD)
+        - account (str): Account name
+        - category (str): Category name ("Asset" or "Liability")
+        - by (list[NetWorthDimension]): Columns to group accounts by (e.g. by=Category); by
+            default all accounts are added up into the net worth
+        - bucket (TimeBucket): Period to group balances into, returned as the first date of
+            the period
+        - agg (NetWorthAggregation): How each account's balances within a period are
+            combined: the last one recorded (last), their mean (mean), or the highest one (max)
+        - points (int): Most periods to return, picked with LTTB; every group keeps the same
+            periods, so series charted together stay aligned
+        - accept (str): Accept header; "application/vnd.apache.arrow.stream" returns an Arrow
+            IPC stream instead of JSON
+
+    Returns:
+        - list[NetWorthPoint]: One balance per period and group, ordered by period
+    """
+    logger.info('Received request with params: %s', {
+        'start_date': start_date,
+        'end_date': end_date,
+        'account': account,
+        'category': category,
+        'by': by,
+        'bucket': bucket,
+        'agg': agg,
+        'points': points
+    })
+    query = networth_timeseries_query(
+        start_date=start_date,
+        end_date=end_date,
+        account=account,
+        category=category,
+        by=by,
+        bucket=bucket,
+        agg=agg,
+        points=points
+    )
+    return read_query_response(query=query, arrow=ARROW_MEDIA_TYPE in (accept or ''))
+
+
+@app.get('/networth/latest', response_model=NetWorthSnapshot)
+def get_latest_networth():
+    """Fetch the most recent balance of each account, along with the total assets, total
+        liabilities and the net worth they add up to. Only the latest row of each account is
+        read, by seeking on the (Account, Date) index, so the cost doesn't grow with the
+        history.
+
+    Returns:
+        - NetWorthSnapshot: The latest balances and their totals
+    """
+    logger.info('Received request for the latest net worth')
+    return load_networth_snapshot(query=networth_latest_query())
+
+
+@app.get('/networth/as-of', response_model=NetWorthSnapshot)
+def get_networth_as_of(date: datetime.date):
+    """Fetch the balance of each account as of a date, which is the most recent balance
+        recorded on or before it, along with the total assets, total liabilities and the net
+        worth they add up to.
+
+    Args:
+        - date (datetime.date): The date to get balances as of, inclusive (YYYY-MM-DD)
+
+    Returns:
+        - NetWorthSnapshot: The balances as of the date and their totals
+    """
+    logger.info('Received request with params: %s', {'date': date})
+    return load_networth_snapshot(query=networth_as_of_query(date=date))
+
+
+@app.post('/batch')
+def run_batch(request: BatchRequest, accept: str | None = Header(default=None)):
+    """Run several read queries in one request. Each query names a read endpoint and its
+        query parameters, which are validated the same way the endpoint validates them. All
+        of the queries run on one connection inside one transaction, so every result comes
+        from the same snapshot of the data, whose version is returned in X-Data-Version.
+
+    Args:
+        - request (BatchRequest): The named queries to run
+        - accept (str): Accept header; "application/vnd.apache.arrow.stream" returns an Arrow
+            IPC stream with one row per query, holding the query's result as an Arrow IPC
+            stream of its own, instead of JSON
+
+    Returns:
+        - dict: The data version, the result of each query by name as its endpoint would
+            return it, and the cursor to the next page of each paginated query. The results of
+            /networth/latest and /networth/as-of are the balance of each account, without
+            the totals, which add up the Asset and Liability balances
+
+    Raises:
+        - HTTPException: If a name is repeated, a path is not a read endpoint, or a query's
+            parameters are invalid.
+    """
+    logger.info('Received batch of queries: %s', [query.name for query in request.queries])
+    names = [query.name for query in request.queries]
+    if len(set(names)) != len(names):
+        raise HTTPException(status_code=400, detail='Each query in a batch must have a unique name.')
+    read_queries = {}
+    for batch_query in request.queries:
+        builder = BATCH_QUERY_BUILDERS.get(batch_query.path)
+        if builder is None:
+            raise HTTPException(
+                status_code=400,
+                detail=f'path must be one of: {", ".join(BATCH_QUERY_BUILDERS)}.'
+            )
+        try:
+            read_queries[batch_query.name] = validate_call(builder)(**batch_query.params)
+        except ValidationError as e:
+            raise HTTPException(
+                status_code=422,
+                detail=[
+                    {**error, 'loc': ['body', batch_query.name, *error['loc']]}
+                    for error in e.errors(include_url=False, include_context=False)
+                ]
+            )
+
+    arrow = ARROW_MEDIA_TYPE in (accept or '')
     with engine.connect() as connection:
-        result = connection.execute(text(base_query), params)
-        logger.info('Fetched %d rows', result.rowcount)
-        return [dict(row._mapping) for row in result]
+        data_version = load_data_version(connection)
+        results = {
+            name: run_read_query(connection=connection, query=query, arrow=arrow)
+            for name, query in read_queries.items()
+        }
+    headers = {'X-Data-Version': str(data_version)}
+    if arrow:
+        batch = [
+            (name, to_arrow_ipc(rows=rows, schema=read_queries[name].schema), next_cursor)
+            for name, (rows, next_cursor) in results.items()
+        ]
+        return Response(content=to_arrow_ipc(rows=batch, schema=BATCH_ARROW_SCHEMA), media_type=ARROW_MEDIA_TYPE, headers=headers)
+    data = ','.join(
+        f'{json.dumps(name)}:[{",".join(row[0] for row in rows)}]'
+        for name, (rows, _) in results.items()
+    )
+    next_cursors = {name: next_cursor for name, (_, next_cursor) in results.items()}
+    return Response(
+        content=f'{{"data_version":{data_version},"results":{{{data}}},"next_cursors":{json.dumps(next_cursors)}}}',
+        media_type='application/json',
+        headers=headers
+    )
 
 
-@app.post('/refresh-data')
-def refresh_sheets_data():
-    """Refresh API SQLite database by fetching updated transactions from Google Sheets."""
-    refresh_data()
\ No newline at end of file
+@app.post('/refresh-data', response_model=RefreshJob, status_code=202)
+def refresh_sheets_data(mode: RefreshMode = RefreshMode.incremental):
+    """Start refreshing the API SQLite database from Google Sheets in the background. If a
+        refresh is already running, its job is returned instead of starting another one,
+        unless a full refresh is asked for while an incremental one runs. That full refresh
+        is queued to start once the running one finishes, and its job is returned.
+
+    Args:
+        - mode (RefreshMode): Sync mode ("incremental" or "full")
+
+    Returns:
+        - RefreshJob: The refresh job, whose progress can be polled at /refresh-data/{job_id}
+    """
+    job = refresh_jobs.submit(mode=mode)
+    logger.info('Refresh job %s is %s', job.id, job.phase)
+    return job
+
+
+@app.get('/refresh-data/{job_id}', response_model=RefreshJob)
+def get_refresh_job(job_id: str):
+    """Fetch the phase, timings and row counts of a refresh job.
+
+    Args:
+        - job_id (str): The job id returned by POST /refresh-data
+
+    Returns:
+        - RefreshJob: The refresh job
+
+    Raises:
+        - HTTPException: If no job with the given id exists.
+    """
+    job = refresh_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f'Refresh job {job_id} not found.')
+    return job
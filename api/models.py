@@ -1,44 +1,198 @@
 import datetime
+import pyarrow as pa
+from typing import Any
 from pydantic import BaseModel, field_serializer
-from decimal import Decimal
+
+from utils import format_cents
 
 
 class Transaction(BaseModel):
-    """Data model for a transaction record."""
+    """Data model for a transaction record. Amount is held in integer cents. Cells left blank
+        in the sheet are null."""
     Date: datetime.date
-    Merchant: str
-    Amount: Decimal
-    Group: str
-    Category: str
-    Subcategory: str
-    Account: str
+    Merchant: str | None
+    Amount: int | None
+    Group: str | None
+    Category: str | None
+    Subcategory: str | None
+    Account: str | None
 
     @field_serializer('Amount')
-    def format_amount(self, amount: Decimal, _info):
-        return f'{amount:.2f}'
+    def format_amount(self, amount: int | None, _info) -> str | None:
+        return None if amount is None else format_cents(amount)
 
 
 class NetWorthDetail(BaseModel):
-    """Data model for a net worth detail entry."""
+    """Data model for a net worth detail entry. Balance is held in integer cents. Cells left
+        blank in the sheet are null."""
     Date: datetime.date
     Account: str
-    Category: str
-    Subcategory: str
-    Balance: Decimal
+    Category: str | None
+    Subcategory: str | None
+    Balance: int | None
 
 
     @field_serializer('Balance')
-    def format_amount(self, amount: Decimal, _info):
-        return f'{amount:.2f}'
+    def format_amount(self, amount: int | None, _info) -> str | None:
+        return None if amount is None else format_cents(amount)
 
 
 class NetWorthAggregate(BaseModel):
-    """Data model for a net worth aggregate entry."""
+    """Data model for a net worth aggregate entry. Balance is held in integer cents, and is null
+        when every balance in the group was left blank."""
     Date: datetime.date
-    Category: str
-    Balance: Decimal
+    Category: str | None
+    Balance: int | None
 
 
     @field_serializer('Balance')
-    def format_amount(self, amount: Decimal, _info):
-        return f'{amount:.2f}'
+    def format_amount(self, amount: int | None, _info) -> str | None:
+        return None if amount is None else format_cents(amount)
+
+
+class NetWorthSnapshot(BaseModel):
+    """Data model for the most recent balance of each account as of a date, with the total of
+        the assets and liabilities and the net worth they add up to. Amounts are held in
+        integer cents."""
+    date: datetime.date | None = None
+    assets: int
+    liabilities: int
+    net_worth: int
+    accounts: list[NetWorthDetail]
+
+    @field_serializer('assets', 'liabilities', 'net_worth')
+    def format_amount(self, amount: int, _info) -> str:
+        return format_cents(amount)
+
+
+class NetWorthPoint(BaseModel):
+    """Data model for the balance of a group of accounts over one period of a net worth time
+        series. Only the grouping columns that were asked for are returned. Liabilities count
+        as negative balances. Balance is held in integer cents."""
+    Period: datetime.date
+    Category: str | None = None
+    Subcategory: str | None = None
+    Account: str | None = None
+    Balance: int | None = None
+
+    @field_serializer('Balance')
+    def format_amount(self, amount: int | None, _info) -> str | None:
+        return None if amount is None else format_cents(amount)
+
+
+class TransactionAggregate(BaseModel):
+    """Data model for a summary of a group of transactions. Only the grouping columns and
+        aggregates that were asked for are returned. Amounts are held in integer cents."""
+    Group: str | None = None
+    Category: str | None = None
+    Subcategory: str | None = None
+    Merchant: str | None = None
+    Account: str | None = None
+    Period: datetime.date | None = None
+    Amount: int | None = None
+    Count: int | None = None
+    Cumulative: int | None = None
+
+    @field_serializer('Amount', 'Cumulative')
+    def format_amount(self, amount: int | None, _info) -> str | None:
+        return None if amount is None else format_cents(amount)
+
+
+class MerchantSuggestion(BaseModel):
+    """Data model for a merchant suggested for a search, with its number of transactions."""
+    Merchant: str
+    Count: int
+
+
+class FacetValue(BaseModel):
+    """Data model for a distinct value of a transaction column, with the number of transactions
+        that have it when counts are asked for, and in the hierarchy, the values nested under it."""
+    value: str
+    count: int | None = None
+    children: list['FacetValue'] | None = None
+
+
+class TransactionFacets(BaseModel):
+    """Data model for the values the transactions can be filtered on: the range of dates, the
+        distinct values of each column, and the Group -> Category -> Subcategory hierarchy."""
+    min_date: datetime.date | None = None
+    max_date: datetime.date | None = None
+    years: list[int]
+    months: list[datetime.date]
+    groups: list[FacetValue]
+    categories: list[FacetValue]
+    subcategories: list[FacetValue]
+    accounts: list[FacetValue]
+    hierarchy: list[FacetValue]
+
+
+# Arrow schemas matching the models above, used for columnar responses. Amounts are decimals
+# with two digits after the decimal point, the same values the models serialize as text.
+TRANSACTION_ARROW_SCHEMA = pa.schema([
+    ('Date', pa.date32()),
+    ('Merchant', pa.string()),
+    ('Amount', pa.decimal128(18, 2)),
+    ('Group', pa.string()),
+    ('Category', pa.string()),
+    ('Subcategory', pa.string()),
+    ('Account', pa.string())
+])
+
+NET_WORTH_DETAIL_ARROW_SCHEMA = pa.schema([
+    ('Date', pa.date32()),
+    ('Account', pa.string()),
+    ('Category', pa.string()),
+    ('Subcategory', pa.string()),
+    ('Balance', pa.decimal128(18, 2))
+])
+
+NET_WORTH_AGGREGATE_ARROW_SCHEMA = pa.schema([
+    ('Date', pa.date32()),
+    ('Category', pa.string()),
+    ('Balance', pa.decimal128(18, 2))
+])
+
+
+# Arrow schema of a /batch response: one row per query, holding the query's result as an Arrow
+# IPC stream of its own
+BATCH_ARROW_SCHEMA = pa.schema([
+    ('name', pa.string()),
+    ('data', pa.binary()),
+    ('next_cursor', pa.string())
+])
+
+
+class BatchQuery(BaseModel):
+    """Data model for one query of a batch: the path of a read endpoint and the query
+        parameters to call it with, under a name to find its result by."""
+    name: str
+    path: str
+    params: dict[str, Any] = {}
+
+
+class BatchRequest(BaseModel):
+    """Data model for the body of a /batch request."""
+    queries: list[BatchQuery]
+
+
+class SheetSyncResult(BaseModel):
+    """Data model for the outcome of syncing a single sheet during a refresh."""
+    sheet: str
+    mode: str
+    status: str
+    inserted: int
+    updated: int
+    deleted: int
+    unchanged: int | None
+
+
+class RefreshJob(BaseModel):
+    """Data model for a background refresh job and its progress."""
+    id: str
+    mode: str
+    phase: str
+    created_at: datetime.datetime
+    finished_at: datetime.datetime | None = None
+    timings: dict[str, float] = {}
+    results: list[SheetSyncResult] = []
+    error: str | None = None
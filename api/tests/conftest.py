@@ -0,0 +1,49 @@
+import os
+import sys
+import httpx
+import pytest
+from types import SimpleNamespace
+
+# The API modules import each other by name, as they do when run from the api directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import create_database_engine
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """A database engine configured like the API's, on a database file of its own."""
+    engine = create_database_engine(f'sqlite:///{tmp_path / "database.db"}')
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def client(engine, monkeypatch):
+    """A client of the API reading from the test database, with nothing synced yet. Startup is
+        not run, so no refresh starts in the background."""
+    import main
+    from fastapi.testclient import TestClient
+    monkeypatch.setattr(main, 'engine', engine)
+    main.response_cache.set_version(0)
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def sheets(monkeypatch):
+    """Stands in for the Google Sheets CSV export. Tests fill in exports with the CSV text and
+        response headers of each sheet; a request whose If-None-Match matches a sheet's ETag
+        is answered with a 304. Every request is recorded in requests."""
+    import utils
+    server = SimpleNamespace(exports={}, requests=[])
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        server.requests.append(request)
+        csv, headers = server.exports[request.url.params['sheet']]
+        if 'ETag' in headers and request.headers.get('If-None-Match') == headers['ETag']:
+            return httpx.Response(status_code=304, headers=headers)
+        return httpx.Response(status_code=200, content=csv.encode(), headers=headers)
+
+    monkeypatch.setenv('SHEET_ID', 'test-sheet')
+    monkeypatch.setattr(utils, 'http_client', httpx.Client(transport=httpx.MockTransport(handle)))
+    return server
@@ -0,0 +1,132 @@
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+import main
+from database import increment_data_version, sync_table
+
+TRANSACTIONS = pd.DataFrame([
+    {'Date': '1/3/2024', 'Merchant': 'Kroger', 'Amount': 54.21, 'Group': 'Expenses', 'Category': 'Food & Drink', 'Subcategory': 'Groceries', 'Account': 'Checking'},
+    {'Date': '1/15/2024', 'Merchant': 'Shell', 'Amount': 40.0, 'Group': 'Expenses', 'Category': 'Auto', 'Subcategory': 'Gas', 'Account': 'Visa'},
+    {'Date': '2/2/2024', 'Merchant': 'Kroger', 'Amount': 61.5, 'Group': 'Expenses', 'Category': 'Food & Drink', 'Subcategory': 'Groceries', 'Account': 'Checking'},
+    {'Date': '2/15/2024', 'Merchant': 'Acme', 'Amount': 3000.0, 'Group': 'Income', 'Category': 'Salary', 'Subcategory': 'Paycheck', 'Account': 'Checking'}
+])
+NET_WORTH = pd.DataFrame([
+    {'Date': '1/31/2024', 'Account': 'Checking', 'Category': 'Asset', 'Subcategory': 'Cash', 'Balance': 1234.5},
+    {'Date': '1/31/2024', 'Account': 'Visa', 'Category': 'Liability', 'Subcategory': 'Credit Card', 'Balance': 200.0}
+])
+
+
+def sync(engine, transactions: pd.DataFrame) -> int:
+    """Syncs the given transactions and NET_WORTH, and moves the API to the new data version."""
+    with engine.begin() as conn:
+        sync_table(conn=conn, table='Transaction_Log', df=transactions, mode='full')
+        sync_table(conn=conn, table='Net_Worth_Log', df=NET_WORTH, mode='full')
+        version = increment_data_version(conn)
+    main.response_cache.set_version(version)
+    return version
+
+
+@pytest.fixture
+def api(client, engine):
+    """The API, serving TRANSACTIONS and NET_WORTH."""
+    sync(engine, TRANSACTIONS)
+    return client
+
+
+def test_batch_results_match_their_endpoints(api):
+    queries = [
+        {'name': 'expenses', 'path': '/transactions', 'params': {'group': 'Expenses', 'order': 'desc'}},
+        {'name': 'monthly', 'path': '/transactions/aggregate', 'params': {'bucket': 'month'}},
+        {'name': 'balances', 'path': '/networth/latest'},
+        {'name': 'as_of', 'path': '/networth/as-of', 'params': {'date': '2024-01-01'}}
+    ]
+    response = api.post('/batch', json={'queries': queries})
+    assert response.status_code == 200
+    body = response.json()
+    assert body['data_version'] == int(response.headers['X-Data-Version'])
+    for query in queries[:2]:
+        assert body['results'][query['name']] == api.get(query['path'], params=query['params']).json()
+    assert body['results']['balances'] == api.get('/networth/latest').json()['accounts']
+    assert body['results']['as_of'] == []
+    assert body['next_cursors'] == {'expenses': None, 'monthly': None, 'balances': None, 'as_of': None}
+
+
+def test_batch_reads_one_snapshot_while_a_refresh_commits(api, engine, monkeypatch):
+    run_read_query = main.run_read_query
+    refreshed = []
+
+    # Commit a refresh from another connection once the first query of the batch has run
+    def run_then_refresh(connection, query, arrow):
+        result = run_read_query(connection=connection, query=query, arrow=arrow)
+        if not refreshed:
+            refreshed.append(sync(engine, TRANSACTIONS.iloc[:1]))
+        return result
+
+    monkeypatch.setattr(main, 'run_read_query', run_then_refresh)
+    response = api.post('/batch', json={'queries': [
+        {'name': 'first', 'path': '/transactions'},
+        {'name': 'second', 'path': '/transactions'}
+    ]})
+    body = response.json()
+    assert body['data_version'] == refreshed[0] - 1
+    assert len(body['results']['first']) == len(body['results']['second']) == 4
+
+    # The next batch sees the refresh, all at once
+    monkeypatch.setattr(main, 'run_read_query', run_read_query)
+    body = api.post('/batch', json={'queries': [
+        {'name': 'first', 'path': '/transactions'},
+        {'name': 'second', 'path': '/transactions'}
+    ]}).json()
+    assert body['data_version'] == refreshed[0]
+    assert len(body['results']['first']) == len(body['results']['second']) == 1
+
+
+@pytest.mark.parametrize('query, loc', [
+    ({'name': 'bad', 'path': '/transactions', 'params': {'limit': 0}}, ['body', 'bad', 'limit']),
+    ({'name': 'bad', 'path': '/transactions', 'params': {'colour': 'red'}}, ['body', 'bad', 'colour']),
+    ({'name': 'bad', 'path': '/transactions/aggregate', 'params': {'bucket': 'fortnight'}}, ['body', 'bad', 'bucket']),
+    ({'name': 'bad', 'path': '/networth/as-of', 'params': {'date': '2024-2-1'}}, ['body', 'bad', 'date'])
+])
+def test_batch_rejects_invalid_params_with_422(api, query, loc):
+    response = api.post('/batch', json={'queries': [{'name': 'ok', 'path': '/transactions'}, query]})
+    assert response.status_code == 422
+    assert [error['loc'] for error in response.json()['detail']] == [loc]
+
+
+@pytest.mark.parametrize('queries, detail', [
+    ([{'name': 'a', 'path': '/refresh-data'}], 'path must be one of'),
+    ([{'name': 'a', 'path': '/transactions'}, {'name': 'a', 'path': '/transactions'}], 'unique name'),
+    ([{'name': 'a', 'path': '/transactions', 'params': {'amount_op': ['gt', 'lt'], 'amount': [1]}}], 'amount'),
+    ([{'name': 'a', 'path': '/transactions', 'params': {'cursor': 'not-a-cursor', 'limit': 2}}], 'cursor')
+])
+def test_batch_passes_400_through(api, queries, detail):
+    response = api.post('/batch', json={'queries': queries})
+    assert response.status_code == 400
+    assert detail in response.json()['detail']
+
+
+def test_batch_arrow_envelope(api):
+    response = api.post(
+        '/batch',
+        json={'queries': [
+            {'name': 'page', 'path': '/transactions', 'params': {'limit': 2}},
+            {'name': 'balances', 'path': '/networth/latest'}
+        ]},
+        headers={'Accept': main.ARROW_MEDIA_TYPE}
+    )
+    assert response.headers['content-type'] == main.ARROW_MEDIA_TYPE
+    batch = pa.ipc.open_stream(response.content).read_all()
+    assert batch.schema.names == ['name', 'data', 'next_cursor']
+    assert batch.column('name').to_pylist() == ['page', 'balances']
+    cursors = batch.column('next_cursor').to_pylist()
+    assert cursors[0] is not None and cursors[1] is None
+
+    page, balances = [pa.ipc.open_stream(data.as_py()).read_all() for data in batch.column('data')]
+    assert page.column('Merchant').to_pylist() == ['Kroger', 'Shell']
+    assert balances.schema == main.NET_WORTH_DETAIL_ARROW_SCHEMA
+    assert [str(balance) for balance in balances.column('Balance').to_pylist()] == ['1234.50', '200.00']
+
+    # The cursor continues the page the same way the endpoint's does
+    next_page = api.get('/transactions', params={'limit': 2, 'cursor': cursors[0]}).json()
+    assert [row['Merchant'] for row in next_page] == ['Kroger', 'Acme']
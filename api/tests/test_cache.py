@@ -0,0 +1,31 @@
+import pytest
+
+from cache import CachedResponse, ResponseCache, etag_matches
+
+ETAG = '"abc123"'
+
+
+@pytest.mark.parametrize('if_none_match, matches', [
+    (None, False),
+    ('', False),
+    ('"abc123"', True),
+    ('W/"abc123"', True),
+    ('"other", W/"abc123"', True),
+    ('"other"', False),
+    ('abc123', False),
+    ('*', True)
+])
+def test_etag_matches(if_none_match, matches):
+    assert etag_matches(etag=ETAG, if_none_match=if_none_match) == matches
+
+
+def test_entries_cached_before_a_new_version_are_dropped():
+    cache = ResponseCache(max_bytes=1024, max_entry_bytes=256)
+    cache.set_version(1)
+    key = cache.make_key(path='/transactions', query=[('group', 'Income')], accept=None)
+    cache.put(key, CachedResponse(body=b'[]', headers={}))
+    assert cache.get(key) is not None
+    cache.set_version(2)
+    assert cache.get(key) is None
+    cache.put(key, CachedResponse(body=b'[]', headers={}))
+    assert cache.stats()['entries'] == 0
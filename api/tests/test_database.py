@@ -0,0 +1,136 @@
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from database import TABLE_SCHEMAS, build_rollup, sync_table
+
+ROLLUP = TABLE_SCHEMAS['Transaction_Log']['rollup']
+
+
+def transactions(*rows: tuple) -> pd.DataFrame:
+    """Builds Transaction_Log sheet data as it looks after parsing, from (Date, Merchant,
+        Amount, Category, Account) tuples."""
+    return pd.DataFrame(
+        [
+            {
+                'Date': date,
+                'Merchant': merchant,
+                'Amount': amount,
+                'Group': 'Expenses',
+                'Category': category,
+                'Subcategory': category,
+                'Account': account
+            }
+            for date, merchant, amount, category, account in rows
+        ]
+    )
+
+
+def read_rows(conn, table: str = 'Transaction_Log') -> list[tuple]:
+    """Reads a table's sheet columns in row order."""
+    return conn.execute(text(
+        f'SELECT "Date", Merchant, Amount, Category, Account FROM "{table}" ORDER BY Row_Id'
+    )).all()
+
+
+def read_rollup(conn) -> list[tuple]:
+    """Reads every row of the monthly rollup in a stable order."""
+    return conn.execute(text(
+        f'SELECT * FROM "{ROLLUP["table"]}" ORDER BY "Month", "Group", Category, Subcategory, Account'
+    )).all()
+
+
+SHEET = transactions(
+    ('1/3/2024', 'Kroger', 54.21, 'Groceries', 'Checking'),
+    ('1/15/2024', 'Shell', 40.0, 'Gas', 'Visa'),
+    ('2/2/2024', 'Kroger', 61.5, 'Groceries', 'Checking'),
+    ('3/9/2024', 'Netflix', 15.49, 'Streaming', 'Visa')
+)
+
+
+@pytest.fixture
+def synced(engine):
+    """An engine whose Transaction_Log was fully synced from SHEET."""
+    with engine.begin() as conn:
+        sync_table(conn=conn, table='Transaction_Log', df=SHEET, mode='full')
+    return engine
+
+
+def test_incremental_sync_writes_only_new_rows(synced):
+    sheet = pd.concat([SHEET, transactions(('3/20/2024', 'Target', 23.99, 'Shopping', 'Visa'))])
+    with synced.begin() as conn:
+        counts = sync_table(conn=conn, table='Transaction_Log', df=sheet)
+        rows = read_rows(conn)
+    assert counts == {'mode': 'incremental', 'inserted': 1, 'updated': 0, 'deleted': 0, 'unchanged': 4}
+    assert rows[-1] == ('2024-03-20', 'Target', 2399, 'Shopping', 'Visa')
+    assert len(rows) == 5
+
+
+def test_incremental_sync_rewrites_recategorized_row(synced):
+    sheet = SHEET.copy()
+    sheet.loc[1, ['Category', 'Subcategory']] = 'Travel'
+    with synced.begin() as conn:
+        counts = sync_table(conn=conn, table='Transaction_Log', df=sheet)
+        rows = read_rows(conn)
+    assert counts == {'mode': 'incremental', 'inserted': 0, 'updated': 1, 'deleted': 0, 'unchanged': 3}
+    assert ('2024-01-15', 'Shell', 4000, 'Travel', 'Visa') in rows
+    assert ('2024-01-15', 'Shell', 4000, 'Gas', 'Visa') not in rows
+    assert len(rows) == 4
+
+
+def test_incremental_sync_deletes_removed_rows(synced):
+    with synced.begin() as conn:
+        counts = sync_table(conn=conn, table='Transaction_Log', df=SHEET.drop(index=[0, 3]))
+        rows = read_rows(conn)
+    assert counts == {'mode': 'incremental', 'inserted': 0, 'updated': 0, 'deleted': 2, 'unchanged': 2}
+    assert rows == [
+        ('2024-01-15', 'Shell', 4000, 'Gas', 'Visa'),
+        ('2024-02-02', 'Kroger', 6150, 'Groceries', 'Checking')
+    ]
+
+
+def test_duplicate_rows_are_kept_and_removed_one_at_a_time(engine):
+    coffee = ('4/1/2024', 'Starbucks', 5.25, 'Coffee', 'Visa')
+    with engine.begin() as conn:
+        sync_table(conn=conn, table='Transaction_Log', df=transactions(coffee, coffee, coffee), mode='full')
+        keys = conn.execute(text('SELECT COUNT(DISTINCT Row_Key) FROM Transaction_Log')).scalar_one()
+        unchanged = sync_table(conn=conn, table='Transaction_Log', df=transactions(coffee, coffee, coffee))
+        removed = sync_table(conn=conn, table='Transaction_Log', df=transactions(coffee, coffee))
+        rows = read_rows(conn)
+    assert keys == 3
+    assert unchanged == {'mode': 'incremental', 'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 3}
+    assert removed == {'mode': 'incremental', 'inserted': 0, 'updated': 0, 'deleted': 1, 'unchanged': 2}
+    assert rows == [('2024-04-01', 'Starbucks', 525, 'Coffee', 'Visa')] * 2
+
+
+def test_incremental_rollup_matches_full_rebuild(synced):
+    sheet = SHEET.drop(index=[2])
+    sheet.loc[0, 'Amount'] = 60.0
+    sheet.loc[1, 'Account'] = 'Amex'
+    sheet = pd.concat([sheet, transactions(
+        ('3/9/2024', 'Netflix', 15.49, 'Streaming', 'Visa'),
+        ('5/30/2024', 'Shell', 38.75, 'Gas', 'Visa')
+    )])
+    with synced.begin() as conn:
+        counts = sync_table(conn=conn, table='Transaction_Log', df=sheet)
+        incremental = read_rollup(conn)
+        build_rollup(conn=conn, table='Transaction_Log', rollup=ROLLUP)
+        rebuilt = read_rollup(conn)
+    assert counts['mode'] == 'incremental'
+    assert incremental == rebuilt
+    assert [row.Month for row in rebuilt] == ['2024-01-01', '2024-01-01', '2024-03-01', '2024-05-01']
+
+
+def test_rows_without_a_readable_date_are_skipped(engine, caplog):
+    sheet = transactions(
+        ('1/3/2024', 'Kroger', 54.21, 'Groceries', 'Checking'),
+        (None, 'Shell', 40.0, 'Gas', 'Visa'),
+        ('pending', 'Target', 12.0, 'Shopping', 'Visa'),
+        ('2/2/2024', 'Kroger', 61.5, 'Groceries', 'Checking')
+    )
+    with engine.begin() as conn:
+        counts = sync_table(conn=conn, table='Transaction_Log', df=sheet, mode='full')
+        rows = read_rows(conn)
+    assert counts['inserted'] == 2
+    assert [row.Date for row in rows] == ['2024-01-03', '2024-02-02']
+    assert 'Skipping 2 rows missing a value for Date, at sheet rows [3, 4]' in caplog.text
@@ -0,0 +1,103 @@
+import pandas as pd
+import pytest
+
+import main
+from database import increment_data_version, sync_table
+
+
+def transactions(*rows: tuple) -> pd.DataFrame:
+    """Builds Transaction_Log sheet data from (Date, Group, Category, Subcategory, Account) tuples."""
+    return pd.DataFrame([
+        {'Date': date, 'Merchant': 'Store', 'Amount': 10.0, 'Group': group, 'Category': category,
+         'Subcategory': subcategory, 'Account': account}
+        for date, group, category, subcategory, account in rows
+    ])
+
+
+SHEET = transactions(
+    ('12/30/2023', 'Expenses', 'Food & Drink', 'Groceries', 'Visa'),
+    ('1/3/2024', 'Expenses', 'Food & Drink', 'Groceries', 'Checking'),
+    ('1/9/2024', 'Expenses', 'Food & Drink', 'Restaurants', 'Visa'),
+    ('1/15/2024', 'Expenses', 'Pets', 'Pet Food', 'Visa'),
+    ('2/1/2024', 'Income', 'Salary', 'Paycheck', 'Checking'),
+    ('3/9/2024', 'Expenses', None, None, 'Checking')
+)
+
+
+def sync(engine, df: pd.DataFrame, mode: str):
+    """Syncs the sheet data and moves the API to the new data version."""
+    with engine.begin() as conn:
+        sync_table(conn=conn, table='Transaction_Log', df=df, mode=mode)
+        main.response_cache.set_version(increment_data_version(conn))
+
+
+@pytest.fixture
+def api(client, engine):
+    """The API, serving SHEET."""
+    sync(engine, SHEET, mode='full')
+    return client
+
+
+def values(facets: list[dict]) -> list[str]:
+    """Returns the values of a list of facets."""
+    return [facet['value'] for facet in facets]
+
+
+def test_facets_list_distinct_values_and_date_range(api):
+    facets = api.get('/transactions/facets').json()
+    assert (facets['min_date'], facets['max_date']) == ('2023-12-30', '2024-03-09')
+    assert facets['years'] == [2023, 2024]
+    assert facets['months'] == ['2023-12-01', '2024-01-01', '2024-02-01', '2024-03-01']
+    assert values(facets['groups']) == ['Expenses', 'Income']
+    assert values(facets['categories']) == ['Food & Drink', 'Pets', 'Salary']
+    assert values(facets['subcategories']) == ['Groceries', 'Paycheck', 'Pet Food', 'Restaurants']
+    assert values(facets['accounts']) == ['Checking', 'Visa']
+    # Counts are left out unless they are asked for
+    assert 'count' not in facets['groups'][0]
+
+
+def test_facets_hierarchy(api):
+    hierarchy = api.get('/transactions/facets').json()['hierarchy']
+    assert hierarchy == [
+        {'value': 'Expenses', 'children': [
+            {'value': 'Food & Drink', 'children': [{'value': 'Groceries'}, {'value': 'Restaurants'}]},
+            {'value': 'Pets', 'children': [{'value': 'Pet Food'}]}
+        ]},
+        {'value': 'Income', 'children': [
+            {'value': 'Salary', 'children': [{'value': 'Paycheck'}]}
+        ]}
+    ]
+
+
+def test_facets_with_counts(api):
+    facets = api.get('/transactions/facets', params={'counts': 'true'}).json()
+    assert {facet['value']: facet['count'] for facet in facets['groups']} == {'Expenses': 5, 'Income': 1}
+    assert {facet['value']: facet['count'] for facet in facets['accounts']} == {'Checking': 3, 'Visa': 3}
+    food = facets['hierarchy'][0]['children'][0]
+    assert (food['value'], food['count']) == ('Food & Drink', 3)
+    assert [(facet['value'], facet['count']) for facet in food['children']] == [('Groceries', 2), ('Restaurants', 1)]
+
+
+def test_facets_follow_an_incremental_sync_through_the_rollup(api, engine):
+    # Move the December transaction to Amex, recategorize the pet food and add a March bonus
+    sheet = SHEET.copy()
+    sheet.loc[0, 'Account'] = 'Amex'
+    sheet.loc[3, ['Category', 'Subcategory']] = ['Shopping', 'Pet Supplies']
+    sheet = pd.concat([sheet, transactions(('3/31/2024', 'Income', 'Salary', 'Bonus', 'Checking'))])
+    sync(engine, sheet, mode='incremental')
+
+    facets = api.get('/transactions/facets', params={'counts': 'true'}).json()
+    assert facets['max_date'] == '2024-03-31'
+    assert {facet['value']: facet['count'] for facet in facets['accounts']} == {'Amex': 1, 'Checking': 4, 'Visa': 2}
+    assert values(facets['categories']) == ['Food & Drink', 'Salary', 'Shopping']
+    expenses, income = facets['hierarchy']
+    assert values(expenses['children']) == ['Food & Drink', 'Shopping']
+    assert [(facet['value'], facet['count']) for facet in income['children'][0]['children']] == [('Bonus', 1), ('Paycheck', 1)]
+
+    # Dropping the only 2023 transaction drops its year and month
+    sync(engine, sheet.iloc[1:], mode='incremental')
+    facets = api.get('/transactions/facets').json()
+    assert facets['min_date'] == '2024-01-03'
+    assert facets['years'] == [2024]
+    assert facets['months'] == ['2024-01-01', '2024-02-01', '2024-03-01']
+    assert 'Amex' not in values(facets['accounts'])
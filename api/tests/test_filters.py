@@ -0,0 +1,82 @@
+import json
+import pandas as pd
+import pytest
+
+import main
+from database import increment_data_version, sync_table
+
+TRANSACTIONS = pd.DataFrame([
+    {'Date': '1/3/2024', 'Merchant': 'Kroger', 'Amount': 54.21, 'Group': 'Expenses', 'Category': 'Food & Drink', 'Subcategory': 'Groceries', 'Account': 'Checking'},
+    {'Date': '1/9/2024', 'Merchant': 'Chewy', 'Amount': 30.0, 'Group': 'Expenses', 'Category': 'Pets', 'Subcategory': 'Pet Food', 'Account': 'Visa'},
+    {'Date': '1/15/2024', 'Merchant': 'Shell', 'Amount': 40.0, 'Group': 'Expenses', 'Category': 'Auto', 'Subcategory': 'Gas', 'Account': 'Visa'},
+    {'Date': '1/20/2024', 'Merchant': 'Venmo', 'Amount': 12.0, 'Group': 'Expenses', 'Category': None, 'Subcategory': None, 'Account': 'Checking'},
+    {'Date': '2/2/2024', 'Merchant': 'Kroger', 'Amount': 61.5, 'Group': 'Expenses', 'Category': 'Food & Drink', 'Subcategory': 'Groceries', 'Account': 'Amex'},
+    {'Date': '2/15/2024', 'Merchant': 'Acme', 'Amount': 3000.0, 'Group': 'Income', 'Category': 'Salary', 'Subcategory': 'Paycheck', 'Account': 'Checking'}
+])
+
+
+@pytest.fixture
+def api(client, engine):
+    """The API, serving TRANSACTIONS."""
+    with engine.begin() as conn:
+        sync_table(conn=conn, table='Transaction_Log', df=TRANSACTIONS, mode='full')
+        main.response_cache.set_version(increment_data_version(conn))
+    return client
+
+
+def merchants(api, **params) -> list[str]:
+    """Fetches /transactions with the given filters and returns the merchant of each row."""
+    response = api.get('/transactions', params=params)
+    assert response.status_code == 200
+    return [row['Merchant'] for row in response.json()]
+
+
+def test_repeated_filter_matches_any_of_its_values(api):
+    assert merchants(api, category=['Pets', 'Auto']) == ['Chewy', 'Shell']
+    assert merchants(api, account=['Amex', 'Visa'], category=['Food & Drink', 'Auto']) == ['Shell', 'Kroger']
+    # Repeating a value is the same as giving it once
+    assert merchants(api, category=['Pets', 'Pets']) == ['Chewy']
+
+
+def test_many_values_are_bound_as_one_json_array():
+    where_clause, params = main.transaction_filters(category=['Pets', 'Auto'], account=['Visa'])
+    assert params['category'] == json.dumps(['Pets', 'Auto'])
+    assert params['account'] == 'Visa'
+    assert '"Category" IN (SELECT value FROM json_each(:category))' in where_clause
+    assert '"Account" = :account' in where_clause
+
+
+def test_excluded_filter_matches_rows_with_none_of_its_values(api):
+    assert merchants(api, category=['Food & Drink', 'Salary'], exclude='Category') == ['Chewy', 'Shell', 'Venmo']
+    assert merchants(api, account='Checking', exclude='Account') == ['Chewy', 'Shell', 'Kroger']
+    # Only the columns named in exclude are inverted
+    assert merchants(api, group='Expenses', account=['Checking', 'Amex'], exclude='Account') == ['Chewy', 'Shell']
+
+
+def test_amount_comparisons_combine_into_a_range(api):
+    assert merchants(api, amount_op=['gte', 'lt'], amount=[30, 55]) == ['Kroger', 'Chewy', 'Shell']
+    assert merchants(api, amount_op='eq', amount=61.5) == ['Kroger']
+
+
+@pytest.mark.parametrize('path', ['/transactions', '/transactions/aggregate'])
+@pytest.mark.parametrize('params', [
+    {'amount_op': ['gte', 'lt'], 'amount': 30},
+    {'amount_op': 'gt'},
+    {'amount': 30}
+])
+def test_mismatched_amount_comparisons_are_rejected(api, path, params):
+    response = api.get(path, params=params)
+    assert response.status_code == 400
+    assert 'amount_op' in response.json()['detail']
+
+
+def test_filters_of_the_same_shape_share_a_compiled_clause(api):
+    main.transaction_filter_sql.cache_clear()
+    assert merchants(api, category=['Pets', 'Auto'], amount_op='lt', amount=35) == ['Chewy']
+    assert merchants(api, category=['Food & Drink', 'Salary'], amount_op='lt', amount=60) == ['Kroger']
+    info = main.transaction_filter_sql.cache_info()
+    assert (info.misses, info.hits) == (1, 1)
+
+    # A single value compiles to a different clause than a list of them
+    assert merchants(api, category='Auto', amount_op='lt', amount=60) == ['Shell']
+    assert main.transaction_filter_sql.cache_info().misses == 2
@@ -0,0 +1,66 @@
+import threading
+import time
+
+from jobs import RefreshJobManager
+from utils import RefreshMode, RefreshPhase
+
+
+class BlockingRefresh:
+    """Stands in for refresh_data, recording the mode of each refresh and holding each one in
+        the fetching phase until it is released."""
+    def __init__(self):
+        self.modes = []
+        self.started = threading.Semaphore(0)
+        self.release = threading.Semaphore(0)
+
+    def __call__(self, mode, on_phase):
+        self.modes.append(mode)
+        on_phase(RefreshPhase.fetching)
+        self.started.release()
+        assert self.release.acquire(timeout=5)
+        return []
+
+
+def wait_for(manager: RefreshJobManager, job_id: str, phase: str):
+    """Waits until a job reaches a phase."""
+    deadline = time.monotonic() + 5
+    while manager.get(job_id).phase != phase:
+        assert time.monotonic() < deadline, manager.get(job_id)
+        time.sleep(0.01)
+
+
+def test_requests_during_a_refresh_join_it():
+    refresh = BlockingRefresh()
+    manager = RefreshJobManager(refresh=refresh)
+    job = manager.submit(mode=RefreshMode.full)
+    assert refresh.started.acquire(timeout=5)
+    assert manager.submit(mode=RefreshMode.incremental).id == job.id
+    assert manager.submit(mode=RefreshMode.full).id == job.id
+    refresh.release.release()
+    wait_for(manager, job.id, 'succeeded')
+    assert refresh.modes == [RefreshMode.full]
+
+
+def test_full_refresh_during_an_incremental_one_is_queued_after_it():
+    refresh = BlockingRefresh()
+    manager = RefreshJobManager(refresh=refresh)
+    incremental = manager.submit(mode=RefreshMode.incremental)
+    assert refresh.started.acquire(timeout=5)
+
+    full = manager.submit(mode=RefreshMode.full)
+    assert full.id != incremental.id
+    assert (full.mode, full.phase) == ('full', 'queued')
+    # Further requests for a full refresh join the queued one, and incremental ones the running one
+    assert manager.submit(mode=RefreshMode.full).id == full.id
+    assert manager.submit(mode=RefreshMode.incremental).id == incremental.id
+
+    refresh.release.release()
+    wait_for(manager, incremental.id, 'succeeded')
+    assert refresh.started.acquire(timeout=5)
+    assert manager.get_active().id == full.id
+    assert manager.get(full.id).phase == 'fetching'
+    refresh.release.release()
+    wait_for(manager, full.id, 'succeeded')
+    assert refresh.modes == [RefreshMode.incremental, RefreshMode.full]
+    assert manager.get_active() is None
+    assert set(manager.get(full.id).timings) == {'queued', 'fetching'}
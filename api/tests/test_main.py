@@ -0,0 +1,137 @@
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+import main
+from cache import ResponseCache
+from database import increment_data_version, sync_table
+
+
+def sync_net_worth(engine):
+    """Syncs a small Net_Worth_Log and moves the API to the new data version."""
+    df = pd.DataFrame([
+        {'Date': '1/31/2024', 'Account': 'Checking', 'Category': 'Asset', 'Subcategory': 'Cash', 'Balance': 1234.5},
+        {'Date': '1/31/2024', 'Account': 'Visa', 'Category': 'Liability', 'Subcategory': 'Credit Card', 'Balance': 200.0}
+    ])
+    with engine.begin() as conn:
+        sync_table(conn=conn, table='Net_Worth_Log', df=df, mode='full')
+        main.response_cache.set_version(increment_data_version(conn))
+
+
+def test_reads_answer_503_until_first_sync(client):
+    for path in ('/transactions', '/networth/latest', '/transactions/facets'):
+        response = client.get(path)
+        assert response.status_code == 503
+        assert 'not been synced' in response.json()['detail']
+    response = client.post('/batch', json={'queries': [{'name': 'nw', 'path': '/networth-detailed'}]})
+    assert response.status_code == 503
+    assert client.get('/data-version').json() == {'version': 0}
+    assert client.get('/').json()['data'] == 'empty'
+
+
+def test_reads_are_served_once_synced(client, engine):
+    sync_net_worth(engine)
+    response = client.get('/networth/latest')
+    assert response.status_code == 200
+    assert response.json()['net_worth'] == '1034.50'
+    with engine.connect() as conn:
+        assert conn.execute(text('SELECT COUNT(*) FROM Net_Worth_Log')).scalar_one() == 2
+
+
+def test_only_responses_under_the_entry_limit_are_cached(client, engine, monkeypatch):
+    monkeypatch.setattr(main, 'response_cache', ResponseCache(max_bytes=64 * 1024, max_entry_bytes=4 * 1024))
+    sync_net_worth(engine)
+    transactions = pd.DataFrame([
+        {'Date': '1/3/2024', 'Merchant': f'Merchant {index}', 'Amount': 12.5, 'Group': 'Expenses',
+         'Category': 'Shopping', 'Subcategory': 'Home', 'Account': 'Visa'}
+        for index in range(500)
+    ])
+    with engine.begin() as conn:
+        sync_table(conn=conn, table='Transaction_Log', df=transactions, mode='full')
+
+    for _ in range(2):
+        streamed = client.get('/transactions', params={'stream': 'true'})
+        assert len(streamed.content) > 4 * 1024
+        assert streamed.headers['X-Cache'] == 'MISS'
+    assert [client.get('/networth-detailed').headers['X-Cache'] for _ in range(2)] == ['MISS', 'HIT']
+    stats = main.response_cache.stats()
+    assert stats['entries'] == 1
+    assert stats['bytes'] <= 4 * 1024
+
+
+@pytest.fixture
+def net_worth_history(client, engine):
+    """The API, serving balances of three accounts recorded on different dates. Savings has
+        no balance after January."""
+    df = pd.DataFrame([
+        {'Date': '1/15/2024', 'Account': 'Savings', 'Category': 'Asset', 'Subcategory': 'Cash', 'Balance': 500.0},
+        {'Date': '1/31/2024', 'Account': 'Checking', 'Category': 'Asset', 'Subcategory': 'Cash', 'Balance': 1000.0},
+        {'Date': '1/31/2024', 'Account': 'Visa', 'Category': 'Liability', 'Subcategory': 'Credit Card', 'Balance': 200.0},
+        {'Date': '2/29/2024', 'Account': 'Checking', 'Category': 'Asset', 'Subcategory': 'Cash', 'Balance': 1200.0},
+        {'Date': '3/31/2024', 'Account': 'Checking', 'Category': 'Asset', 'Subcategory': 'Cash', 'Balance': 900.0},
+        {'Date': '3/31/2024', 'Account': 'Visa', 'Category': 'Liability', 'Subcategory': 'Credit Card', 'Balance': 50.0}
+    ])
+    with engine.begin() as conn:
+        sync_table(conn=conn, table='Net_Worth_Log', df=df, mode='full')
+        main.response_cache.set_version(increment_data_version(conn))
+    return client
+
+
+def balances(snapshot: dict) -> dict[str, tuple[str, str]]:
+    """Maps each account of a net worth snapshot to the date and balance it was read from."""
+    return {account['Account']: (account['Date'], account['Balance']) for account in snapshot['accounts']}
+
+
+def test_latest_networth_reads_each_accounts_latest_balance(net_worth_history):
+    snapshot = net_worth_history.get('/networth/latest').json()
+    assert snapshot['date'] == '2024-03-31'
+    assert balances(snapshot) == {
+        'Checking': ('2024-03-31', '900.00'),
+        'Savings': ('2024-01-15', '500.00'),
+        'Visa': ('2024-03-31', '50.00')
+    }
+    assert (snapshot['assets'], snapshot['liabilities'], snapshot['net_worth']) == ('1400.00', '50.00', '1350.00')
+
+
+def test_networth_as_of_reads_balances_on_or_before_the_date(net_worth_history):
+    snapshot = net_worth_history.get('/networth/as-of', params={'date': '2024-02-29'}).json()
+    assert snapshot['date'] == '2024-02-29'
+    assert balances(snapshot) == {
+        'Checking': ('2024-02-29', '1200.00'),
+        'Savings': ('2024-01-15', '500.00'),
+        'Visa': ('2024-01-31', '200.00')
+    }
+    assert snapshot['net_worth'] == '1500.00'
+
+    before = net_worth_history.get('/networth/as-of', params={'date': '2024-01-20'}).json()
+    assert balances(before) == {'Savings': ('2024-01-15', '500.00')}
+
+
+@pytest.mark.parametrize('date', ['2024-2-1', 'garbage', '2024-02-30'])
+def test_networth_as_of_rejects_malformed_dates(net_worth_history, date):
+    assert net_worth_history.get('/networth/as-of', params={'date': date}).status_code == 422
+
+
+def test_matching_etag_is_answered_with_304(client, engine):
+    sync_net_worth(engine)
+    first = client.get('/networth-detailed')
+    etag = first.headers['ETag']
+    assert first.headers['Cache-Control'] == 'no-cache'
+
+    for if_none_match in (etag, f'W/{etag}', f'"stale", {etag}', '*'):
+        response = client.get('/networth-detailed', headers={'If-None-Match': if_none_match})
+        assert response.status_code == 304
+        assert response.headers['ETag'] == etag
+        assert response.content == b''
+    assert client.get('/networth-detailed', headers={'If-None-Match': '"stale"'}).status_code == 200
+
+    # The same request in another format has an ETag of its own
+    arrow = client.get('/networth-detailed', headers={'Accept': main.ARROW_MEDIA_TYPE})
+    assert arrow.headers['ETag'] != etag
+
+    # A refresh that changes the data changes the ETag
+    sync_net_worth(engine)
+    response = client.get('/networth-detailed', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.json() == first.json()
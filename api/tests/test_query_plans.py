@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+import main
+from database import sync_table
+
+
+@pytest.fixture
+def synced(engine):
+    """An engine with a few hundred transactions and net worth rows synced into it."""
+    transactions = pd.DataFrame([
+        {
+            'Date': f'{index % 12 + 1}/{index % 28 + 1}/2024',
+            'Merchant': f'Merchant {index % 30}',
+            'Amount': index * 1.25,
+            'Group': ['Income', 'Expenses', 'Savings'][index % 3],
+            'Category': f'Category {index % 12}',
+            'Subcategory': f'Subcategory {index % 24}',
+            'Account': f'Account {index % 5}'
+        }
+        for index in range(600)
+    ])
+    net_worth = pd.DataFrame([
+        {
+            'Date': f'{month}/28/2024',
+            'Account': f'Account {account}',
+            'Category': 'Asset' if account < 3 else 'Liability',
+            'Subcategory': f'Subcategory {account}',
+            'Balance': 1000.0 * account + month
+        }
+        for month in range(1, 13)
+        for account in range(5)
+    ])
+    with engine.begin() as conn:
+        sync_table(conn=conn, table='Transaction_Log', df=transactions, mode='full')
+        sync_table(conn=conn, table='Net_Worth_Log', df=net_worth, mode='full')
+    return engine
+
+
+def query_plan(engine, query) -> list[str]:
+    """Returns the steps of the plan SQLite picks for a read query's JSON statement."""
+    with engine.connect() as conn:
+        rows = conn.execute(text(f'EXPLAIN QUERY PLAN {query.json_sql}'), query.params).all()
+    return [row[3] for row in rows]
+
+
+@pytest.mark.parametrize('filters, index', [
+    ({'start_date': '2024-03-01', 'end_date': '2024-03-31'}, 'Date'),
+    ({'merchant': ['Merchant 3']}, 'Merchant'),
+    ({'group': ['Expenses'], 'category': ['Category 4']}, 'Group_Category_Subcategory'),
+    ({'category': ['Category 4']}, 'Category_Subcategory'),
+    ({'category': ['Category 4', 'Category 5']}, 'Category_Subcategory'),
+    ({'account': ['Account 2']}, 'Account')
+])
+def test_transaction_filters_search_an_index(synced, filters, index):
+    plan = query_plan(synced, main.transactions_query(**filters))
+    assert plan[0].startswith(f'SEARCH Transaction_Log USING INDEX ix_Transaction_Log_{index}_')
+
+
+@pytest.mark.parametrize('filters, index', [
+    ({'start_date': '2024-06-01'}, 'Date'),
+    ({'account': 'Account 2'}, 'Account_Date')
+])
+def test_net_worth_filters_search_an_index(synced, filters, index):
+    plan = query_plan(synced, main.networth_detail_query(**filters))
+    assert plan[0].startswith(f'SEARCH Net_Worth_Log USING INDEX ix_Net_Worth_Log_{index}_')
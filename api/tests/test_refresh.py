@@ -0,0 +1,139 @@
+import io
+import hashlib
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+import main
+from database import (
+    TABLE_SCHEMAS,
+    add_row_fingerprints,
+    create_table_sql,
+    insert_rows,
+    load_sync_state,
+    save_sync_state
+)
+from utils import RefreshMode, convert_usd_columns
+
+NET_WORTH_CSV = '''Date,Account,Category,Subcategory,Balance
+1/31/2024,Checking,Asset,Cash,"$1,234.50"
+1/31/2024,Visa,Liability,Credit Card,$200.00
+'''
+
+
+@pytest.fixture
+def api(client, monkeypatch):
+    """The API, syncing only Net_Worth_Log from the stand-in sheet export."""
+    monkeypatch.setattr(main, 'SHEET_NAMES', ['Net_Worth_Log'])
+    return client
+
+
+def test_unchanged_sheet_is_skipped(api, sheets):
+    sheets.exports['Net_Worth_Log'] = (NET_WORTH_CSV, {})
+    first = main.refresh_data()
+    version = main.response_cache.version
+    second = main.refresh_data()
+    assert first[0]['status'] == 'synced'
+    assert second[0]['status'] == 'unchanged'
+    assert main.response_cache.version == version
+    full = main.refresh_data(mode=RefreshMode.full)
+    assert full[0]['status'] == 'synced'
+
+
+def test_new_validators_of_unchanged_sheet_are_recorded(api, sheets, engine):
+    sheets.exports['Net_Worth_Log'] = (NET_WORTH_CSV, {'ETag': '"v1"'})
+    main.refresh_data()
+
+    # Same export, but the server has moved on to a new ETag
+    sheets.exports['Net_Worth_Log'] = (NET_WORTH_CSV, {'ETag': '"v2"', 'Last-Modified': 'Wed, 31 Jan 2024 12:00:00 GMT'})
+    assert main.refresh_data()[0]['status'] == 'unchanged'
+    with engine.connect() as conn:
+        state = load_sync_state(conn)['Net_Worth_Log']
+    assert state['etag'] == '"v2"'
+    assert state['last_modified'] == 'Wed, 31 Jan 2024 12:00:00 GMT'
+
+    # The next refresh sends the new validators and is answered with a 304
+    assert main.refresh_data()[0]['status'] == 'unchanged'
+    assert sheets.requests[-1].headers['If-None-Match'] == '"v2"'
+    assert sheets.requests[-1].headers['If-Modified-Since'] == 'Wed, 31 Jan 2024 12:00:00 GMT'
+
+
+def test_table_from_older_schema_is_migrated_while_export_unchanged(api, sheets, engine):
+    # Sync the way releases before typed tables did: pandas-inferred columns, with dates left
+    # as they appear in the sheet, and the export's hash recorded
+    df = add_row_fingerprints(convert_usd_columns(pd.read_csv(io.StringIO(NET_WORTH_CSV))), ['Date', 'Account'])
+    with engine.begin() as conn:
+        df.to_sql(name='Net_Worth_Log', con=conn, index=False)
+        save_sync_state(
+            conn=conn,
+            sheet='Net_Worth_Log',
+            content_hash=hashlib.sha256(NET_WORTH_CSV.encode()).hexdigest(),
+            etag=None,
+            last_modified=None
+        )
+    sheets.exports['Net_Worth_Log'] = (NET_WORTH_CSV, {})
+
+    result = main.refresh_data()[0]
+    assert result['status'] == 'synced'
+    assert result['mode'] == 'full'
+    response = api.get('/networth-detailed')
+    assert response.status_code == 200
+    assert response.json()[0] == {
+        'Date': '2024-01-31',
+        'Account': 'Checking',
+        'Category': 'Asset',
+        'Subcategory': 'Cash',
+        'Balance': '1234.50'
+    }
+    with engine.connect() as conn:
+        assert conn.execute(text('SELECT typeof(Balance) FROM Net_Worth_Log LIMIT 1')).scalar_one() == 'integer'
+
+    # Once migrated, the unchanged export is skipped again
+    assert main.refresh_data()[0]['status'] == 'unchanged'
+
+
+def test_table_with_dollar_balances_is_migrated_to_cents_while_export_unchanged(api, sheets, engine):
+    # Sync the way the release that first typed the tables did, with balances in REAL dollars
+    schema = {**TABLE_SCHEMAS['Net_Worth_Log']}
+    schema['columns'] = {**schema['columns'], 'Balance': 'REAL'}
+    df = pd.DataFrame([
+        {'Date': '2024-01-31', 'Account': 'Checking', 'Category': 'Asset', 'Subcategory': 'Cash', 'Balance': 1234.5},
+        {'Date': '2024-01-31', 'Account': 'Visa', 'Category': 'Liability', 'Subcategory': 'Credit Card', 'Balance': 200.0}
+    ])
+    with engine.begin() as conn:
+        conn.execute(text(create_table_sql('Net_Worth_Log', schema)))
+        insert_rows(conn, 'Net_Worth_Log', add_row_fingerprints(df, schema['key_columns']))
+        save_sync_state(
+            conn=conn,
+            sheet='Net_Worth_Log',
+            content_hash=hashlib.sha256(NET_WORTH_CSV.encode()).hexdigest(),
+            etag=None,
+            last_modified=None
+        )
+    sheets.exports['Net_Worth_Log'] = (NET_WORTH_CSV, {})
+
+    assert main.refresh_data()[0]['status'] == 'synced'
+    balances = [row['Balance'] for row in api.get('/networth-detailed').json()]
+    assert balances == ['1234.50', '200.00']
+
+
+def test_rollup_is_not_built_from_table_with_older_schema(api, sheets, engine):
+    # A Transaction_Log synced before typed tables, with dates as they appear in the sheet and no
+    # rollup, left in place while only the other sheets are refreshed
+    csv = 'Date,Merchant,Amount,Group,Category,Subcategory,Account\n1/3/2024,Kroger,$54.21,Expenses,Food & Drink,Groceries,Checking\n'
+    df = add_row_fingerprints(convert_usd_columns(pd.read_csv(io.StringIO(csv))), TABLE_SCHEMAS['Transaction_Log']['key_columns'])
+    with engine.begin() as conn:
+        df.to_sql(name='Transaction_Log', con=conn, index=False)
+    sheets.exports['Net_Worth_Log'] = (NET_WORTH_CSV, {})
+
+    assert main.refresh_data()[0]['status'] == 'synced'
+    with engine.connect() as conn:
+        assert conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE name IN ('Transaction_Log_Monthly', 'Merchant_Search')"
+        )).all() == []
+
+
+def test_refresh_without_sheets_syncs_nothing(api, sheets, monkeypatch):
+    monkeypatch.setattr(main, 'SHEET_NAMES', [])
+    assert main.refresh_data() == []
+    assert sheets.requests == []
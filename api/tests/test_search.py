@@ -0,0 +1,102 @@
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+import main
+from database import increment_data_version, sync_table
+
+
+def transactions(*merchants: str) -> pd.DataFrame:
+    """Builds Transaction_Log sheet data with one transaction at each merchant given, in order."""
+    return pd.DataFrame([
+        {'Date': f'1/{index + 1}/2024', 'Merchant': merchant, 'Amount': 10.0, 'Group': 'Expenses',
+         'Category': 'Shopping', 'Subcategory': 'Home', 'Account': 'Visa'}
+        for index, merchant in enumerate(merchants)
+    ])
+
+
+SHEET = transactions('Kroger', 'Kroger', 'Kroger', 'Trader Joe\'s', 'Home Depot', 'Depot Cafe', 'KFC', '50% Off')
+
+
+def sync(engine, df: pd.DataFrame, mode: str):
+    """Syncs the sheet data and moves the API to the new data version."""
+    with engine.begin() as conn:
+        sync_table(conn=conn, table='Transaction_Log', df=df, mode=mode)
+        main.response_cache.set_version(increment_data_version(conn))
+
+
+@pytest.fixture
+def api(client, engine):
+    """The API, serving SHEET."""
+    sync(engine, SHEET, mode='full')
+    return client
+
+
+def matches(api, merchant: str, merchant_match: str) -> list[str]:
+    """Returns the distinct merchants of the transactions matching a merchant filter."""
+    response = api.get('/transactions', params={'merchant': merchant, 'merchant_match': merchant_match})
+    assert response.status_code == 200
+    return list(dict.fromkeys(row['Merchant'] for row in response.json()))
+
+
+def suggest(api, q: str, limit: int = 10) -> list[str]:
+    """Returns the merchants suggested for a search."""
+    response = api.get('/transactions/merchants', params={'q': q, 'limit': limit})
+    assert response.status_code == 200
+    return [row['Merchant'] for row in response.json()]
+
+
+def test_prefix_match_finds_names_starting_with_the_search(api):
+    assert matches(api, 'kro', 'prefix') == ['Kroger']
+    assert matches(api, 'DEPOT', 'prefix') == ['Depot Cafe']
+    assert matches(api, 'roger', 'prefix') == []
+
+
+def test_contains_match_finds_names_with_the_search_anywhere(api):
+    assert matches(api, 'depot', 'contains') == ['Home Depot', 'Depot Cafe']
+    assert matches(api, 'OGE', 'contains') == ['Kroger']
+    assert matches(api, 'joe\'s', 'contains') == ['Trader Joe\'s']
+
+
+def test_searches_shorter_than_a_trigram_fall_back_to_like(api):
+    assert matches(api, 'k', 'prefix') == ['Kroger', 'KFC']
+    assert matches(api, 'fc', 'contains') == ['KFC']
+    # LIKE wildcards in the search are matched literally
+    assert matches(api, '0%', 'contains') == ['50% Off']
+    assert matches(api, '%', 'contains') == ['50% Off']
+    assert matches(api, '5%', 'prefix') == []
+
+
+def test_suggestions_rank_prefixes_and_tolerate_misspellings(api):
+    assert suggest(api, 'kro')[0] == 'Kroger'
+    assert suggest(api, 'krogr')[0] == 'Kroger'
+    assert suggest(api, 'depto')[:2] == ['Depot Cafe', 'Home Depot']
+    assert suggest(api, 'depot') == ['Depot Cafe', 'Home Depot']
+
+
+def test_short_or_empty_suggestion_searches(api):
+    # Both start with the search, and the shorter name is the closer match
+    assert suggest(api, 'k') == ['KFC', 'Kroger']
+    assert suggest(api, 'fc') == ['KFC']
+    # Without a search, the merchants with the most transactions come first
+    assert suggest(api, '', limit=1) == ['Kroger']
+    assert len(suggest(api, '')) == 6
+    counts = {row['Merchant']: row['Count'] for row in api.get('/transactions/merchants').json()}
+    assert counts['Kroger'] == 3
+
+
+def test_search_index_is_rebuilt_after_an_incremental_sync(api, engine):
+    # Rename one Kroger transaction and drop Home Depot
+    sheet = SHEET.copy()
+    sheet.loc[0, 'Merchant'] = 'Whole Foods'
+    sheet = sheet.drop(index=[4])
+    sync(engine, sheet, mode='incremental')
+
+    assert suggest(api, 'whole') == ['Whole Foods']
+    assert suggest(api, 'home depot') == ['Depot Cafe']
+    assert matches(api, 'whole', 'prefix') == ['Whole Foods']
+    assert matches(api, 'home', 'contains') == []
+    with engine.connect() as conn:
+        counts = dict(conn.execute(text(f'SELECT Merchant, Count FROM {main.MERCHANT_SEARCH_TABLE}')).all())
+    assert counts['Kroger'] == 2
+    assert 'Home Depot' not in counts
@@ -0,0 +1,75 @@
+import pandas as pd
+import pytest
+from pydantic import TypeAdapter, validate_call
+
+import main
+from database import increment_data_version, sync_table
+from models import NetWorthAggregate, NetWorthDetail, Transaction, TransactionAggregate
+
+# Values the JSON has to get right: negative and sub-dollar cents, NULLs, quotes, backslashes,
+# control characters and non-ASCII text
+TRANSACTIONS = pd.DataFrame([
+    {'Date': '1/3/2024', 'Merchant': 'Kroger', 'Amount': 54.21, 'Group': 'Expenses', 'Category': 'Food & Drink', 'Subcategory': 'Groceries', 'Account': 'Checking'},
+    {'Date': '1/4/2024', 'Merchant': 'Joe\'s "Diner"', 'Amount': -0.05, 'Group': 'Expenses', 'Category': 'Food & Drink', 'Subcategory': 'Restaurants', 'Account': 'Visa'},
+    {'Date': '1/5/2024', 'Merchant': 'Café Müller 🍕', 'Amount': -1234.5, 'Group': 'Expenses', 'Category': 'Food & Drink', 'Subcategory': 'Restaurants', 'Account': 'Visa'},
+    {'Date': '1/6/2024', 'Merchant': None, 'Amount': None, 'Group': 'Income', 'Category': None, 'Subcategory': None, 'Account': None},
+    {'Date': '2/1/2024', 'Merchant': 'C:\\Store\\Main/Branch', 'Amount': 0.0, 'Group': 'Expenses', 'Category': 'Shopping', 'Subcategory': 'Home', 'Account': 'Amex'},
+    {'Date': '2/2/2024', 'Merchant': 'Tab\tand\nnewline', 'Amount': 1000000.99, 'Group': 'Income', 'Category': 'Salary', 'Subcategory': 'Paycheck', 'Account': 'Checking'}
+])
+NET_WORTH = pd.DataFrame([
+    {'Date': '1/31/2024', 'Account': 'Checking', 'Category': 'Asset', 'Subcategory': 'Cash', 'Balance': 1234.5},
+    {'Date': '1/31/2024', 'Account': 'Visa "Rewards"', 'Category': 'Liability', 'Subcategory': 'Credit Card', 'Balance': -0.99},
+    {'Date': '2/29/2024', 'Account': 'Épargne', 'Category': None, 'Subcategory': None, 'Balance': None}
+])
+
+
+@pytest.fixture
+def api(client, engine):
+    """The API, serving the transactions and net worth rows above."""
+    with engine.begin() as conn:
+        sync_table(conn=conn, table='Transaction_Log', df=TRANSACTIONS, mode='full')
+        sync_table(conn=conn, table='Net_Worth_Log', df=NET_WORTH, mode='full')
+        main.response_cache.set_version(increment_data_version(conn))
+    return client
+
+
+def serialize_with_model(engine, query, model) -> bytes:
+    """Serializes the rows of a read query through its response model, the way FastAPI would.
+        The Arrow statement selects the raw column values, named by the query's schema."""
+    with engine.connect() as conn:
+        rows, _ = main.run_read_query(connection=conn, query=query, arrow=True)
+    adapter = TypeAdapter(list[model])
+    records = adapter.validate_python([dict(zip(query.schema.names, row)) for row in rows])
+    return adapter.dump_json(records, exclude_unset=True)
+
+
+@pytest.mark.parametrize('params', [
+    {},
+    {'stream': 'true'},
+    {'order': 'desc'},
+    {'group': 'Expenses', 'limit': 2}
+])
+def test_transactions_match_model_serialization(api, engine, params):
+    query = validate_call(main.transactions_query)(**{name: value for name, value in params.items() if name != 'stream'})
+    response = api.get('/transactions', params=params)
+    assert response.status_code == 200
+    assert response.content == serialize_with_model(engine, query, Transaction)
+
+
+@pytest.mark.parametrize('params', [
+    {'aggregates': ['sum', 'count']},
+    {'by': ['Group', 'Category'], 'bucket': 'month', 'aggregates': ['sum', 'count', 'cumsum']},
+    {'by': 'Merchant', 'bucket': 'day'}
+])
+def test_transaction_aggregates_match_model_serialization(api, engine, params):
+    query = validate_call(main.transaction_aggregates_query)(**params)
+    response = api.get('/transactions/aggregate', params=params)
+    assert response.status_code == 200
+    assert response.content == serialize_with_model(engine, query, TransactionAggregate)
+
+
+def test_net_worth_matches_model_serialization(api, engine):
+    detailed = api.get('/networth-detailed')
+    aggregated = api.get('/networth-aggregated')
+    assert detailed.content == serialize_with_model(engine, main.networth_detail_query(), NetWorthDetail)
+    assert aggregated.content == serialize_with_model(engine, main.networth_aggregate_query(), NetWorthAggregate)
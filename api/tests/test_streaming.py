@@ -0,0 +1,77 @@
+import json
+import pandas as pd
+import pytest
+
+import main
+from cache import ResponseCache
+from database import increment_data_version, sync_table
+
+NDJSON = 'application/x-ndjson'
+
+# More rows than the stream fetches from the cursor at a time, with values JSON has to escape
+TRANSACTIONS = pd.DataFrame([
+    {'Date': f'{index % 12 + 1}/{index % 28 + 1}/2024', 'Merchant': ['Kroger', 'Joe\'s "Diner"', 'Café 🍕', 'Tab\there'][index % 4],
+     'Amount': index * 1.25 - 500, 'Group': 'Expenses' if index % 5 else 'Income', 'Category': 'Food & Drink',
+     'Subcategory': 'Groceries', 'Account': 'Checking' if index % 2 else 'Visa'}
+    for index in range(2500)
+])
+
+
+@pytest.fixture
+def api(client, engine):
+    """The API, serving TRANSACTIONS."""
+    with engine.begin() as conn:
+        sync_table(conn=conn, table='Transaction_Log', df=TRANSACTIONS, mode='full')
+        main.response_cache.set_version(increment_data_version(conn))
+    return client
+
+
+def read_ndjson(body: bytes) -> list[dict]:
+    """Parses a newline-delimited JSON body, which must end with a newline unless it is empty."""
+    text = body.decode()
+    assert text == '' or text.endswith('\n')
+    return [json.loads(line) for line in text.splitlines()]
+
+
+@pytest.mark.parametrize('params', [{}, {'group': 'Income', 'order': 'desc'}, {'account': 'Nobody'}])
+def test_streamed_responses_match_the_buffered_one(api, params):
+    buffered = api.get('/transactions', params=params)
+
+    streamed = api.get('/transactions', params={**params, 'stream': 'true'})
+    assert streamed.headers['content-type'] == 'application/json'
+    assert streamed.json() == buffered.json()
+
+    ndjson = api.get('/transactions', params=params, headers={'Accept': NDJSON})
+    assert ndjson.headers['content-type'] == NDJSON
+    assert read_ndjson(ndjson.content) == buffered.json()
+
+
+def test_streamed_json_is_byte_for_byte_the_buffered_body(api):
+    buffered = api.get('/transactions')
+    assert len(buffered.json()) == 2500
+    assert api.get('/transactions', params={'stream': 'true'}).content == buffered.content
+
+
+def test_paginated_ndjson_is_buffered_with_a_cursor(api):
+    page = api.get('/transactions', params={'limit': 10}, headers={'Accept': NDJSON})
+    assert page.headers['content-type'].startswith(NDJSON)
+    assert read_ndjson(page.content) == api.get('/transactions', params={'limit': 10}).json()
+    assert 'X-Next-Cursor' in page.headers
+
+
+def test_streamed_responses_and_the_cache_entry_limit(api, monkeypatch):
+    cache = ResponseCache(max_bytes=1024 * 1024, max_entry_bytes=64 * 1024)
+    cache.set_version(main.response_cache.version)
+    monkeypatch.setattr(main, 'response_cache', cache)
+
+    # A small stream is cached whole and served from the cache
+    small = [api.get('/transactions', params={'group': 'Income', 'account': 'Visa', 'stream': 'true'}) for _ in range(2)]
+    assert [response.headers['X-Cache'] for response in small] == ['MISS', 'HIT']
+    assert small[1].content == small[0].content
+
+    # A stream larger than an entry is passed through whole, but never cached
+    large = [api.get('/transactions', headers={'Accept': NDJSON}) for _ in range(2)]
+    assert len(large[0].content) > 64 * 1024
+    assert [response.headers['X-Cache'] for response in large] == ['MISS', 'MISS']
+    assert len(read_ndjson(large[1].content)) == 2500
+    assert cache.stats()['entries'] == 1
@@ -0,0 +1,95 @@
+import pandas as pd
+import pytest
+
+import main
+from database import increment_data_version, sync_table
+
+# Each account records its balance on dates of its own. In January, Checking ends at 1200,
+# Savings at 500 and Visa owes 200, for a net worth of 1500.
+NET_WORTH = pd.DataFrame([
+    {'Date': '1/10/2024', 'Account': 'Checking', 'Category': 'Asset', 'Subcategory': 'Cash', 'Balance': 1000.0},
+    {'Date': '1/15/2024', 'Account': 'Savings', 'Category': 'Asset', 'Subcategory': 'Savings', 'Balance': 500.0},
+    {'Date': '1/20/2024', 'Account': 'Visa', 'Category': 'Liability', 'Subcategory': 'Credit Card', 'Balance': 200.0},
+    {'Date': '1/31/2024', 'Account': 'Checking', 'Category': 'Asset', 'Subcategory': 'Cash', 'Balance': 1200.0},
+    {'Date': '2/28/2024', 'Account': 'Checking', 'Category': 'Asset', 'Subcategory': 'Cash', 'Balance': 900.0},
+    {'Date': '2/28/2024', 'Account': 'Savings', 'Category': 'Asset', 'Subcategory': 'Savings', 'Balance': 600.0},
+    {'Date': '2/28/2024', 'Account': 'Visa', 'Category': 'Liability', 'Subcategory': 'Credit Card', 'Balance': 100.0}
+])
+
+
+@pytest.fixture
+def api(client, engine):
+    """The API, serving NET_WORTH."""
+    with engine.begin() as conn:
+        sync_table(conn=conn, table='Net_Worth_Log', df=NET_WORTH, mode='full')
+        main.response_cache.set_version(increment_data_version(conn))
+    return client
+
+
+def series(api, **params) -> list[tuple]:
+    """Fetches /networth/timeseries and returns each point's values in column order."""
+    response = api.get('/networth/timeseries', params=params)
+    assert response.status_code == 200
+    return [tuple(point.values()) for point in response.json()]
+
+
+@pytest.mark.parametrize('agg, january', [
+    ('last', '1500.00'),
+    ('mean', '1400.00'),
+    ('max', '1500.00')
+])
+def test_each_accounts_balances_are_combined_within_a_period(api, agg, january):
+    assert series(api, agg=agg) == [('2024-01-01', january), ('2024-02-01', '1400.00')]
+
+
+@pytest.mark.parametrize('bucket, expected', [
+    ('day', [('2024-01-10', '1000.00'), ('2024-01-15', '500.00'), ('2024-01-20', '-200.00'), ('2024-01-31', '1200.00'), ('2024-02-28', '1400.00')]),
+    ('week', [('2024-01-08', '1000.00'), ('2024-01-15', '300.00'), ('2024-01-29', '1200.00'), ('2024-02-26', '1400.00')]),
+    ('quarter', [('2024-01-01', '1400.00')]),
+    ('year', [('2024-01-01', '1400.00')])
+])
+def test_buckets(api, bucket, expected):
+    assert series(api, bucket=bucket) == expected
+
+
+def test_series_grouped_by_category(api):
+    assert series(api, by='Category') == [
+        ('2024-01-01', 'Asset', '1700.00'),
+        ('2024-01-01', 'Liability', '-200.00'),
+        ('2024-02-01', 'Asset', '1500.00'),
+        ('2024-02-01', 'Liability', '-100.00')
+    ]
+    assert series(api, by=['Category', 'Account'], bucket='year', category='Asset') == [
+        ('2024-01-01', 'Asset', 'Checking', '900.00'),
+        ('2024-01-01', 'Asset', 'Savings', '600.00')
+    ]
+
+
+def test_downsampled_series_keeps_its_endpoints(client, engine):
+    months = pd.date_range('2020-01-31', periods=48, freq='ME')
+    df = pd.DataFrame([
+        {'Date': f'{date.month}/{date.day}/{date.year}', 'Account': account, 'Category': 'Asset',
+         'Subcategory': 'Cash', 'Balance': 1000.0 + index * (10 if account == 'Checking' else -3) + (500 if index == 17 else 0)}
+        for index, date in enumerate(months)
+        for account in ('Checking', 'Savings')
+    ])
+    with engine.begin() as conn:
+        sync_table(conn=conn, table='Net_Worth_Log', df=df, mode='full')
+        main.response_cache.set_version(increment_data_version(conn))
+
+    full = series(client)
+    assert len(full) == 48
+    downsampled = series(client, points=12)
+    assert len(downsampled) == 12
+    assert downsampled[0] == full[0] and downsampled[-1] == full[-1]
+    assert full[17] in downsampled
+    assert set(downsampled) <= set(full)
+
+    # Every group keeps the same periods
+    grouped = series(client, by='Account', points=12)
+    assert len(grouped) == 24
+    assert {point[0] for point in grouped} == {point[0] for point in downsampled}
+
+    assert series(client, points=48) == full
+    assert series(client, points=100) == full
+    assert client.get('/networth/timeseries', params={'points': 2}).status_code == 422
@@ -0,0 +1,83 @@
+import io
+import math
+import pandas as pd
+import pytest
+
+from utils import convert_usd_columns, downsample_rows, lttb
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('$1,234.56', 1234.56),
+    ('$0.99', 0.99),
+    ('  $7 ', 7.0),
+    ('-$5', -5.0),
+    ('$-5', -5.0),
+    ('($5)', -5.0),
+    ('($1,234.50)', -1234.5),
+    ('N/A', math.nan),
+    ('', math.nan),
+    (None, math.nan)
+])
+def test_convert_usd_columns_parses_value(value, expected):
+    df = convert_usd_columns(pd.DataFrame({'Amount': ['$1.00', value]}, dtype=object))
+    assert df['Amount'].dtype == float
+    assert df['Amount'].iloc[0] == 1.0
+    if math.isnan(expected):
+        assert math.isnan(df['Amount'].iloc[1])
+    else:
+        assert df['Amount'].iloc[1] == pytest.approx(expected)
+
+
+def test_convert_usd_columns_leaves_other_columns_alone():
+    df = pd.DataFrame({
+        'Merchant': ['Kroger', 'Shell (Main St)'],
+        'Count': [1, 2],
+        'Amount': ['$5.00', '($2.50)']
+    })
+    df = convert_usd_columns(df)
+    assert df['Merchant'].tolist() == ['Kroger', 'Shell (Main St)']
+    assert df['Count'].tolist() == [1, 2]
+    assert df['Amount'].tolist() == [5.0, -2.5]
+
+
+def test_convert_usd_columns_reads_csv_blanks_as_nan():
+    df = pd.read_csv(io.StringIO('Date,Amount\n1/1/2024,"$1,000.00"\n1/2/2024,\n1/3/2024,N/A\n'))
+    df = convert_usd_columns(df)
+    assert df['Amount'].iloc[0] == 1000.0
+    assert df['Amount'].iloc[1:].isna().all()
+
+
+def test_lttb_keeps_the_endpoints_and_the_number_of_points():
+    x = list(range(100))
+    y = [math.sin(value / 5) for value in x]
+    kept = lttb(x=x, y=y, threshold=10)
+    assert len(kept) == 10
+    assert kept[0] == 0 and kept[-1] == 99
+    assert kept == sorted(set(kept))
+
+
+def test_lttb_keeps_a_spike():
+    y = [0.0] * 50
+    y[23] = 100.0
+    assert 23 in lttb(x=list(range(50)), y=y, threshold=5)
+
+
+@pytest.mark.parametrize('threshold', [10, 11, 2])
+def test_lttb_keeps_every_point_of_a_short_series(threshold):
+    assert lttb(x=list(range(10)), y=[1.0] * 10, threshold=threshold) == list(range(10))
+
+
+def test_downsample_rows_keeps_whole_periods():
+    periods = [f'2024-{month:02d}-01' for month in range(1, 13)]
+    rows = [(period, group, month * 10 + index) for month, period in enumerate(periods) for index, group in enumerate('AB')]
+    kept = downsample_rows(rows=[(*row, row[0], row[2]) for row in rows], points=4)
+    kept_periods = list(dict.fromkeys(row[0] for row in kept))
+    assert len(kept_periods) == 4
+    assert kept_periods[0] == periods[0] and kept_periods[-1] == periods[-1]
+    assert len(kept) == 8
+
+
+def test_downsample_rows_returns_short_series_unchanged():
+    rows = [(f'2024-0{month}-01', month, f'2024-0{month}-01', month) for month in range(1, 6)]
+    assert downsample_rows(rows=rows, points=5) == rows
+    assert downsample_rows(rows=rows, points=50) == rows
@@ -1,6 +1,21 @@
-import re
+import io
+import base64
+import hashlib
+import datetime
+import httpx
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 from enum import Enum
+from typing import Annotated, Sequence, TypeVar
+from pydantic import BeforeValidator
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+
+SHEETS_BASE_URL = 'https://docs.google.com/spreadsheets/d'
+
+# Shared across refreshes so connections to Google Sheets are kept alive and reused
+http_client = httpx.Client(follow_redirects=True, timeout=60)
 
 
 class Operator(str, Enum):
@@ -12,9 +27,283 @@ class Operator(str, Enum):
     gte = 'gte'
 
 
+class SortOrder(str, Enum):
+    """Enum for the direction rows are returned in."""
+    asc = 'asc'
+    desc = 'desc'
+
+
+class TimeBucket(str, Enum):
+    """Enum for the periods transactions and balances can be grouped into."""
+    day = 'day'
+    week = 'week'
+    month = 'month'
+    quarter = 'quarter'
+    year = 'year'
+
+
+class Aggregate(str, Enum):
+    """Enum for the summaries that can be computed over a group of transactions."""
+    sum = 'sum'
+    count = 'count'
+    cumsum = 'cumsum'
+
+
+class TransactionDimension(str, Enum):
+    """Enum for the transaction columns that transactions can be grouped by and whose filters
+        can be inverted."""
+    Group = 'Group'
+    Category = 'Category'
+    Subcategory = 'Subcategory'
+    Merchant = 'Merchant'
+    Account = 'Account'
+
+
+class NetWorthDimension(str, Enum):
+    """Enum for the net worth columns that balances can be grouped by."""
+    Category = 'Category'
+    Subcategory = 'Subcategory'
+    Account = 'Account'
+
+
+class NetWorthAggregation(str, Enum):
+    """Enum for the ways the balances an account recorded within a period are combined into
+        one: the last one recorded, their mean, or the highest one."""
+    last = 'last'
+    mean = 'mean'
+    max = 'max'
+
+
+class TextMatch(str, Enum):
+    """Enum for the ways a text filter can match a value."""
+    exact = 'exact'
+    prefix = 'prefix'
+    contains = 'contains'
+
+
+class RefreshMode(str, Enum):
+    """Enum for the ways a refresh can bring the database up to date."""
+    incremental = 'incremental'
+    full = 'full'
+
+
+class RefreshPhase(str, Enum):
+    """Enum for the stages a background refresh job moves through."""
+    queued = 'queued'
+    fetching = 'fetching'
+    syncing = 'syncing'
+    succeeded = 'succeeded'
+    failed = 'failed'
+
+
+T = TypeVar('T')
+
+# A parameter that can be given one value or a list of them, and is a list either way. Query
+# parameters repeat to give a list, but /batch passes parameters as JSON values.
+OneOrMany = Annotated[list[T], BeforeValidator(lambda value: value if isinstance(value, list) else [value])]
+
+
+def format_cents(cents: int) -> str:
+    """Formats an amount in integer cents as a dollar amount with two decimal places.
+
+    Args:
+        - cents (int): The amount in cents (e.g. -1234)
+
+    Returns:
+        - str: The formatted amount (e.g. "-12.34")
+    """
+    sign = '-' if cents < 0 else ''
+    dollars, remainder = divmod(abs(cents), 100)
+    return f'{sign}{dollars}.{remainder:02d}'
+
+
+def encode_cursor(date: str, row_id: int) -> str:
+    """Encodes the sort key of the last row of a page as an opaque cursor for the next page.
+
+    Args:
+        - date (str): The row's date (YYYY-MM-DD)
+        - row_id (int): The row's id, which breaks ties between rows on the same date
+
+    Returns:
+        - str: The URL-safe cursor
+    """
+    return base64.urlsafe_b64encode(f'{date}|{row_id}'.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    """Decodes a cursor created by encode_cursor back into the sort key it points after.
+
+    Args:
+        - cursor (str): The cursor
+
+    Returns:
+        - tuple[str, int]: The date and row id of the last row of the previous page
+
+    Raises:
+        - ValueError: If the cursor was not created by encode_cursor.
+    """
+    try:
+        date, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.date.fromisoformat(date).isoformat(), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f'Invalid cursor: {cursor}') from e
+
+
+def covers_whole_months(start_date: str | None, end_date: str | None) -> bool:
+    """Checks whether a date range starts on the first day of a month and ends on the last day
+        of a month, so that it can be answered from monthly totals. An open end is aligned.
+
+    Args:
+        - start_date (str): Start date, inclusive (YYYY-MM-DD)
+        - end_date (str): End date, inclusive (YYYY-MM-DD)
+
+    Returns:
+        - bool: Whether the range covers whole months only
+    """
+    try:
+        if start_date and datetime.date.fromisoformat(start_date).day != 1:
+            return False
+        if end_date and (datetime.date.fromisoformat(end_date) + datetime.timedelta(days=1)).day != 1:
+            return False
+    except (ValueError, OverflowError):
+        return False
+    return True
+
+
+def cents_to_decimal_array(cents: pa.Array, scale: int = 2) -> pa.Array:
+    """Reinterprets integer cents as an Arrow decimal array without converting each value. A
+        decimal128 value is stored as its unscaled 128-bit integer, which for cents at a scale
+        of 2 is the number of cents itself, so each value only needs to be sign-extended.
+
+    Args:
+        - cents (pa.Array): Amounts in integer cents, as an int64 array
+        - scale (int): Number of digits after the decimal point the cents represent
+
+    Returns:
+        - pa.Array: The amounts as a decimal128(18, scale) array
+    """
+    values = np.frombuffer(cents.buffers()[1], dtype=np.int64)[cents.offset:cents.offset + len(cents)]
+    unscaled = np.column_stack([values, values >> 63])
+    return pa.Array.from_buffers(
+        pa.decimal128(18, scale),
+        len(cents),
+        [cents.buffers()[0], pa.py_buffer(unscaled.tobytes())],
+        null_count=cents.null_count
+    )
+
+
+@dataclass
+class ReadQuery:
+    """A query behind a read endpoint, built from the endpoint's parameters. It can select
+        either one JSON object per row or the columns of its Arrow schema, and a paginated
+        query also selects the sort key of each row ("Date" and Row_Id) after those. A query
+        downsampled to a number of points instead selects the period and value of each row
+        after those."""
+    json_sql: str
+    arrow_sql: str
+    params: dict
+    schema: pa.Schema
+    limit: int | None = None
+    points: int | None = None
+
+
+def lttb(x: Sequence[float], y: Sequence[float], threshold: int) -> list[int]:
+    """Picks the points of a series that best keep its shape with Largest-Triangle-Three-Buckets.
+        The first and last points are always kept, the points between them are split into
+        buckets, and from each bucket the point forming the largest triangle with the point
+        picked before it and the average of the next bucket is kept.
+
+    Args:
+        - x (Sequence[float]): The x values of the series, in increasing order
+        - y (Sequence[float]): The y values of the series
+        - threshold (int): Number of points to keep, at least 3
+
+    Returns:
+        - list[int]: Positions of the points to keep, in increasing order
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = [0]
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_x = x[end:edges[bucket + 2]].mean()
+            next_y = y[end:edges[bucket + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        previous = selected[-1]
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        selected.append(start + int(np.argmax(areas)))
+    selected.append(n - 1)
+    return selected
+
+
+def downsample_rows(rows: Sequence[tuple], points: int) -> list[tuple]:
+    """Keeps the rows of at most the given number of periods, picked with LTTB from the total
+        value of each period's rows. Every row of a picked period is kept, so series charted
+        together stay aligned.
+
+    Args:
+        - rows (Sequence[tuple]): Rows ordered by period, each ending with its period
+            (YYYY-MM-DD) and its value
+        - points (int): Most periods to keep
+
+    Returns:
+        - list[tuple]: The rows of the periods kept
+    """
+    totals = {}
+    for row in rows:
+        totals[row[-2]] = totals.get(row[-2], 0) + (row[-1] or 0)
+    if len(totals) <= points:
+        return list(rows)
+    periods = sorted(totals)
+    kept = lttb(
+        x=[datetime.date.fromisoformat(period).toordinal() for period in periods],
+        y=[totals[period] for period in periods],
+        threshold=points
+    )
+    kept_periods = {periods[index] for index in kept}
+    return [row for row in rows if row[-2] in kept_periods]
+
+
+def to_arrow_ipc(rows: Sequence[tuple], schema: pa.Schema) -> bytes:
+    """Builds an Arrow IPC stream from database rows. ISO date strings become date32 columns
+        and integer cents become decimal columns, so clients get native types without parsing.
+
+    Args:
+        - rows (Sequence[tuple]): Rows with one value per schema field, in schema order
+        - schema (pa.Schema): The Arrow schema of the response
+
+    Returns:
+        - bytes: The serialized Arrow IPC stream
+    """
+    columns = list(zip(*rows)) or [()] * len(schema)
+    arrays = []
+    for field, values in zip(schema, columns):
+        if pa.types.is_date32(field.type):
+            arrays.append(pa.array(values, pa.string()).cast(pa.date32()))
+        elif pa.types.is_decimal(field.type):
+            arrays.append(cents_to_decimal_array(pa.array(values, pa.int64()), scale=field.type.scale))
+        else:
+            arrays.append(pa.array(values, field.type))
+    table = pa.Table.from_arrays(arrays, schema=schema)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
 def convert_usd_columns(df) -> pd.DataFrame:
-    """Converts any column in the DataFrame containing USD-formatted strings (like "$1,234.56")
-        to float values. Ignores non-object columns.
+    """Converts any column in the DataFrame containing USD-formatted strings (like "$1,234.56",
+        "-$5" or "($5)") to float values. Ignores non-object columns. Each column is converted
+        as a whole, and the DataFrame is modified in place.
 
     Args:
         - df (pd.DataFrame): The DataFrame to process
@@ -22,52 +311,125 @@ def convert_usd_columns(df) -> pd.DataFrame:
     Returns:
         - pd.DataFrame: The DataFrame with USD-formatted strings converted to floats
     """
-    def is_usd_column(series: pd.Series) -> bool:
-        """Checks if a column contains USD-formatted strings.
+    def is_usd_column(series: pd.Series, sample_size: int = 100) -> bool:
+        """Checks if a column contains USD-formatted strings by looking at its first non-empty
+            values.
         
         Args:
             - series (pd.Series): The column to check
+            - sample_size (int): Number of non-empty values to look at
             
         Returns:
             - bool: True if the column contains USD-formatted strings, False otherwise
         """
-        return series.astype(str).str.contains(r'\$', na=False).any()
+        sample = series.dropna().head(sample_size)
+        return sample.astype(str).str.contains('$', regex=False).any()
 
-    def parse_usd(value: str) -> float | None:
-        """Converts a USD-formatted string to a float. Returns None for invalid formats.
+    def parse_usd(series: pd.Series) -> pd.Series:
+        """Converts a column of USD-formatted strings to floats. Values wrapped in parentheses
+            are negative, and values that cannot be parsed become NaN.
         
         Args:
-            - value (str): The USD-formatted string to convert
+            - series (pd.Series): The column of USD-formatted strings to convert
         
         Returns:
-            - float | None: The converted float value, or None if the format is invalid
+            - pd.Series: The converted float values
         """
-        if pd.isna(value):
-            return None
-        clean_value = re.sub(r'[\$,]', '', str(value))
-        try:
-            return float(clean_value)
-        except ValueError:
-            return None
-
-    df = df.copy()
+        values = np.strings.strip(series.to_numpy(dtype=str, na_value=''))
+        is_parenthesized = np.strings.startswith(values, '(') & np.strings.endswith(values, ')')
+        for character in ('$', ',', '(', ')'):
+            values = np.strings.replace(values, character, '')
+        amounts = pd.to_numeric(np.strings.strip(values), errors='coerce').astype(float)
+        amounts[is_parenthesized] *= -1
+        return pd.Series(amounts, index=series.index)
+
     for col in df.columns:
         if df[col].dtype == object and is_usd_column(df[col]):
-            df[col] = df[col].apply(parse_usd)
+            df[col] = parse_usd(df[col])
     return df
 
 
-def get_sheets_data(sheet_id: str, sheet_name: str) -> pd.DataFrame:
-    """Fetch data from a given Google Sheet sheet_id and sheet_name.
+@dataclass
+class SheetData:
+    """The result of fetching a sheet, along with the validators used to tell whether it has
+        changed on the next fetch. data is None when the sheet is unchanged."""
+    data: pd.DataFrame | None
+    content_hash: str
+    etag: str | None = None
+    last_modified: str | None = None
+
+
+def get_sheets_data(sheet_id: str, sheet_name: str, previous: SheetData | None = None) -> SheetData:
+    """Fetch data from a given Google Sheet sheet_id and sheet_name. When the validators from
+        a previous fetch show the sheet is unchanged, parsing is skipped.
     
     Args:
         - sheet_id (str): The ID of the Google Sheet
         - sheet_name (str): The name of the sheet within the Google Sheet
+        - previous (SheetData): Validators from the previous fetch of this sheet, if any
         
     Returns:
-        - pd.DataFrame: The data from the specified sheet as a DataFrame
+        - SheetData: The data from the specified sheet as a DataFrame, or None if unchanged
     """
-    sheet_url = f'https://docs.google.com/spreadsheets/d/{sheet_id}/gviz/tq?tqx=out:csv&sheet={sheet_name}'
-    df = pd.read_csv(sheet_url)
-    df = convert_usd_columns(df)
-    return df
+    headers = {}
+    if previous and previous.etag:
+        headers['If-None-Match'] = previous.etag
+    if previous and previous.last_modified:
+        headers['If-Modified-Since'] = previous.last_modified
+    response = http_client.get(
+        url=f'{SHEETS_BASE_URL}/{sheet_id}/gviz/tq',
+        params={'tqx': 'out:csv', 'sheet': sheet_name},
+        headers=headers
+    )
+    if previous and response.status_code == 304:
+        return SheetData(
+            data=None,
+            content_hash=previous.content_hash,
+            etag=response.headers.get('ETag', previous.etag),
+            last_modified=response.headers.get('Last-Modified', previous.last_modified)
+        )
+    response.raise_for_status()
+
+    # Google Sheets rarely sends validators, so also compare a hash of the exported CSV
+    content_hash = hashlib.sha256(response.content).hexdigest()
+    sheet_data = SheetData(
+        data=None,
+        content_hash=content_hash,
+        etag=response.headers.get('ETag'),
+        last_modified=response.headers.get('Last-Modified')
+    )
+    if previous and previous.content_hash == content_hash:
+        return sheet_data
+    df = pd.read_csv(io.BytesIO(response.content))
+    sheet_data.data = convert_usd_columns(df)
+    return sheet_data
+
+
+def get_all_sheets_data(
+    sheet_id: str,
+    sheet_names: list[str],
+    previous: dict[str, SheetData] | None = None
+) -> dict[str, SheetData]:
+    """Fetch several sheets from a given Google Sheet at the same time, so the refresh takes
+        about as long as the slowest sheet rather than the sum of all of them.
+
+    Args:
+        - sheet_id (str): The ID of the Google Sheet
+        - sheet_names (list[str]): The names of the sheets within the Google Sheet
+        - previous (dict[str, SheetData]): Validators from the previous fetch, keyed by sheet name
+
+    Returns:
+        - dict[str, SheetData]: The data from each sheet, keyed by sheet name
+    """
+    previous = previous or {}
+    with ThreadPoolExecutor(max_workers=max(1, len(sheet_names))) as executor:
+        futures = {
+            sheet_name: executor.submit(
+                get_sheets_data,
+                sheet_id=sheet_id,
+                sheet_name=sheet_name,
+                previous=previous.get(sheet_name)
+            )
+            for sheet_name in sheet_names
+        }
+        return {sheet_name: future.result() for sheet_name, future in futures.items()}
@@ -1,34 +1,56 @@
 import datetime
 import streamlit as st
 from streamlit.components.v1 import html
-import requests
 import pandas as pd
 import altair as alt
 
+from data import get_dataframes
+
 st.set_page_config(layout='wide')
 
+start_of_current_month = datetime.date.today().replace(day=1)
+start_of_previous_month = (start_of_current_month - datetime.timedelta(days=1)).replace(day=1)
+end_of_previous_month = start_of_current_month - datetime.timedelta(days=1)
+
+# None of the data depends on other data, so fetch it all at once from the same snapshot: the
+# latest balance of each account, daily spending for the current and previous month, and the
+# 5 most recent transactions
+(
+    df_latest_balances,
+    df_current_month_expenses,
+    df_previous_month_expenses,
+    df_latest_expenses
+) = get_dataframes(queries=[
+    ('/networth/latest', None),
+    (
+        '/transactions/aggregate',
+        {'start_date': start_of_current_month, 'group': 'Expenses', 'bucket': 'day', 'aggregates': ['sum', 'cumsum']}
+    ),
+    (
+        '/transactions/aggregate',
+        {'start_date': start_of_previous_month, 'end_date': end_of_previous_month, 'group': 'Expenses', 'bucket': 'day', 'aggregates': ['sum', 'cumsum']}
+    ),
+    (
+        '/transactions',
+        {'start_date': start_of_current_month, 'group': 'Expenses', 'order': 'desc', 'limit': 5}
+    )
+])
+
 col1, col2 = st.columns(spec=[0.5, 0.5])
 with col1:
     with st.container(border=True):
-        # Fetch detailed net worth breakdown
-        net_worth_details = requests.get(url='http://fastapi:8000/networth-detailed').json()
-        df_net_worth_details = pd.DataFrame(data=net_worth_details)
-        df_net_worth_details['Balance'] = df_net_worth_details['Balance'].astype(dtype=float)
-
-        # Get the most recent date net worth was recorded
-        most_recent_date = df_net_worth_details['Date'].max()
-
-        # Fetch net worth as of most recent recorded date
-        net_worth_aggregate = requests.get(url=f'http://fastapi:8000/networth-aggregated?start_date={most_recent_date}').json()
-        df_net_worth_aggregate = pd.DataFrame(data=net_worth_aggregate)
-        net_worth = float(df_net_worth_aggregate['Balance'].iloc[0]) - float(df_net_worth_aggregate['Balance'].iloc[1])
+        df_net_worth_details = df_latest_balances.astype({'Balance': float})
+        net_worth = (
+            df_net_worth_details.loc[df_net_worth_details['Category'] == 'Asset', 'Balance'].sum()
+            - df_net_worth_details.loc[df_net_worth_details['Category'] == 'Liability', 'Balance'].sum()
+        )
         st.write('**Net Worth**')
         st.metric(label='Your Net Worth', value='${:,.2f}'.format(net_worth))
         assets, liabilities = st.tabs(tabs=['Assets', 'Liabilities'])
         with assets:
 
             # Create horizontal stacked bar chart with asset components
-            df_assets = df_net_worth_details[(df_net_worth_details['Date'] == most_recent_date) & (df_net_worth_details['Category'] == 'Asset')]
+            df_assets = df_net_worth_details[df_net_worth_details['Category'] == 'Asset']
             df_assets_grouped = df_assets[['Subcategory', 'Balance']].groupby('Subcategory').sum().reset_index()
             df_assets_grouped['Percent'] = df_assets_grouped['Balance'] / df_assets_grouped['Balance'].sum()
             df_assets_grouped['Bar'] = 'Total'
@@ -64,7 +86,7 @@ with col1:
         with liabilities:
 
             # Create horizontal stacked bar chart with liability components
-            df_liabilities = df_net_worth_details[(df_net_worth_details['Date'] == most_recent_date) & (df_net_worth_details['Category'] == 'Liability')]
+            df_liabilities = df_net_worth_details[df_net_worth_details['Category'] == 'Liability']
             df_liabilities_grouped = df_liabilities[['Subcategory', 'Balance']].groupby('Subcategory').sum().reset_index()
             df_liabilities_grouped['Percent'] = df_liabilities_grouped['Balance'] / df_liabilities_grouped['Balance'].sum()
             df_liabilities_grouped['Bar'] = 'Total'
@@ -101,28 +123,15 @@ with col2:
     with st.container(border=True):
         st.write('**Spending**')
 
-        # Get spending data for current and previous month
-        start_of_current_month = datetime.date.today().replace(day=1)
-        start_of_previous_month = (start_of_current_month - datetime.timedelta(days=1)).replace(day=1)
-        end_of_previous_month = start_of_current_month - datetime.timedelta(days=1)
-        current_month_expenses = requests.get(url=f'http://fastapi:8000/transactions?start_date={start_of_current_month}&group=Expenses').json()
-        previous_month_expenses = requests.get(url=f'http://fastapi:8000/transactions?start_date={start_of_previous_month}&end_date={end_of_previous_month}&group=Expenses').json()
-        df_current_month_expenses = pd.DataFrame(data=current_month_expenses)
-        df_previous_month_expenses = pd.DataFrame(data=previous_month_expenses)
-        total_expenses_current_month = df_current_month_expenses['Amount'].astype(dtype=float).sum()
+        total_expenses_current_month = df_current_month_expenses['Amount'].sum()
         st.metric(label='Spent this month', value = '${:,.0f}'.format(total_expenses_current_month))
 
         # Get data in format for chart visualizing current month vs. previous month cumulative spending
         for df, label in zip([df_current_month_expenses, df_previous_month_expenses], ['Current Month', 'Previous Month']):
-            df['Date'] = pd.to_datetime(df['Date'])
-            df['Amount'] = df['Amount'].astype(float)
-            df['Cumulative'] = df['Amount'].cumsum()
-            df['Day'] = df['Date'].dt.day
+            df['Cumulative'] = df['Cumulative'].astype(float)
+            df['Day'] = df['Period'].dt.day
             df['Source'] = label
-        df_combined = pd.concat([df_current_month_expenses, df_previous_month_expenses])
-        df_combined_aggregated = df_combined.groupby(['Day', 'Source'], as_index=False).agg(
-            {'Cumulative': 'last'}
-        )
+        df_combined_aggregated = pd.concat([df_current_month_expenses, df_previous_month_expenses])[['Day', 'Source', 'Cumulative']]
         st.altair_chart(
             alt.Chart(df_combined_aggregated).mark_line().encode(
                 x=alt.X('Day:O', title=None),
@@ -148,10 +157,7 @@ with col2:
             use_container_width=True
         )
         st.write('**Latest Transactions**')
-
-        # Get the 5 most recent transactions
-        df_current_month_expenses = df_current_month_expenses.sort_values(by='Date', ascending=False).head(5)
-        for _, row in df_current_month_expenses.iterrows():
+        for _, row in df_latest_expenses.iterrows():
             with st.container():
                 col_date, col_merchant, col_amount = st.columns([0.25, 0.5, 0.25])
                 with col_date:
@@ -1,12 +1,37 @@
+import time
 import streamlit as st
-import requests
+import pandas as pd
+
+from data import API_URL, get_data_version, get_session
+
+full_refresh = st.checkbox('Rewrite all rows (full refresh)')
 
 if st.button('Refresh Data Now'):
     try:
-        response = requests.post('http://fastapi:8000/refresh-data')
-        if response.ok:
+        response = get_session().post(
+            f'{API_URL}/refresh-data',
+            params={'mode': 'full' if full_refresh else 'incremental'}
+        )
+        if not response.ok:
+            st.error(f'Failed to start refresh: {response.text}')
+            st.stop()
+
+        # Poll the background job until it finishes
+        job = response.json()
+        with st.status(label='Refreshing data...', expanded=False) as status:
+            while job['phase'] not in ('succeeded', 'failed'):
+                status.update(label=f'Refreshing data ({job['phase']})...')
+                time.sleep(1)
+                job = get_session().get(f'{API_URL}/refresh-data/{job['id']}').json()
+            status.update(label='Refresh finished', state='complete' if job['phase'] == 'succeeded' else 'error')
+
+        if job['phase'] == 'succeeded':
+            # Have every page load the refreshed data on its next run
+            get_data_version.clear()
             st.success('Data refreshed successfully!')
+            st.dataframe(data=pd.DataFrame(job['results']), hide_index=True)
+            st.write('Seconds per phase:', job['timings'])
         else:
-            st.error(f'Failed to refresh data: {response.text}')
+            st.error(f'Failed to refresh data: {job['error']}')
     except Exception as e:
-        st.error(f'Error: {e}')
\ No newline at end of file
+        st.error(f'Error: {e}')
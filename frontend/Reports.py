@@ -4,7 +4,8 @@ import dateutil.relativedelta
 import streamlit as st
 import pandas as pd
 import altair as alt
-import requests
+
+from data import get_dataframes
 
 st.set_page_config(layout='wide')
 
@@ -58,46 +59,52 @@ elif aggregation_period == 'Quarterly':
 elif aggregation_period == 'Yearly':
     start_date = datetime.date.today().replace(month=1, day=1) - dateutil.relativedelta.relativedelta(years=number_periods-1)
 
-# Get income transactions
-income_transactions = requests.get(url=f'http://fastapi:8000/transactions?start_date={start_date}&group=Income').json()
-df_income_transactions = pd.DataFrame(data=income_transactions)
-df_income_transactions['Date'] = pd.to_datetime(df_income_transactions['Date'])
+# Time bucket the API groups transactions into for each report granularity
+bucket_map = {
+    'Monthly': 'month',
+    'Quarterly': 'quarter',
+    'Yearly': 'year'
+}
+
+# Get income and expense totals for each reporting period, by category and subcategory, at the
+# same time
+df_income_transactions, df_expense_transactions = get_dataframes(queries=[
+    (
+        '/transactions/aggregate',
+        {
+            'start_date': start_date,
+            'group': group,
+            'by': ['Category', 'Subcategory'],
+            'bucket': bucket_map[aggregation_period]
+        }
+    )
+    for group in ['Income', 'Expenses']
+])
+
+# Total income for each reporting period
+df_income_transactions['Date'] = pd.to_datetime(df_income_transactions['Period'])
 df_income_transactions['Amount'] = df_income_transactions['Amount'].astype(dtype=float)
 if aggregation_period == 'Monthly':
-    df_income_transactions['Group Period'] = df_income_transactions['Date'].apply(lambda x: pd.to_datetime(x).strftime('%b %Y'))
+    df_income_transactions['Group Period'] = df_income_transactions['Date'].dt.strftime('%b %Y')
 elif aggregation_period == 'Quarterly':
     df_income_transactions['Group Period'] = 'Q' + df_income_transactions['Date'].dt.quarter.astype(str) + ' ' + df_income_transactions['Date'].dt.year.astype(str)
 elif aggregation_period == 'Yearly':
-    df_income_transactions['Group Period'] = df_income_transactions['Date'].apply(lambda x: pd.to_datetime(x).strftime('%Y'))
-df_income_grouped = df_income_transactions[['Group Period', 'Amount']].groupby('Group Period').sum().reset_index()
+    df_income_transactions['Group Period'] = df_income_transactions['Date'].dt.strftime('%Y')
+df_income_grouped = df_income_transactions[['Group Period', 'Date', 'Amount']].groupby(['Group Period', 'Date']).sum().reset_index()
 df_income_grouped = df_income_grouped.rename(columns={'Amount': 'Income'})
-if aggregation_period == 'Monthly':
-    df_income_grouped['Date'] = pd.to_datetime(df_income_grouped['Group Period'], format='%b %Y')
-elif aggregation_period == 'Quarterly':
-    df_income_grouped['Date'] = pd.to_datetime(df_income_grouped['Group Period'].str.replace(r'Q([1-4]) (\d{4})', r'\2-\1', regex=True)).apply(lambda d: pd.Timestamp(d.year, 3 * (d.month - 1) + 1, 1))
-elif aggregation_period == 'Yearly':
-    df_income_grouped['Date'] = pd.to_datetime(df_income_grouped['Group Period'], format= '%Y')
 df_income_grouped = df_income_grouped.sort_values(by='Date', ascending=True)
 
-# Get income transactions
-expense_transactions = requests.get(url=f'http://fastapi:8000/transactions?start_date={start_date}&group=Expenses').json()
-df_expense_transactions = pd.DataFrame(data=expense_transactions)
-df_expense_transactions['Date'] = pd.to_datetime(df_expense_transactions['Date'])
+# Total expenses for each reporting period
+df_expense_transactions['Date'] = pd.to_datetime(df_expense_transactions['Period'])
 df_expense_transactions['Amount'] = df_expense_transactions['Amount'].astype(dtype=float)
 if aggregation_period == 'Monthly':
-    df_expense_transactions['Group Period'] = df_expense_transactions['Date'].apply(lambda x: pd.to_datetime(x).strftime('%b %Y'))
+    df_expense_transactions['Group Period'] = df_expense_transactions['Date'].dt.strftime('%b %Y')
 elif aggregation_period == 'Quarterly':
     df_expense_transactions['Group Period'] = 'Q' + df_expense_transactions['Date'].dt.quarter.astype(str) + ' ' + df_expense_transactions['Date'].dt.year.astype(str)
 elif aggregation_period == 'Yearly':
-    df_expense_transactions['Group Period'] = df_expense_transactions['Date'].apply(lambda x: pd.to_datetime(x).strftime('%Y'))
-df_expenses_grouped = df_expense_transactions[['Group Period', 'Amount']].groupby('Group Period').sum().reset_index()
+    df_expense_transactions['Group Period'] = df_expense_transactions['Date'].dt.strftime('%Y')
+df_expenses_grouped = df_expense_transactions[['Group Period', 'Date', 'Amount']].groupby(['Group Period', 'Date']).sum().reset_index()
 df_expenses_grouped = df_expenses_grouped.rename(columns={'Amount': 'Expenses'})
-if aggregation_period == 'Monthly':
-    df_expenses_grouped['Date'] = pd.to_datetime(df_expenses_grouped['Group Period'], format='%b %Y')
-elif aggregation_period == 'Quarterly':
-    df_expenses_grouped['Date'] = pd.to_datetime(df_expenses_grouped['Group Period'].str.replace(r'Q([1-4]) (\d{4})', r'\2-\1', regex=True)).apply(lambda d: pd.Timestamp(d.year, 3 * (d.month - 1) + 1, 1))
-elif aggregation_period == 'Yearly':
-    df_expenses_grouped['Date'] = pd.to_datetime(df_expenses_grouped['Group Period'], format= '%Y')
 df_expenses_grouped = df_expenses_grouped.sort_values(by='Date', ascending=True)
 
 
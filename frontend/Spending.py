@@ -1,26 +1,25 @@
 import datetime
-import urllib
 import streamlit as st
 import pandas as pd
 import altair as alt
-import requests
+
+from data import get_dataframe, get_json
 
 st.set_page_config(layout='wide')
 
-# Fetch initial data to build sidebar filters
-all_transactions = requests.get(url='http://fastapi:8000/transactions').json()
-df_all_transactions = pd.DataFrame(data=all_transactions)
-df_all_transactions['Date'] = pd.to_datetime(df_all_transactions['Date'])
+# Fetch the years and months with transactions to build sidebar filters
+facets = get_json(path='/transactions/facets')
+months = [datetime.date.fromisoformat(month) for month in facets['months']]
 
 with st.sidebar:
     year = st.selectbox(
         label='Year',
-        options=df_all_transactions['Date'].dt.year.unique(),
-        index=list(df_all_transactions['Date'].dt.year.unique()).index(datetime.date.today().year)
+        options=facets['years'],
+        index=facets['years'].index(datetime.date.today().year)
     )
     month = st.selectbox(
         label='Month',
-        options=df_all_transactions['Date'].dt.strftime('%B').unique(),
+        options=list(dict.fromkeys(month.strftime('%B') for month in months)),
         index=None
     )
 
@@ -35,9 +34,16 @@ if month:
 else:
     start_date = datetime.date(year=year, month=1, day=1)
     end_date = datetime.date(year=year, month=12, day=31)
-expenses_selected_month = requests.get(url=f'http://fastapi:8000/transactions?start_date={start_date}&end_date={end_date}&group=Expenses').json()
-df_expenses_selected = pd.DataFrame(data=expenses_selected_month)
-df_expenses_selected['Amount'] = df_expenses_selected['Amount'].astype(float)
+expense_params = {'start_date': start_date, 'end_date': end_date, 'group': 'Expenses'}
+
+# Group expenses by category
+df_expenses_selected_grouped = get_dataframe(
+    path='/transactions/aggregate',
+    params={**expense_params, 'by': 'Category'}
+)
+df_expenses_selected_grouped['Amount'] = df_expenses_selected_grouped['Amount'].astype(float)
+df_expenses_selected_grouped['Percent'] = df_expenses_selected_grouped['Amount'] / df_expenses_selected_grouped['Amount'].sum()
+total_selected_month_expenses = df_expenses_selected_grouped['Amount'].sum()
 
 with st.container(border=True):
     total_expenses, frequent_expenses = st.columns([0.2, 0.8])
@@ -45,14 +51,17 @@ with st.container(border=True):
         st.write('**Total Spend**')
         st.metric(
             label='Total Spent',
-            value='${:,.2f}'.format(df_expenses_selected['Amount'].sum())
+            value='${:,.2f}'.format(total_selected_month_expenses)
         )
     with frequent_expenses:
         st.write('**Most Frequent Expenses**')
 
         # Get the most common merchants in the current months' transactions
-        df_most_common_merchants = df_expenses_selected[['Merchant']].groupby('Merchant').size().reset_index()
-        df_most_common_merchants = df_most_common_merchants.rename(columns={0: 'Total Transactions'}).sort_values(by='Total Transactions', ascending=False).head(5)
+        df_most_common_merchants = get_dataframe(
+            path='/transactions/aggregate',
+            params={**expense_params, 'by': 'Merchant', 'aggregates': 'count'}
+        )
+        df_most_common_merchants = df_most_common_merchants.rename(columns={'Count': 'Total Transactions'}).sort_values(by='Total Transactions', ascending=False).head(5)
         merchant1, merchant2, merchant3, merchant4, merchant5 = st.columns(5)
         with merchant1:
             st.metric(
@@ -80,11 +89,6 @@ with st.container(border=True):
                 value=f'{df_most_common_merchants['Total Transactions'].iloc[4]}X'
             )
 
-# Group expenses by category
-df_expenses_selected_grouped = df_expenses_selected[['Category', 'Amount']].groupby('Category').sum().reset_index()
-df_expenses_selected_grouped['Percent'] = df_expenses_selected_grouped['Amount'] / df_expenses_selected_grouped['Amount'].sum()
-total_selected_month_expenses = df_expenses_selected_grouped['Amount'].sum()
-
 col_expenses_detailed, col_expenses_widgets = st.columns(spec=[0.6, 0.4])
 with col_expenses_detailed:
     with st.container(border=True):
@@ -108,19 +112,27 @@ with col_expenses_detailed:
         )
 with col_expenses_widgets:        
     with st.container(border=True):
+        # Get expenses by subcategory for every category in the breakdown in one query
+        df_all_subcategory_expenses = get_dataframe(
+            path='/transactions/aggregate',
+            params={
+                **expense_params,
+                'category': list(df_expenses_selected_grouped['Category']),
+                'by': ['Category', 'Subcategory']
+            }
+        )
+        df_all_subcategory_expenses['Amount'] = df_all_subcategory_expenses['Amount'].astype(dtype=float)
+
         st.write('**Subcategory Spend Breakdown**')
         category = st.selectbox(
             label='Category',
             options=list(df_expenses_selected_grouped['Category'].unique()),
             index=0
         )
-        category_param = urllib.parse.quote(category)
 
-        # Get all expenses for the selected category in the current month
-        category_expenses = requests.get(url=f'http://fastapi:8000/transactions?start_date={start_date}&end_date={end_date}&group=Expenses&category={category_param}').json()
-        df_category_expenses = pd.DataFrame(data=category_expenses)
-        df_category_expenses['Amount'] = df_category_expenses['Amount'].astype(dtype=float)
-        df_subcategory_expenses = df_category_expenses[['Subcategory', 'Amount']].groupby('Subcategory').sum().reset_index()
+        # Get expenses by subcategory for the selected category in the current month, out of
+        # the subcategories of every category, so choosing another category needs no request
+        df_subcategory_expenses = df_all_subcategory_expenses[df_all_subcategory_expenses['Category'] == category].drop(columns='Category')
         st.altair_chart(
         alt.Chart(df_subcategory_expenses).mark_bar().encode(
             x=alt.X('Amount', axis=alt.Axis(format='$,.0f', title='Amount')),
@@ -1,15 +1,16 @@
-import urllib
+import datetime
 import streamlit as st
 import pandas as pd
-import requests
+
+from data import get_data_version, get_dataframe_page, get_json
 
 st.set_page_config(layout='wide')
 
-# Fetch initial data to build sidebar filters
-all_transactions = requests.get(url='http://fastapi:8000/transactions').json()
-df_all_transactions = pd.DataFrame(data=all_transactions)
-df_all_transactions['Date'] = pd.to_datetime(df_all_transactions['Date'])
-df_all_transactions['Amount'] = df_all_transactions['Amount'].astype(float)
+# Fetch the values each filter can take to build sidebar filters
+facets = get_json(path='/transactions/facets')
+
+# Number of transactions to load at a time
+PAGE_SIZE = 200
 
 operator_map = {
     '<': 'lt',
@@ -36,6 +37,14 @@ for key, val in DEFAULT_FILTERS.items():
     if key not in st.session_state:
         st.session_state[key] = val
 
+
+def use_merchant_suggestion():
+    """Fill the merchant filter with the suggestion that was picked."""
+    if st.session_state.merchant_suggestion:
+        st.session_state.merchant = st.session_state.merchant_suggestion
+    st.session_state.merchant_suggestion = None
+
+
 with st.sidebar:
     if st.button('Clear Filters'):
         for key, val in DEFAULT_FILTERS.items():
@@ -44,8 +53,8 @@ with st.sidebar:
 
     st.date_input(
         label='Date',
-        min_value=df_all_transactions['Date'].min(),
-        max_value=df_all_transactions['Date'].max(),
+        min_value=datetime.date.fromisoformat(facets['min_date']),
+        max_value=datetime.date.fromisoformat(facets['max_date']),
         key='date_range'
     )
 
@@ -54,6 +63,26 @@ with st.sidebar:
         key='merchant'
     )
 
+    # Suggest merchants for what has been typed, which still finds them when it is misspelled
+    if st.session_state.merchant:
+        merchant_suggestions = get_json(
+            path='/transactions/merchants',
+            params={'q': st.session_state.merchant, 'limit': 5}
+        )
+        suggested_merchants = [
+            suggestion['Merchant']
+            for suggestion in merchant_suggestions
+            if suggestion['Merchant'] != st.session_state.merchant
+        ]
+        if suggested_merchants:
+            st.pills(
+                label='Suggested merchants',
+                options=suggested_merchants,
+                key='merchant_suggestion',
+                on_change=use_merchant_suggestion,
+                label_visibility='collapsed'
+            )
+
     st.selectbox(
         label='Amount Comparison',
         options=operator_map.keys(),
@@ -69,7 +98,7 @@ with st.sidebar:
 
     st.selectbox(
         label='Group',
-        options=sorted(df_all_transactions['Group'].unique()),
+        options=[group['value'] for group in facets['groups']],
         index=None,
         key='group'
     )
@@ -77,14 +106,18 @@ with st.sidebar:
     if st.session_state.group:
         st.selectbox(
             label='Category',
-            options=sorted(df_all_transactions[df_all_transactions['Group'] == st.session_state.group]['Category'].unique()),
+            options=[
+                category['value']
+                for group in facets['hierarchy'] if group['value'] == st.session_state.group
+                for category in group.get('children', [])
+            ],
             index=None,
             key='category'
         )
     else:
         st.selectbox(
             label='Category',
-            options=sorted(df_all_transactions['Category'].unique()),
+            options=[category['value'] for category in facets['categories']],
             index=None,
             key='category'
         )
@@ -92,21 +125,26 @@ with st.sidebar:
     if st.session_state.category:
         st.selectbox(
             label='Subcategory',
-            options=sorted(df_all_transactions[df_all_transactions['Category'] == st.session_state.category]['Subcategory'].unique()),
+            options=sorted({
+                subcategory['value']
+                for group in facets['hierarchy']
+                for category in group.get('children', []) if category['value'] == st.session_state.category
+                for subcategory in category.get('children', [])
+            }),
             index=None,
             key='subcategory'
         )
     else:
         st.selectbox(
             label='Subcategory',
-            options=sorted(df_all_transactions['Subcategory'].unique()),
+            options=[subcategory['value'] for subcategory in facets['subcategories']],
             index=None,
             key='subcategory'
         )
 
     st.selectbox(
         label='Account',
-        options=sorted(df_all_transactions['Account'].unique()),
+        options=[account['value'] for account in facets['accounts']],
         index=None,
         key='account'
     )
@@ -124,6 +162,7 @@ if dr:
 # Add each parameter to Streamlit session state
 if st.session_state.merchant:
     params['merchant'] = st.session_state.merchant
+    params['merchant_match'] = 'contains'
 if st.session_state.amount_op:
     params['amount_op'] = operator_map[st.session_state.amount_op]
 if st.session_state.amount:
@@ -137,19 +176,25 @@ if st.session_state.subcategory:
 if st.session_state.account:
     params['account'] = st.session_state.account
 
-if params:
-    if len(params.keys()) == 1 and ('amount' in params or 'amount_op' in params):
-        param_string = ''
-    else:
-        param_string = urllib.parse.urlencode(params)
-else:
-    param_string = ''
+if len(params.keys()) == 1 and ('amount' in params or 'amount_op' in params):
+    params = {}
+
+# Load the newest transactions first, starting over whenever the filters or the data change,
+# so pages loaded before a refresh aren't continued from the old data
+paging_key = (params, get_data_version())
+if st.session_state.get('transactions_params') != paging_key:
+    df_page, next_cursor = get_dataframe_page(
+        path='/transactions',
+        params={**params, 'order': 'desc'},
+        limit=PAGE_SIZE
+    )
+    st.session_state.transactions_params = paging_key
+    st.session_state.transactions = df_page
+    st.session_state.transactions_cursor = next_cursor
 
-filtered_transactions = requests.get(f'http://fastapi:8000/transactions?{param_string}').json()
-df_filtered_transactions = pd.DataFrame(filtered_transactions).sort_values(by='Date', ascending=False)
 st.subheader('**Transactions**')
 st.dataframe(
-    data=df_filtered_transactions,
+    data=st.session_state.transactions,
     hide_index=True,
     height=500,
     column_config={
@@ -162,3 +207,16 @@ st.dataframe(
         'Account': st.column_config.TextColumn(label='Account'),
     }
 )
+
+# Fetch the next page and add it below the transactions already loaded
+if st.session_state.transactions_cursor:
+    if st.button('Load more'):
+        df_page, next_cursor = get_dataframe_page(
+            path='/transactions',
+            params={**params, 'order': 'desc'},
+            limit=PAGE_SIZE,
+            cursor=st.session_state.transactions_cursor
+        )
+        st.session_state.transactions = pd.concat([st.session_state.transactions, df_page], ignore_index=True)
+        st.session_state.transactions_cursor = next_cursor
+        st.rerun()
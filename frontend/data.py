@@ -0,0 +1,256 @@
+import os
+import json
+import pandas as pd
+import pyarrow as pa
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+
+API_URL = os.environ.get('API_URL', 'http://fastapi:8000')
+
+# How long pages trust the data version they last saw before asking the API again. Refreshes
+# started from the Refresh page are picked up immediately, since it clears the cached version.
+DATA_VERSION_TTL_SECONDS = 30
+
+# Most requests the app has in flight at once, which is also how many connections are kept open
+MAX_CONCURRENT_REQUESTS = 16
+
+# Media type of an Arrow IPC stream, which the API returns instead of JSON when asked for it
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """Returns the HTTP session shared by every page and session of the app, which keeps its
+        connections to the API open between requests instead of opening one per request.
+
+    Returns:
+        - requests.Session: The shared session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONCURRENT_REQUESTS)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+@st.cache_data(ttl=DATA_VERSION_TTL_SECONDS, show_spinner=False)
+def get_data_version() -> int:
+    """Fetch the version of the data in the API, which changes whenever a refresh changes
+        the data. Cached loaders take it as an argument, so a new version makes them fetch
+        again. Stops the page with a notice while the API has not synced any data yet.
+
+    Returns:
+        - int: The data version
+    """
+    response = get_session().get(url=f'{API_URL}/data-version')
+    response.raise_for_status()
+    version = response.json()['version']
+
+    # The API has no data to serve until its first sync finishes. Stopping here leaves nothing
+    # cached, so the next rerun asks again.
+    if version == 0:
+        st.info('The API is syncing with the Google Sheet for the first time. Reload the page in a moment.')
+        st.stop()
+    return version
+
+
+def get_arrow(path: str, params: dict | None = None) -> requests.Response:
+    """Fetch an API endpoint as an Arrow IPC stream. Callers cache the result under the data
+        version, so the same URL is only requested again once the data has changed.
+
+    Args:
+        - path (str): The API endpoint path (e.g. "/transactions")
+        - params (dict): Query parameters for the request
+
+    Returns:
+        - requests.Response: The response, whose body is an Arrow IPC stream
+    """
+    response = get_session().get(
+        url=f'{API_URL}{path}',
+        params=params,
+        headers={'Accept': ARROW_MEDIA_TYPE}
+    )
+    response.raise_for_status()
+    return response
+
+
+def read_dataframe(response: requests.Response) -> pd.DataFrame:
+    """Load an Arrow IPC response into a DataFrame. Columns are backed by the Arrow buffers
+        received, so dates arrive as dates and amounts as decimals without JSON decoding or
+        copying them into NumPy arrays.
+
+    Args:
+        - response (requests.Response): A response from get_arrow
+
+    Returns:
+        - pd.DataFrame: The response data, with pyarrow-backed columns
+    """
+    return read_arrow_stream(response.content)
+
+
+def read_arrow_stream(source: bytes | pa.Buffer) -> pd.DataFrame:
+    """Load an Arrow IPC stream into a DataFrame with pyarrow-backed columns.
+
+    Args:
+        - source (bytes | pa.Buffer): The Arrow IPC stream
+
+    Returns:
+        - pd.DataFrame: The stream's data
+    """
+    table = pa.ipc.open_stream(source).read_all()
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def load_dataframe(path: str, params: dict | None, data_version: int) -> pd.DataFrame:
+    """Fetch an API endpoint into a DataFrame, once per data version.
+
+    Args:
+        - path (str): The API endpoint path (e.g. "/transactions")
+        - params (dict): Query parameters for the request
+        - data_version (int): The data version the result is cached under
+
+    Returns:
+        - pd.DataFrame: The response data, with pyarrow-backed columns
+    """
+    return read_dataframe(get_arrow(path=path, params=params))
+
+
+def get_dataframe(path: str, params: dict | None = None) -> pd.DataFrame:
+    """Fetch an API endpoint into a DataFrame. Results are cached until the data changes, so
+        a page rerun after a widget change only fetches what the change asks for.
+
+    Args:
+        - path (str): The API endpoint path (e.g. "/transactions")
+        - params (dict): Query parameters for the request
+
+    Returns:
+        - pd.DataFrame: The response data, with pyarrow-backed columns
+    """
+    return load_dataframe(path=path, params=params, data_version=get_data_version())
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def load_json(path: str, params: dict | None, data_version: int) -> dict | list:
+    """Fetch an API endpoint that only returns JSON, once per data version.
+
+    Args:
+        - path (str): The API endpoint path (e.g. "/transactions/facets")
+        - params (dict): Query parameters for the request
+        - data_version (int): The data version the result is cached under
+
+    Returns:
+        - dict | list: The decoded response body
+    """
+    response = get_session().get(url=f'{API_URL}{path}', params=params)
+    response.raise_for_status()
+    return response.json()
+
+
+def get_json(path: str, params: dict | None = None) -> dict | list:
+    """Fetch an API endpoint that only returns JSON. Results are cached until the data changes.
+
+    Args:
+        - path (str): The API endpoint path (e.g. "/transactions/facets")
+        - params (dict): Query parameters for the request
+
+    Returns:
+        - dict | list: The decoded response body
+    """
+    return load_json(path=path, params=params, data_version=get_data_version())
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_dataframes(queries: list[tuple[str, dict | None]], data_version: int) -> list[pd.DataFrame]:
+    """Fetch several API endpoints into DataFrames with one /batch request, once per data
+        version.
+
+    Args:
+        - queries (list[tuple[str, dict | None]]): The path and query parameters of each request
+        - data_version (int): The data version the results are cached under
+
+    Returns:
+        - list[pd.DataFrame]: The response data of each request, in the order of the queries
+    """
+    body = {
+        'queries': [
+            {'name': str(index), 'path': path, 'params': params or {}}
+            for index, (path, params) in enumerate(queries)
+        ]
+    }
+    response = get_session().post(
+        url=f'{API_URL}/batch',
+        data=json.dumps(body, default=str),
+        headers={'Accept': ARROW_MEDIA_TYPE, 'Content-Type': 'application/json'}
+    )
+    response.raise_for_status()
+
+    # Each row of the batch holds the result of one query as an Arrow IPC stream of its own
+    batch = pa.ipc.open_stream(response.content).read_all()
+    return [read_arrow_stream(data.as_buffer()) for data in batch.column('data')]
+
+
+def get_dataframes(queries: list[tuple[str, dict | None]]) -> list[pd.DataFrame]:
+    """Fetch several API endpoints into DataFrames in one round trip. The API runs them all
+        against the same snapshot of the data, so the results always agree with each other.
+        Results are cached until the data changes.
+
+    Args:
+        - queries (list[tuple[str, dict | None]]): The path and query parameters of each request
+
+    Returns:
+        - list[pd.DataFrame]: The response data of each request, in the order of the queries
+    """
+    return load_dataframes(queries=queries, data_version=get_data_version())
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def load_dataframe_page(
+    path: str,
+    params: dict | None,
+    limit: int,
+    cursor: str | None,
+    data_version: int
+) -> tuple[pd.DataFrame, str | None]:
+    """Fetch one page of a paginated API endpoint into a DataFrame, once per data version.
+
+    Args:
+        - path (str): The API endpoint path (e.g. "/transactions")
+        - params (dict): Query parameters for the request
+        - limit (int): Maximum number of rows in the page
+        - cursor (str): Cursor returned with the previous page, or None for the first page
+        - data_version (int): The data version the result is cached under
+
+    Returns:
+        - tuple[pd.DataFrame, str | None]: The page, and the cursor to the next page if there is one
+    """
+    response = get_arrow(path=path, params={**(params or {}), 'limit': limit, 'cursor': cursor})
+    return read_dataframe(response), response.headers.get('X-Next-Cursor')
+
+
+def get_dataframe_page(
+    path: str,
+    params: dict | None = None,
+    limit: int = 500,
+    cursor: str | None = None
+) -> tuple[pd.DataFrame, str | None]:
+    """Fetch one page of a paginated API endpoint into a DataFrame. Pages are cached until
+        the data changes.
+
+    Args:
+        - path (str): The API endpoint path (e.g. "/transactions")
+        - params (dict): Query parameters for the request
+        - limit (int): Maximum number of rows in the page
+        - cursor (str): Cursor returned with the previous page, or None for the first page
+
+    Returns:
+        - tuple[pd.DataFrame, str | None]: The page, and the cursor to the next page if there is one
+    """
+    return load_dataframe_page(
+        path=path,
+        params=params,
+        limit=limit,
+        cursor=cursor,
+        data_version=get_data_version()
+    )